@@ -0,0 +1,104 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Measures what the plugins add to the start of KiCad.
+
+    KiCad imports every plugin at start, and the plugins register their
+    wizards and actions then. Each plugin is imported here in a fresh
+    interpreter that already holds pcbnew, FootprintWizardBase and PadArray
+    (the stand-ins of bench/stubs), as KiCad's does, and the best time of
+    several runs is compared with the budget.
+
+    usage: python bench/bench_import.py [--budget 25] [--repeat 7]
+
+    The run fails when a plugin takes longer than the budget, in ms, or
+    loads a module that is meant to wait for the first build.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+PLUGINS = ['edge_bus_connectors', 'protoarea_wizard', 'bus_slot_action']
+
+# Modules the plugins import on first use only.
+DEFERRED = ['numpy', 'plan_emitter', 'clearance_check', 'slot_layout',
+            'hashlib', 'logging']
+
+# Runs in the fresh interpreter, prints the import time and the new modules.
+IMPORT_PLUGIN = """
+import sys, json, importlib
+from timeit import default_timer
+sys.path[:0] = %r
+import pcbnew, FootprintWizardBase, PadArray
+before = set(sys.modules)
+start = default_timer()
+importlib.import_module(%r)
+seconds = default_timer() - start
+print(json.dumps({'seconds': seconds,
+                  'modules': sorted(set(sys.modules) - before)}))
+"""
+
+def ImportPlugin(plugin):
+    """
+    Import a plugin in a fresh interpreter.
+    @return: (seconds, list of the modules it loaded)
+    """
+    code = IMPORT_PLUGIN % ([os.path.join(HERE, 'stubs'), ROOT], plugin)
+    output = subprocess.check_output([sys.executable, '-c', code])
+    result = json.loads(output.decode('utf-8').splitlines()[-1])
+    return result['seconds'], result['modules']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure the import time of the KiCad plugins.")
+    parser.add_argument('--budget', type=float, default=25,
+                        help="allowed import time per plugin, in ms")
+    parser.add_argument('-r', '--repeat', type=int, default=7,
+                        help="fresh imports per plugin, the best is kept")
+    args = parser.parse_args(argv)
+
+    # KiCad imports the plugins from their byte code after the first start.
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+
+    failures = []
+    print("%-24s %10s %8s" % ("plugin", "ms", "modules"))
+    for plugin in PLUGINS:
+        runs = [ImportPlugin(plugin) for r in range(args.repeat)]
+        seconds, modules = min(runs)
+        print("%-24s %10.2f %8d" % (plugin, seconds * 1000, len(modules)))
+        if seconds * 1000 > args.budget:
+            failures.append("%s: %.2f ms, budget %.2f ms" %
+                            (plugin, seconds * 1000, args.budget))
+        loaded = [m for m in DEFERRED if m in modules]
+        if loaded:
+            failures.append("%s: loads %s at start" %
+                            (plugin, ", ".join(loaded)))
+
+    for failure in failures:
+        print("over budget: " + failure, file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
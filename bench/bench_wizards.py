@@ -0,0 +1,204 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Benchmarks the footprint wizards outside of KiCad.
+
+    pcbnew, FootprintWizardBase and PadArray are replaced by the stand-ins
+    in bench/stubs, which record the calls instead of drawing. Every case
+    runs BuildFootprint as the KiCad dialog would, with the plan cache
+    cleared, and reports the best time, the calls into the KiCad API and
+    the peak memory.
+
+    usage: python bench/bench_wizards.py [--quick] [--save results.json]
+                                         [--baseline results.json]
+
+    With --baseline the run fails when a case got slower than the
+    tolerance allows, makes more KiCad calls, or uses more memory.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, 'stubs'), os.path.dirname(HERE)]
+
+from recorder import CALLS
+import footprint_plan as FP
+import edge_bus_connectors
+import protoarea_wizard
+
+# Case grids, as parameter values in dialog units.
+CARD_EDGE_GRID = [
+    (FP.CON_COUNT_KEY, [1, 4, 8, 16, 22]),
+    (FP.POS_COUNT_KEY, [22, 43, 50]),
+    (FP.STAGGER_KEY, [False, True]),
+    (FP.ALPHA_NAME_KEY, [False, True]),
+]
+PROTO_GRID = [
+    (FP.PAD_COUNT_KEY, [100, 1000, 5000, 20000]),
+    (FP.ROW_COUNT_KEY, [2, 10, 50]),
+]
+QUICK_CARD_EDGE_GRID = [
+    (FP.CON_COUNT_KEY, [1, 8]),
+    (FP.POS_COUNT_KEY, [22, 43]),
+    (FP.STAGGER_KEY, [False, True]),
+    (FP.ALPHA_NAME_KEY, [False, True]),
+]
+QUICK_PROTO_GRID = [
+    (FP.PAD_COUNT_KEY, [100, 1000]),
+    (FP.ROW_COUNT_KEY, [2, 10]),
+]
+
+# Shortest time measured at once, in seconds.
+MIN_TIMING = 0.05
+
+# Slowdowns below this many seconds are noise, not regressions.
+MIN_SLOWDOWN = 0.001
+
+WIZARDS = {
+    'card_edge': edge_bus_connectors.CardEdgeWizard,
+    'proto':     protoarea_wizard.ProtoWizard,
+}
+
+def Cases(wizard, grid):
+    keys = [key for key, values in grid]
+    for combo in itertools.product(*[values for key, values in grid]):
+        yield wizard, list(zip(keys, combo))
+
+def CaseName(wizard, values):
+    return wizard + " " + " ".join("%s=%s" % (k.replace(' ', '_'), v)
+                                   for k, v in values)
+
+def MakeWizard(wizard, values):
+    wiz = WIZARDS[wizard]()
+    params = dict((p.name, p) for p in wiz.params)
+    for name, value in values:
+        params[name].SetValue(value)
+    return wiz
+
+def Build(wiz):
+    wiz.planCache.Clear()
+    wiz.BuildFootprint()
+
+def RunCase(wizard, values, repeat):
+    """
+    Time, count and measure one case.
+    @return: dict of results
+    """
+    wiz = MakeWizard(wizard, values)
+
+    CALLS.clear()
+    Build(wiz)
+    calls = dict(CALLS)
+    pads = len(wiz.module.Pads())
+    lines = len(wiz.module.GraphicalItems())
+
+    # Small cases are built several times per timing so the clock
+    # resolution and the scheduler do not dominate.
+    timer = timeit.Timer(lambda: Build(wiz))
+    number = 1
+    while timer.timeit(number) < MIN_TIMING:
+        number *= 2
+    gc.collect()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    wiz.module = None
+    gc.collect()
+    tracemalloc.start()
+    Build(wiz)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'seconds': seconds, 'calls': sum(calls.values()),
+            'call_counts': calls, 'peak_bytes': peak,
+            'pads': pads, 'lines': lines}
+
+def Compare(results, baseline, tolerance):
+    """
+    @return: list of regression messages
+    """
+    failures = []
+    for name, new in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if (new['seconds'] > old['seconds'] * (1 + tolerance) and
+                new['seconds'] - old['seconds'] > MIN_SLOWDOWN):
+            failures.append("%s: %.4fs, was %.4fs" %
+                            (name, new['seconds'], old['seconds']))
+        if new['calls'] > old['calls']:
+            failures.append("%s: %d KiCad calls, was %d" %
+                            (name, new['calls'], old['calls']))
+        if new['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            failures.append("%s: peak %d bytes, was %d" %
+                            (name, new['peak_bytes'], old['peak_bytes']))
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the footprint wizards with stand-in KiCad modules.")
+    parser.add_argument('--quick', action='store_true',
+                        help="run a small grid only")
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help="timed builds per case, the best is kept")
+    parser.add_argument('--save', default=None,
+                        help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=None,
+                        help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown and memory growth, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        cases = itertools.chain(Cases('card_edge', QUICK_CARD_EDGE_GRID),
+                                Cases('proto', QUICK_PROTO_GRID))
+    else:
+        cases = itertools.chain(Cases('card_edge', CARD_EDGE_GRID),
+                                Cases('proto', PROTO_GRID))
+
+    results = {}
+    print("%-84s %10s %8s %10s %7s %7s" %
+          ("case", "seconds", "calls", "peak KB", "pads", "lines"))
+    for wizard, values in cases:
+        name = CaseName(wizard, values)
+        r = results[name] = RunCase(wizard, values, args.repeat)
+        print("%-84s %10.4f %8d %10.1f %7d %7d" %
+              (name, r['seconds'], r['calls'], r['peak_bytes'] / 1024,
+               r['pads'], r['lines']))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = Compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print("regression: " + failure, file=sys.stderr)
+        if failures:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
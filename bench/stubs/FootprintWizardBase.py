@@ -0,0 +1,266 @@
+""" Stand-in for KiCad's FootprintWizardBase module, as shipped with KiCad 5.
+    The drawing aids record into a pcbnew stand-in module.
+"""
+
+from __future__ import division
+
+import pcbnew
+from recorder import recorded
+
+uMM = 'mm'
+uMils = 'mils'
+uFloat = 'float'
+uInteger = 'integer'
+uBool = 'bool'
+uRadians = 'radians'
+uDegrees = 'degrees'
+uPercent = '%'
+uString = 'string'
+
+
+class FootprintWizardParameter(object):
+    def __init__(self, page, name, units, default, **kwargs):
+        self.page = page
+        self.name = name
+        self.units = units
+        self.default = default
+        self.raw_value = str(default)
+        self.options = kwargs
+        self.error_list = []
+
+    def ClearErrors(self):
+        self.error_list = []
+
+    def AddError(self, err, info=None):
+        if err in self.error_list:
+            return
+        if info is not None:
+            err = err + " (" + str(info) + ")"
+        self.error_list.append(err)
+
+    def SetValue(self, new_value):
+        self.raw_value = str(new_value)
+
+    @property
+    def value(self):
+        v = str(self.raw_value)
+        if self.units == uInteger:
+            return int(v)
+        if self.units in [uMM, uMils, uFloat, uRadians, uDegrees, uPercent]:
+            v = float(v.replace(",", "."))
+            if self.units == uMM:
+                return pcbnew.FromMM(v)
+            if self.units == uMils:
+                return pcbnew.FromMils(v)
+            return v
+        if self.units == uBool:
+            return v.lower() in ['true', 't', 'y', 'yes', 'on', '1']
+        return v
+
+
+@recorded
+class FootprintWizard(object):
+    uMM = uMM
+    uMils = uMils
+    uFloat = uFloat
+    uInteger = uInteger
+    uBool = uBool
+    uRadians = uRadians
+    uDegrees = uDegrees
+    uPercent = uPercent
+    uString = uString
+
+    def __init__(self):
+        self.params = []
+        self.buildmessages = ""
+        self.GenerateParameterList()
+
+    def AddParam(self, page, name, unit, default, **kwargs):
+        self.params.append(FootprintWizardParameter(page, name, unit, default, **kwargs))
+
+    def CheckParam(self, page, name, **kwargs):
+        pass
+
+    def GetParam(self, page, name):
+        for p in self.params:
+            if p.page == page and p.name == name:
+                return p
+        return None
+
+    def AnyErrors(self):
+        return any(p.error_list for p in self.params)
+
+    @property
+    def parameters(self):
+        pages = {}
+        for p in self.params:
+            pages.setdefault(p.page, {})[p.name] = p.value
+        return pages
+
+    def register(self):
+        pass
+
+    def GetReferencePrefix(self):
+        return "REF"
+
+    def GetTextSize(self):
+        return pcbnew.FromMM(1.0)
+
+    def GetTextThickness(self):
+        return pcbnew.FromMM(0.15)
+
+    def BuildFootprint(self):
+        self.buildmessages = ""
+        self.module = pcbnew.MODULE(None)
+        for p in self.params:
+            p.ClearErrors()
+        self.CheckParameters()
+        if self.AnyErrors():
+            self.buildmessages += "Cannot build footprint: Parameters have errors:\n"
+            for p in self.params:
+                for err in p.error_list:
+                    self.buildmessages += "['%s']['%s']: %s\n" % (p.page, p.name, err)
+            return
+        self.draw = FootprintWizardDrawingAids(self.module)
+        self.module.SetValue(self.GetValue())
+        self.module.SetReference("%s**" % self.GetReferencePrefix())
+        self.module.SetFPID(pcbnew.LIB_ID("", self.module.GetValue()))
+        thick = self.GetTextThickness()
+        self.module.Reference().SetThickness(thick)
+        self.module.Value().SetThickness(thick)
+        self.BuildThisFootprint()
+
+
+@recorded
+class FootprintWizardDrawingAids(object):
+    xfrmIDENTITY = [1, 0, 0, 0, 1, 0]
+
+    flipNone = 0
+    flipX = 1
+    flipY = 2
+    flipBoth = 3
+
+    def __init__(self, module):
+        self.module = module
+        self.dc = {
+            'layer': pcbnew.F_SilkS,
+            'lineThickness': pcbnew.FromMM(0.15),
+            'transforms': [],
+            'transform': self.xfrmIDENTITY
+        }
+
+    def PushTransform(self, mat):
+        self.dc['transforms'].append(mat)
+        self.RecomputeTransforms()
+        return mat
+
+    def PopTransform(self, num=1):
+        for i in range(num):
+            mat = self.dc['transforms'].pop()
+        self.RecomputeTransforms()
+        return mat
+
+    def ResetTransform(self):
+        self.dc['transforms'] = []
+        self.RecomputeTransforms()
+
+    def _ComposeMatricesWithIdentity(self, mats):
+        x = self.xfrmIDENTITY
+        for mat in mats:
+            x = self._ComposeMatrices(x, mat)
+        return x
+
+    def _ComposeMatrices(self, mat1, mat2):
+        return [mat1[0] * mat2[0] + mat1[1] * mat2[3],
+                mat1[0] * mat2[1] + mat1[1] * mat2[4],
+                mat1[0] * mat2[2] + mat1[1] * mat2[5] + mat1[2],
+                mat1[3] * mat2[0] + mat1[4] * mat2[3],
+                mat1[3] * mat2[1] + mat1[4] * mat2[4],
+                mat1[3] * mat2[2] + mat1[4] * mat2[5] + mat1[5]]
+
+    def RecomputeTransforms(self):
+        self.dc['transform'] = self._ComposeMatricesWithIdentity(self.dc['transforms'])
+
+    def TransformTranslate(self, x, y, push=True):
+        mat = [1, 0, x, 0, 1, y]
+        if push:
+            self.PushTransform(mat)
+        return mat
+
+    def TransformFlipOrigin(self, flip, push=True):
+        mats = {self.flipNone: [1, 0, 0, 0, 1, 0],
+                self.flipX: [-1, 0, 0, 0, 1, 0],
+                self.flipY: [1, 0, 0, 0, -1, 0],
+                self.flipBoth: [-1, 0, 0, 0, -1, 0]}
+        mat = mats[flip]
+        if push:
+            self.PushTransform(mat)
+        return mat
+
+    def TransformFlip(self, x, y, flip=flipNone, push=True):
+        mats = [self.TransformTranslate(x, y, push=False),
+                self.TransformFlipOrigin(flip, push=False),
+                self.TransformTranslate(-x, -y, push=False)]
+        mat = self._ComposeMatricesWithIdentity(mats)
+        if push:
+            self.PushTransform(mat)
+        return mat
+
+    def TransformPoint(self, x, y, mat=None):
+        if not mat:
+            mat = self.dc['transform']
+        return pcbnew.wxPoint(x * mat[0] + y * mat[1] + mat[2],
+                              x * mat[3] + y * mat[4] + mat[5])
+
+    def SetLayer(self, layer):
+        self.dc['layer'] = layer
+
+    def GetLayer(self):
+        return self.dc['layer']
+
+    def SetLineThickness(self, lineThickness):
+        self.dc['lineThickness'] = lineThickness
+
+    def GetLineThickness(self):
+        return self.dc['lineThickness']
+
+    def Line(self, x1, y1, x2, y2):
+        outline = pcbnew.EDGE_MODULE(self.module)
+        outline.SetWidth(self.GetLineThickness())
+        outline.SetLayer(self.GetLayer())
+        outline.SetShape(pcbnew.S_SEGMENT)
+        start = self.TransformPoint(x1, y1)
+        end = self.TransformPoint(x2, y2)
+        outline.SetStartEnd(start, end)
+        self.module.Add(outline)
+
+    def VLine(self, x, y, l):
+        self.Line(x, y, x, y + l)
+
+    def HLine(self, x, y, l):
+        self.Line(x, y, x + l, y)
+
+    def Polyline(self, pts, mirrorX=None, mirrorY=None):
+        for i in range(len(pts) - 1):
+            self.Line(pts[i][0], pts[i][1], pts[i+1][0], pts[i+1][1])
+
+    def Box(self, x, y, w, h):
+        self.Polyline([[x - w/2, y - h/2],
+                       [x + w/2, y - h/2],
+                       [x + w/2, y + h/2],
+                       [x - w/2, y + h/2],
+                       [x - w/2, y - h/2]])
+
+    def Reference(self, x, y, size, orientation_degree=0):
+        text = self.module.Reference()
+        text.SetPosition(self.TransformPoint(x, y))
+        text.SetTextSize(pcbnew.wxSize(size, size))
+        text.SetTextAngle(orientation_degree * 10)
+        text.SetLayer(pcbnew.F_SilkS)
+
+    def Value(self, x, y, size, orientation_degree=0):
+        text = self.module.Value()
+        text.SetPosition(self.TransformPoint(x, y))
+        text.SetTextSize(pcbnew.wxSize(size, size))
+        text.SetTextAngle(orientation_degree * 10)
+        text.SetLayer(pcbnew.F_Fab)
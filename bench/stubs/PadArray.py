@@ -0,0 +1,92 @@
+""" Stand-in for KiCad's PadArray module, as shipped with KiCad 5. """
+
+from __future__ import division
+
+import pcbnew
+from recorder import recorded
+
+
+@recorded
+class PadMaker(object):
+    def __init__(self, module):
+        self.module = module
+
+    def THPad(self, Vsize, Hsize, drill, shape=pcbnew.PAD_SHAPE_OVAL, rot_degree=0):
+        pad = pcbnew.D_PAD(self.module)
+        pad.SetSize(pcbnew.wxSize(Hsize, Vsize))
+        pad.SetShape(shape)
+        pad.SetAttribute(pcbnew.PAD_ATTRIB_STANDARD)
+        pad.SetLayerSet(pad.StandardMask())
+        pad.SetDrillSize(pcbnew.wxSize(drill, drill))
+        pad.SetOrientation(rot_degree * 10)
+        return pad
+
+    def THRoundPad(self, size, drill):
+        return self.THPad(size, size, drill, shape=pcbnew.PAD_SHAPE_CIRCLE)
+
+    def SMDPad(self, Vsize, Hsize, shape=pcbnew.PAD_SHAPE_RECT, rot_degree=0):
+        pad = pcbnew.D_PAD(self.module)
+        pad.SetSize(pcbnew.wxSize(Hsize, Vsize))
+        pad.SetShape(shape)
+        pad.SetAttribute(pcbnew.PAD_ATTRIB_SMD)
+        pad.SetLayerSet(pad.SMDMask())
+        pad.SetOrientation(rot_degree * 10)
+        return pad
+
+
+@recorded
+class PadArray(object):
+    def __init__(self, pad):
+        self.firstPadNum = 1
+        self.pinNames = None
+        self.firstPad = None
+        self.pad = pad
+
+    def AddPad(self, pad):
+        self.pad.GetParent().Add(pad)
+
+    def GetPad(self, is_first_pad, pos):
+        if self.firstPad and is_first_pad:
+            pad = self.firstPad
+        else:
+            pad = self.pad
+        pad = pad.Duplicate()
+        pad.SetPos0(pos)
+        pad.SetPosition(pos)
+        return pad
+
+    def GetName(self, *args, **kwargs):
+        if self.pinNames is None:
+            return self.NamingFunction(*args, **kwargs)
+        return self.pinNames
+
+    def NamingFunction(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+@recorded
+class PadGridArray(PadArray):
+    def __init__(self, pad, nx, ny, px, py, centre=pcbnew.wxPoint(0, 0)):
+        super(PadGridArray, self).__init__(pad)
+        self.nx = int(nx)
+        self.ny = int(ny)
+        self.px = px
+        self.py = py
+        self.centre = centre
+
+    def NamingFunction(self, x, y):
+        return self.firstPadNum + (self.nx * y + x)
+
+    def AddPadsToModule(self, dc):
+        pin1posX = self.centre.x - self.px * (self.nx - 1) / 2
+        pin1posY = self.centre.y - self.py * (self.ny - 1) / 2
+
+        for x in range(0, self.nx):
+            posX = pin1posX + (x * self.px)
+
+            for y in range(self.ny):
+                posY = pin1posY + (self.py * y)
+                pos = dc.TransformPoint(posX, posY)
+                pad = self.GetPad(x == 0 and y == 0, pos)
+                pad.SetName(self.GetName(x, y))
+                self.AddPad(pad)
@@ -0,0 +1,361 @@
+""" Stand-in for KiCad's pcbnew module. Records calls instead of drawing.
+
+    Only what the wizards, PadArray and the slot action use is provided.
+    Internal units are nanometres, and wxPoint truncates to whole units like
+    the real one.
+"""
+
+from recorder import recorded, record_functions
+
+IU_PER_MM = 1e6
+IU_PER_MILS = IU_PER_MM * 0.0254
+
+F_Cu = 0
+B_Cu = 31
+B_Mask = 38
+F_Mask = 39
+F_SilkS = 37
+F_CrtYd = 46
+F_Fab = 49
+
+PAD_SHAPE_CIRCLE = 0
+PAD_SHAPE_RECT = 1
+PAD_SHAPE_OVAL = 2
+
+PAD_ATTRIB_STANDARD = 0
+PAD_ATTRIB_SMD = 1
+PAD_ATTRIB_CONN = 2
+
+MOD_DEFAULT = 0
+S_SEGMENT = 0
+S_POLYGON = 4
+
+def FromMM(mm):
+    return int(mm * IU_PER_MM)
+
+def FromMils(mils):
+    return int(mils * IU_PER_MILS)
+
+def Iu2Mils(iu):
+    mils = iu / IU_PER_MILS
+    return int(mils - 0.5 if mils < 0 else mils + 0.5)
+
+def PutOnGridMM(value, gridSizeMM):
+    thresh = FromMM(gridSizeMM)
+    return round(value / thresh) * thresh
+
+record_functions(globals(), ['FromMM', 'FromMils', 'Iu2Mils', 'PutOnGridMM'])
+
+
+class wxPoint(object):
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = int(x)
+        self.y = int(y)
+
+
+class wxSize(object):
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = int(x)
+        self.y = int(y)
+
+    def GetWidth(self):
+        return self.x
+
+    def GetHeight(self):
+        return self.y
+
+
+class LIB_ID(object):
+    def __init__(self, lib, name):
+        self.name = name
+
+
+@recorded
+class D_PAD(object):
+    def __init__(self, module):
+        self.module = module
+        self.size = wxSize(0, 0)
+        self.drill = wxSize(0, 0)
+        self.shape = PAD_SHAPE_CIRCLE
+        self.attribute = PAD_ATTRIB_STANDARD
+        self.layers = None
+        self.pos = wxPoint(0, 0)
+        self.name = ""
+
+    def GetParent(self):
+        return self.module
+
+    def SetSize(self, size):
+        self.size = size
+
+    def GetSize(self):
+        return self.size
+
+    def SetDrillSize(self, size):
+        self.drill = size
+
+    def GetDrillSize(self):
+        return self.drill
+
+    def SetShape(self, shape):
+        self.shape = shape
+
+    def SetAttribute(self, attribute):
+        self.attribute = attribute
+
+    def SetLayerSet(self, layers):
+        self.layers = layers
+
+    def StandardMask(self):
+        return 'StandardMask'
+
+    def SMDMask(self):
+        return 'SMDMask'
+
+    def SetOrientation(self, orientation):
+        pass
+
+    def SetPos0(self, pos):
+        pass
+
+    def SetPosition(self, pos):
+        self.pos = pos
+
+    def SetName(self, name):
+        self.name = str(name)
+
+    def GetName(self):
+        return self.name
+
+    def SetNet(self, net):
+        self.net = net
+
+    def Duplicate(self):
+        pad = D_PAD(self.module)
+        pad.__dict__.update(self.__dict__)
+        return pad
+
+
+@recorded
+class EDGE_MODULE(object):
+    def __init__(self, module):
+        self.module = module
+
+    def SetWidth(self, width):
+        self.width = width
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def SetShape(self, shape):
+        self.shape = shape
+
+    def SetStartEnd(self, start, end):
+        self.start = start
+        self.end = end
+
+    def SetPolyPoints(self, points):
+        self.points = points
+
+
+@recorded
+class TEXTE_MODULE(object):
+    def __init__(self):
+        self.text = ""
+        self.pos = wxPoint(0, 0)
+
+    def SetText(self, text):
+        self.text = text
+
+    def GetText(self):
+        return self.text
+
+    def SetPosition(self, pos):
+        self.pos = pos
+
+    def SetPos0(self, pos):
+        pass
+
+    def SetTextSize(self, size):
+        self.size = size
+
+    def SetTextAngle(self, angle):
+        self.angle = angle
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def SetThickness(self, thickness):
+        self.thickness = thickness
+
+
+@recorded
+class MODULE(object):
+    def __init__(self, parent=None):
+        """
+        @param parent: the BOARD, or a MODULE to copy with its pads
+        """
+        self.items = []
+        self.reference = TEXTE_MODULE()
+        self.value = TEXTE_MODULE()
+        self.position = wxPoint(0, 0)
+        self.orientation = 0
+        if isinstance(parent, MODULE):
+            for pad in parent.Pads():
+                pad = pad.Duplicate()
+                pad.module = self
+                self.items.append(pad)
+            self.SetValue(parent.GetValue())
+            self.__dict__.update((k, v) for k, v in parent.__dict__.items()
+                                 if k in ('description', 'attributes', 'fpid'))
+
+    def Add(self, item):
+        self.items.append(item)
+
+    def Reference(self):
+        return self.reference
+
+    def Value(self):
+        return self.value
+
+    def SetReference(self, text):
+        self.reference.SetText(text)
+
+    def SetValue(self, text):
+        self.value.SetText(text)
+
+    def GetValue(self):
+        return self.value.GetText()
+
+    def GetReference(self):
+        return self.reference.GetText()
+
+    def SetDescription(self, description):
+        self.description = description
+
+    def GetDescription(self):
+        return getattr(self, 'description', "")
+
+    def SetPosition(self, pos):
+        """
+        Moves the pads along; the orientation is only recorded.
+        """
+        for pad in self.Pads():
+            pad.pos = wxPoint(pad.pos.x + pos.x - self.position.x,
+                              pad.pos.y + pos.y - self.position.y)
+        self.position = pos
+
+    def GetPosition(self):
+        return self.position
+
+    def SetOrientation(self, orientation):
+        self.orientation = orientation
+
+    def GetOrientation(self):
+        return self.orientation
+
+    def IsFlipped(self):
+        return False
+
+    def IsSelected(self):
+        return False
+
+    def SetAttributes(self, attributes):
+        self.attributes = attributes
+
+    def SetFPID(self, fpid):
+        self.fpid = fpid
+
+    def Pads(self):
+        return [i for i in self.items if isinstance(i, D_PAD)]
+
+    def GraphicalItems(self):
+        return [i for i in self.items if isinstance(i, EDGE_MODULE)]
+
+
+class NETINFO_ITEM(object):
+    def __init__(self, board, name):
+        self.name = name
+
+    def GetNetname(self):
+        return self.name
+
+
+class TRACK(object):
+    def __init__(self, board):
+        self.net = None
+
+    def SetStart(self, pos):
+        self.start = pos
+
+    def GetStart(self):
+        return self.start
+
+    def SetEnd(self, pos):
+        self.end = pos
+
+    def GetEnd(self):
+        return self.end
+
+    def SetWidth(self, width):
+        self.width = width
+
+    def GetWidth(self):
+        return self.width
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def GetLayer(self):
+        return self.layer
+
+    def SetNet(self, net):
+        self.net = net
+
+    def GetNetname(self):
+        return self.net.GetNetname() if self.net else ""
+
+
+class BOARD(object):
+    def __init__(self):
+        self.modules = []
+        self.tracks = []
+        self.nets = {}
+
+    def GetModules(self):
+        return list(self.modules)
+
+    def GetTracks(self):
+        return list(self.tracks)
+
+    def FindNet(self, name):
+        return self.nets.get(name)
+
+    def Add(self, item):
+        if isinstance(item, MODULE):
+            self.modules.append(item)
+        elif isinstance(item, TRACK):
+            self.tracks.append(item)
+        else:
+            self.nets[item.GetNetname()] = item
+
+    def Remove(self, item):
+        if isinstance(item, MODULE):
+            self.modules.remove(item)
+        else:
+            self.tracks.remove(item)
+
+
+class ActionPlugin(object):
+    def __init__(self):
+        self.defaults()
+
+    def defaults(self):
+        pass
+
+    def register(self):
+        pass
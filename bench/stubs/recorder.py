@@ -0,0 +1,29 @@
+""" Call recording for the benchmark stand-ins of the KiCad modules. """
+
+from collections import Counter
+import functools
+
+CALLS = Counter()
+
+def _Wrap(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        CALLS[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+def recorded(cls):
+    """
+    Class decorator counting every call of the public methods in CALLS.
+    """
+    for name, fn in list(vars(cls).items()):
+        if callable(fn) and not name.startswith('_'):
+            setattr(cls, name, _Wrap(cls.__name__ + '.' + name, fn))
+    return cls
+
+def record_functions(namespace, names):
+    """
+    Count the calls of module level functions in CALLS.
+    """
+    for name in names:
+        namespace[name] = _Wrap(name, namespace[name])
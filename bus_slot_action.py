@@ -0,0 +1,255 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Board action of instanced slot mode.
+
+    Places the connector slots behind a card edge fingers footprint (made
+    by the Card Edge Fingers wizard) and lays the bus down as tracks. Run
+    again with another count, it moves, adds or removes slots and replaces
+    the bus tracks, so the fingers and slots are never regenerated.
+
+    KiCad records everything an action plugin changes as one undo step.
+"""
+
+from __future__ import division
+import math
+
+import pcbnew
+import FootprintWizardBase
+
+# The layout and the emitter are imported when the action runs.
+import footprint_plan as FP
+import card_edge_slots as CS
+
+# Slot references and bus net names, from the fingers reference.
+SLOT_REFERENCE = "%s_S%d"
+NET_NAME = "%s_BUS_%s"
+
+def FingersModule(board):
+    """
+    The fingers footprint to place slots for: the selected one, or the only
+    one on the board.
+    @return: the MODULE
+    """
+    fingers = [m for m in board.GetModules()
+               if CS.SLOT_PARAMS_TAG in m.GetDescription()]
+    selected = [m for m in fingers if m.IsSelected()]
+    if len(selected) == 1:
+        return selected[0]
+    if len(fingers) == 1 and not selected:
+        return fingers[0]
+    raise ValueError("Select one footprint made by the Card Edge Fingers wizard")
+
+def SlotModules(board, fingers):
+    """
+    @return: dict of slot number to the slot MODULE placed for the fingers
+    """
+    prefix = (SLOT_REFERENCE % (fingers.GetReference(), 0))[:-1]
+    slots = {}
+    for module in board.GetModules():
+        name = module.GetReference()
+        if name.startswith(prefix) and name[len(prefix):].isdigit():
+            slots[int(name[len(prefix):])] = module
+    return slots
+
+def BoardMatrix(module):
+    """
+    The transform from footprint to board coordinates, rotating as
+    KiCad's RotatePoint does.
+    """
+    angle = module.GetOrientation() * math.pi / 1800
+    c = math.cos(angle)
+    s = math.sin(angle)
+    pos = module.GetPosition()
+    return [c, s, pos.x, -s, c, pos.y]
+
+def BoardPoint(mat, x, y):
+    """
+    Footprint coordinates are truncated to whole units first, as the
+    monolithic footprint holds them.
+    """
+    x, y = FP.ApplyMatrix(mat, int(x), int(y))
+    return pcbnew.wxPoint(int(round(x)), int(round(y)))
+
+def FingersMatrix(slot, pitch):
+    """
+    The BoardMatrix of the fingers a slot was placed for, from the slot
+    next to them, so it is found where it was placed.
+    @param slot: the MODULE of slot 1
+    @param pitch: the connector spacing
+    """
+    mat = BoardMatrix(slot)
+    pos = slot.GetPosition()
+    mat[2] = mat[5] = 0
+    offset = BoardPoint(mat, 0, -pitch)
+    mat[2] = pos.x - offset.x
+    mat[5] = pos.y - offset.y
+    return mat
+
+def TrackKey(start, end, width, layer):
+    return (start.x, start.y, end.x, end.y, width, layer)
+
+def LaidTracks(params, slots):
+    """
+    The bus tracks a previous run laid, as they were placed, so those
+    without a bus net are found again too.
+    @param slots: dict of slot number to the slot MODULE on the board
+    @return: set of TrackKey
+    """
+    import plan_emitter as PE
+    import slot_layout as SL
+
+    if 1 not in slots:
+        return set()
+    layout = SL.LayoutSlots(params, max(slots))
+    mat = FingersMatrix(slots[1], params[FP.CON_PAGE][FP.CON_SPACING_KEY])
+    return set(TrackKey(BoardPoint(mat, s.x1, s.y1),
+                        BoardPoint(mat, s.x2, s.y2),
+                        int(s.width), PE.LAYERS[s.layer])
+               for name, s in layout.tracks)
+
+def SlotPrototype(board, params):
+    """
+    @return: a slot MODULE at the origin, built from the plan
+    """
+    import plan_emitter as PE
+    plan = FP.FootprintPlan()
+    CS.BuildCardEdgeSlot(params, plan)
+    module = pcbnew.MODULE(board)
+    module.SetValue(plan.value)
+    module.SetFPID(pcbnew.LIB_ID("", plan.value))
+    prototypes = dict((name, PE.PadPrototype(module, kind))
+                      for name, kind in plan.padKinds.items())
+    PE.EmitPlan(plan, module,
+                FootprintWizardBase.FootprintWizardDrawingAids(module),
+                prototypes)
+    return module
+
+def BoardNets(board, reference, names):
+    """
+    @param names: the net names of the layout
+    @return: dict of layout net name to the board NETINFO_ITEM, made if missing
+    """
+    nets = {}
+    for name in set(names):
+        netName = NET_NAME % (reference, name)
+        net = board.FindNet(netName)
+        if net is None:
+            net = pcbnew.NETINFO_ITEM(board, netName)
+            board.Add(net)
+        nets[name] = net
+    return nets
+
+def PlaceSlots(board, fingers, count):
+    """
+    Place count slots behind the fingers and lay the bus tracks, reusing
+    the slots and nets already on the board.
+    @param board: the BOARD
+    @param fingers: the fingers MODULE
+    @param count: the number of slots
+    @return: (slots added, slots removed, tracks laid)
+    """
+    import plan_emitter as PE
+    import slot_layout as SL
+
+    if fingers.IsFlipped():
+        raise ValueError("Slots cannot be placed for fingers on the bottom side")
+    params = CS.SlotParameters(fingers.GetDescription())
+    layout = SL.LayoutSlots(params, count)
+    reference = fingers.GetReference()
+    mat = BoardMatrix(fingers)
+
+    # Slots: the first count are kept or added, the rest removed.
+    existing = SlotModules(board, fingers)
+    laid = LaidTracks(params, existing)
+    prototype = None
+    added = 0
+    modules = []
+    for n, (x, y) in enumerate(layout.slots):
+        module = existing.pop(n + 1, None)
+        if module is None:
+            if prototype is None:
+                prototype = SlotPrototype(board, params)
+            module = pcbnew.MODULE(prototype)
+            module.SetReference(SLOT_REFERENCE % (reference, n + 1))
+            board.Add(module)
+            added += 1
+        module.SetPosition(BoardPoint(mat, x, y))
+        module.SetOrientation(fingers.GetOrientation())
+        modules.append(module)
+    for module in existing.values():
+        board.Remove(module)
+
+    # Nets of the bus, on the pads of the fingers and slots.
+    nets = BoardNets(board, reference, layout.nets.values())
+    for module in [fingers] + modules:
+        for pad in module.Pads():
+            name = layout.nets.get(pad.GetName())
+            if name is not None:
+                pad.SetNet(nets[name])
+
+    # The old bus tracks make way for the new ones: those on the bus nets,
+    # and those laid where the last run placed the slots.
+    prefix = NET_NAME % (reference, "")
+    for track in list(board.GetTracks()):
+        if (track.GetNetname().startswith(prefix) or
+                TrackKey(track.GetStart(), track.GetEnd(), track.GetWidth(),
+                         track.GetLayer()) in laid):
+            board.Remove(track)
+    for name, s in layout.tracks:
+        track = pcbnew.TRACK(board)
+        track.SetStart(BoardPoint(mat, s.x1, s.y1))
+        track.SetEnd(BoardPoint(mat, s.x2, s.y2))
+        track.SetWidth(int(s.width))
+        track.SetLayer(PE.LAYERS[s.layer])
+        if name is not None:
+            track.SetNet(nets[name])
+        board.Add(track)
+
+    return added, len(existing), len(layout.tracks)
+
+
+class BusSlotAction(pcbnew.ActionPlugin):
+
+    def defaults(self):
+        self.name = "Place Card Edge Bus Slots"
+        self.category = "Modify PCB"
+        self.description = ("Place connector slots and bus tracks behind "
+                            "a card edge fingers footprint")
+
+    def Run(self):
+        import wx
+
+        board = pcbnew.GetBoard()
+        try:
+            fingers = FingersModule(board)
+            slots = SlotModules(board, fingers)
+            current = len(slots) or CS.SlotParameters(
+                fingers.GetDescription())[FP.CON_PAGE][FP.CON_COUNT_KEY]
+            count = wx.GetNumberFromUser(
+                "Connector slots behind %s" % fingers.GetReference(),
+                "Slots:", self.name, current, 0, 1000)
+            if count < 0:
+                return
+            added, removed, tracks = PlaceSlots(board, fingers, count)
+        except ValueError as e:
+            wx.MessageBox(str(e), self.name)
+            return
+        pcbnew.Refresh()
+        wx.MessageBox("%d slots added, %d removed, %d bus tracks laid" %
+                      (added, removed, tracks), self.name)
+
+BusSlotAction().register()
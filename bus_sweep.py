@@ -0,0 +1,256 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Parameter sweep of the card edge bus connector.
+
+    Builds every variant of a parameter grid with the card edge geometry,
+    without KiCad, checks its copper clearance and ranks the variants that
+    pass. Variants are evaluated across a process pool.
+
+    usage: python bus_sweep.py sweep.json [--top 20] [--csv ranked.csv]
+
+    The grid file has the format of footprint_batch.py, with card_edge jobs
+    only ("name" is not used):
+
+    {"wizard": "card_edge",
+     "grid": {"pad pitch": [2.54, 3.175, 3.96],
+              "row spacing": [3.81, 5.08],
+              "stagger vias": [false, true],
+              "fat traces": ["1 2 42 43", "1 2 3 41 42 43"],
+              "connector spacing": [15.24, 19.05]},
+     "fixed": {"connector count": 8, "fat trace polygons": true}}
+
+    Every variant is scored for
+        margin:  the smallest gap between copper of different nets, less
+                 the "clearance" parameter; gaps are searched up to
+                 --window beyond the clearance, larger margins are cut there.
+                 The fat trace polygons are grown up to the clearance from
+                 their neighbours, so gaps to a polygon only count when
+                 they are below the clearance.
+        power:   the narrowest copper of a fat trace pin
+        length:  the total length of the bus copper
+        items:   pads, lines and polygons of the finished footprint
+
+    A variant is feasible when it has no shorts, a margin of 0 or more, and
+    at least --min-power-width of copper on every fat trace pin. Feasible
+    variants are ranked by largest margin, then shortest copper, then fewest
+    items. A variant's margin is thus set by its pads and lines, and
+    variants with polygons compete on the slack of the rest of the bus.
+
+    Connectors repeat along the bus, so the clearance is checked on the
+    first three connectors only: the one at the card edge, one between two
+    others, and the last one. The check is shared by the variants that
+    differ in connector count only.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import csv
+import math
+import multiprocessing
+import sys
+from collections import namedtuple
+
+import footprint_plan as FP
+import card_edge_preview as CP
+import clearance_check as CC
+import footprint_batch
+
+# Connectors needed to see every neighbourhood of the bus.
+CHECK_CONNECTORS = CP.CHECK_CONNECTORS
+
+Score = namedtuple('Score', 'margin shorts power length items')
+
+def CheckValues(values):
+    """
+    The parameters of the shorter bus that is clearance checked.
+    """
+    values = dict(values)
+    count = values.get(FP.CON_COUNT_KEY,
+                       FP.DialogValues(FP.CARD_EDGE_PARAMS)[FP.CON_COUNT_KEY])
+    values[FP.CON_COUNT_KEY] = min(int(count), CHECK_CONNECTORS)
+    return values
+
+def CheckVariant(args):
+    """
+    Clearance check of one variant.
+    @param args: (dict of parameter values, search window in internal units)
+    @return: (margin, number of shorts)
+    """
+    values, window = args
+    params = FP.Parameters(FP.CARD_EDGE_PARAMS, values)
+    plan = FP.FootprintPlan()
+    FP.BuildCardEdge(params, plan)
+    clearance = params[FP.PAD_PAGE][FP.CLEARANCE_KEY]
+    violations, shorts = CC.CheckPlan(plan, clearance + window, ('finger',))
+    designed = [v for v in violations if Designed(v)]
+    others = [v for v in violations if not Designed(v)]
+    margin = others[0].gap - clearance if others else window
+    if designed and designed[0].gap < clearance:
+        margin = min(margin, designed[0].gap - clearance)
+    return margin, len(shorts)
+
+def Designed(violation):
+    """
+    @return: True for a gap to a fat trace polygon, which is the clearance
+             by design
+    """
+    return (violation.first.startswith("polygon") or
+            violation.second.startswith("polygon"))
+
+def PowerWidth(params):
+    """
+    @return: the narrowest copper of the fat trace pins, None without any
+    """
+    spec = FP.CompileCardEdge(params)
+    if not spec.fat_pins:
+        return None
+
+    # As the fat bus lines of BusConGrid.BusSegments.
+    widths = dict((str(p), spec.wide_width) for p in spec.fat_pins)
+    polygons = {}
+    for name, layer, path, half in FP.FatPinPaths(spec):
+        polygons[name] = min(polygons.get(name, 2*half), 2*half)
+    widths.update(polygons)
+    return min(widths.values())
+
+def CopperLength(plan):
+    """
+    @return: the length of the copper lines, and of the polygons along their
+             longer side
+    """
+    length = 0
+    for s in plan.segments:
+        if s.layer in CC.COPPER_LAYERS:
+            length += math.hypot(s.x2 - s.x1, s.y2 - s.y1)
+    for p in plan.polygons:
+        if p.layer in CC.COPPER_LAYERS:
+            points = list(p.points) + [p.points[0]]
+            length += sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2)
+                          in zip(points, points[1:])) / 2
+    return length
+
+def MeasureVariant(values):
+    """
+    Build one variant completely.
+    @return: (power width or None, copper length, item count)
+    """
+    spec = FP.CompileCardEdge(FP.Parameters(FP.CARD_EDGE_PARAMS, values))
+    plan = FP.CardEdgePlan(spec)
+    items = len(plan.pads) + len(plan.segments) + len(plan.polygons)
+    return PowerWidth(spec), CopperLength(plan), items
+
+def Feasible(score, minPower):
+    return (score.shorts == 0 and score.margin >= 0 and
+            (score.power is None or score.power >= minPower))
+
+def Rank(variants, scores, minPower):
+    """
+    @return: list of (values, score) of the feasible variants, best first
+    """
+    ranked = [(values, score) for values, score in zip(variants, scores)
+              if Feasible(score, minPower)]
+    ranked.sort(key=lambda r: (-r[1].margin, r[1].length, r[1].items))
+    return ranked
+
+def Sweep(variants, window, jobs=None):
+    """
+    Score every variant.
+    @param variants: list of dicts of parameter values, in dialog units
+    @param window: the margin search window, in internal units
+    @param jobs: the number of worker processes, all CPUs by default
+    @return: list of Score, in the order of the variants
+    """
+    checks = []
+    checkIndex = {}
+    variantChecks = []
+    for values in variants:
+        key = FP.ParametersKey(FP.Parameters(FP.CARD_EDGE_PARAMS,
+                                             CheckValues(values)))
+        if key not in checkIndex:
+            checkIndex[key] = len(checks)
+            checks.append((CheckValues(values), window))
+        variantChecks.append(checkIndex[key])
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        chunk = max(1, len(variants) // (4 * (jobs or multiprocessing.cpu_count())))
+        checked = pool.map(CheckVariant, checks, chunksize=chunk)
+        measured = pool.map(MeasureVariant, variants, chunksize=chunk)
+    finally:
+        pool.close()
+        pool.join()
+
+    return [Score(checked[c][0], checked[c][1], power, length, items)
+            for c, (power, length, items) in zip(variantChecks, measured)]
+
+def MM(iu):
+    return "-" if iu is None else "%.3f" % (iu / FP.IU_PER_MM)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rank the card edge layouts of a parameter grid.")
+    parser.add_argument('grids', help="JSON file with the parameter grids")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument('--window', type=float, default=0.5,
+                        help="clearance margins are searched up to this many mm")
+    parser.add_argument('--min-power-width', type=float, default=0,
+                        help="narrowest copper allowed on fat trace pins, in mm")
+    parser.add_argument('--top', type=int, default=20,
+                        help="rows of the ranked table to print, 0 for all")
+    parser.add_argument('--csv', default=None,
+                        help="write every feasible variant to this CSV file")
+    args = parser.parse_args(argv)
+
+    variants = []
+    for wizard, template, values in footprint_batch.Variants(
+            footprint_batch.LoadJobs(args.grids)):
+        if wizard != 'card_edge':
+            parser.error("only card_edge grids can be swept, not %s" % wizard)
+        variants.append(values)
+    keys = []
+    for values in variants:
+        keys.extend(k for k in values if k not in keys)
+
+    scores = Sweep(variants, FP.FromMM(args.window), args.jobs)
+    ranked = Rank(variants, scores, FP.FromMM(args.min_power_width))
+
+    columns = ["margin", "power", "length", "items"] + keys
+    rows = []
+    for values, score in ranked:
+        rows.append([MM(score.margin), MM(score.power),
+                     "%.1f" % (score.length / FP.IU_PER_MM), str(score.items)]
+                    + [str(values.get(k, "")) for k in keys])
+
+    shown = rows[:args.top] if args.top else rows
+    widths = [max([len(c)] + [len(r[i]) for r in shown])
+              for i, c in enumerate(columns)]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for row in shown:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+    print("%d of %d layouts feasible" % (len(ranked), len(variants)))
+
+    if args.csv:
+        with open(args.csv, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    return 0 if ranked else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
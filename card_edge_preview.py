@@ -0,0 +1,130 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+""" Low detail preview of the card edge bus connector.
+
+    The wizard dialog rebuilds on every edit, so while "low detail preview"
+    is ticked the card edge is drawn in full only for the fingers and the
+    first and last connectors, and only a few connectors are clearance
+    checked. The preview builds and checks in constant time.
+"""
+
+from __future__ import division
+
+import footprint_plan as FP
+
+# The connectors between the first and last are outlines on F.Fab, and what
+# they leave out is summed up in the description, after this tag.
+PREVIEW_TAG = 'low detail preview: '
+
+# Connectors needed to see every neighbourhood of the bus.
+CHECK_CONNECTORS = 3
+
+def PreviewSummary(spec, slot):
+    """
+    @param spec: the CardEdgeSpec
+    @param slot: a plan holding one connector away from the card edge
+    @return: what the preview leaves out, in words
+    """
+    middle = max(spec.num_cons - 2, 0)
+    if not middle:
+        return "every connector drawn"
+    return ("connectors 2 to %d drawn as outlines, %d pads and %d bus segments "
+            "left out (%d pads and %d bus segments per connector, %d fat traces)"
+            % (spec.num_cons - 1, middle * len(slot.pads),
+               middle * len(slot.segments), len(slot.pads),
+               len(slot.segments), len(spec.fat_pins)))
+
+def BuildCardEdgePreview(params, plan, timer=None):
+    """
+    Compute the low detail preview of the card edge bus connector: the
+    finger pads, the first and last connectors with their bus lines, and
+    the connectors between as outline boxes on F.Fab.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @param plan: the FootprintPlan (or compatible sink) to fill
+    @param timer: optional PhaseTimer recording the build phases
+    """
+    if timer:
+        plan = timer.Sink(plan)
+
+    spec = FP.CompileCardEdge(params)
+    num_cons = spec.num_cons
+
+    # The last connector, with the bus lines from the one before.
+    last = FP.FootprintPlan()
+    if num_cons > 1:
+        FP.AddCardEdgeSlots(spec, FP.PlanDrawingAids(last), num_cons - 1, 1)
+
+    desc = "%s-%d" % ("Card_Edge_Connector", spec.num_pos)
+    plan.SetHeader(desc, "%s, %s%s" % (desc, PREVIEW_TAG,
+                                       PreviewSummary(spec, last)), 1)
+
+    plan.AddPadKind('con', spec.via)
+    plan.AddPadKind('finger', spec.finger)
+
+    dc = FP.PlanDrawingAids(plan)
+
+    array = FP.BusConGrid(spec.num_pos, 1, spec.pad_pitch, 0)
+    array.setNaming(spec.alpha_name, spec.alpha_skip)
+    array.AddPadsToPlan(dc, 'finger')
+    if timer:
+        timer.Mark("finger pads")
+
+    FP.AddCardEdgeSlots(spec, dc, 0, min(num_cons, 1), timer)
+
+    # The connectors between, as boxes around their pads.
+    dc.SetLayer('F.Fab')
+    dc.SetLineThickness(FP.FromMM(0.1))
+    boxW = spec.pad_pitch * (spec.num_pos - 1) + spec.stagger + spec.via_width
+    boxH = spec.row_pitch + spec.via_width
+    for connum in range(1, num_cons - 1):
+        dc.Box(spec.stagger / 2, -spec.con_pitch * (connum + 1), boxW, boxH)
+
+    plan.AddPads(last.pads)
+    plan.AddSegments(last.segments)
+    if timer:
+        timer.Mark("connector outlines and last connector")
+
+    if FP.AddFatPinPolygons(spec, dc) and timer:
+        timer.Mark("fat trace polygons")
+
+    FP.AddCardEdgeOutline(spec, dc)
+    if timer:
+        timer.Mark("courtyard and text")
+
+def FinishCardEdgePreview(params, plan, timer=None):
+    """
+    The low detail preview is shown as built, with what it leaves out.
+    @return: (the plan, report text)
+    """
+    summary = plan.description.partition(PREVIEW_TAG)[2]
+    return plan, ("Low detail preview: %s. Untick '%s' before saving the "
+                  "footprint, to build it in full.\n"
+                  % (summary, FP.PREVIEW_KEY))
+
+def PreviewCheckSpec(params):
+    """
+    The spec of the shorter bus that is clearance checked while previewing;
+    the connectors repeat, so a few show every neighbourhood of the bus.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @return: the CardEdgeSpec, at most CHECK_CONNECTORS connectors long
+    """
+    params = FP.CompileCardEdge(params).Parameters()
+    cons = params[FP.CON_PAGE]
+    cons[FP.CON_COUNT_KEY] = min(cons[FP.CON_COUNT_KEY], CHECK_CONNECTORS)
+    cons[FP.PREVIEW_KEY] = False
+    return FP.CardEdgeSpec(params)
@@ -0,0 +1,139 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+""" Footprints of instanced slot mode.
+
+    In instanced slot mode the card edge is one footprint holding the
+    fingers and one footprint per connector slot, placed on the board by
+    bus_slot_action. The fingers footprint carries the wizard parameters in
+    its description, so the slots and bus tracks can be laid out from it.
+"""
+
+from __future__ import division
+import json
+
+import footprint_plan as FP
+
+# The wizard parameters follow this tag in the fingers description.
+SLOT_PARAMS_TAG = 'slot parameters '
+
+def CardEdgeFingersValue(params):
+    return "%s-%d" % ("Card_Edge_Fingers",
+                      params[FP.PAD_PAGE][FP.POS_COUNT_KEY])
+
+def CardEdgeSlotValue(params):
+    return "%s-%d" % ("Card_Edge_Slot",
+                      params[FP.PAD_PAGE][FP.POS_COUNT_KEY])
+
+def SlotParameters(description):
+    """
+    @param description: the description of a card edge fingers footprint
+    @return: the wizard parameters it was built with, None if it has none
+    """
+    start = description.find(SLOT_PARAMS_TAG)
+    if start < 0:
+        return None
+    return json.loads(description[start + len(SLOT_PARAMS_TAG):])
+
+def InstancedParameters(params, count):
+    """
+    The parameters of the monolithic footprint matching count placed slots.
+    The fat traces become real tracks, not polygons.
+    @param params: the wizard parameters or their CardEdgeSpec
+    """
+    params = FP.CompileCardEdge(params).Parameters()
+    params[FP.CON_PAGE][FP.CON_COUNT_KEY] = count
+    params[FP.PAD_PAGE][FP.FAT_POLYGON_KEY] = False
+    return params
+
+def BuildCardEdgeFingers(params, plan, timer=None):
+    """
+    Compute the card edge fingers footprint of instanced slot mode.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @param plan: the FootprintPlan (or compatible sink) to fill
+    @param timer: optional PhaseTimer recording the build phases
+    """
+    if timer:
+        plan = timer.Sink(plan)
+
+    spec = FP.CompileCardEdge(params)
+    value = "%s-%d" % ("Card_Edge_Fingers", spec.num_pos)
+    plan.SetHeader(value, "%s, %s%s" % (value, SLOT_PARAMS_TAG,
+                                        json.dumps(spec.Parameters(),
+                                                   sort_keys=True)), 1)
+    plan.AddPadKind('finger', spec.finger)
+
+    dc = FP.PlanDrawingAids(plan)
+    array = FP.BusConGrid(spec.num_pos, 1, spec.pad_pitch, 0)
+    array.setNaming(spec.alpha_name, spec.alpha_skip)
+    array.AddPadsToPlan(dc, 'finger')
+    if timer:
+        timer.Mark("finger pads")
+
+    FP.AddCardEdgeOutline(spec, dc)
+    if timer:
+        timer.Mark("courtyard and text")
+
+def BuildCardEdgeSlot(params, plan, timer=None):
+    """
+    Compute the connector footprint of instanced slot mode: the pads of one
+    connector, centred on the origin. Slot n is placed n connector spacings
+    from the fingers, the first one a single spacing away.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @param plan: the FootprintPlan (or compatible sink) to fill
+    @param timer: optional PhaseTimer recording the build phases
+    """
+    if timer:
+        plan = timer.Sink(plan)
+
+    spec = FP.CompileCardEdge(params)
+    num_pos = spec.num_pos
+    pad_pitch = spec.pad_pitch
+    row_pitch = spec.row_pitch
+    stagger = spec.stagger
+    via = spec.via
+
+    value = "%s-%d" % ("Card_Edge_Slot", num_pos)
+    plan.SetHeader(value, value, 0)
+    plan.AddPadKind('con', via)
+
+    # One connector laid out as the first slot, moved back onto the origin.
+    slot = FP.FootprintPlan()
+    dc = FP.PlanDrawingAids(slot)
+    dc.TransformTranslate(0, spec.con_pitch)
+    FP.AddCardEdgeSlots(FP.CompileCardEdge(InstancedParameters(spec, 1)), dc,
+                        0, 1)
+    for pad in slot.pads:
+        plan.AddPad(pad)
+    if timer:
+        timer.Mark("connector pads")
+
+    # Courtyard
+    dc = FP.PlanDrawingAids(plan)
+    margin = FP.FromMM(0.5)
+    boxW = (num_pos - 1) * pad_pitch + stagger + via.sizeX + 2*margin
+    boxH = row_pitch + via.sizeY + 2*margin
+    dc.SetLayer('F.CrtYd')
+    dc.SetLineThickness(FP.FromMM(0.05))
+    dc.Box(stagger/2, 0, boxW, boxH)
+
+    # reference and value
+    text_size = FP.FromMM(1.0)  # According KLC
+    dc.Value(0, boxH/2 + text_size, text_size)
+    dc.Reference(0, -boxH/2 - text_size, text_size)
+    if timer:
+        timer.Mark("courtyard and text")
@@ -0,0 +1,270 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Copper clearance check of a footprint plan.
+
+    The footprint has no nets, so copper items that touch are taken to be
+    one net. Items of different nets closer than the clearance are
+    violations, and a net joining pads that must stay apart, like two card
+    edge fingers, is a short.
+
+    Items are bucketed into a uniform grid and only items sharing a cell are
+    compared, so the check runs in about linear time.
+"""
+
+from __future__ import division
+from collections import namedtuple
+import math
+
+import footprint_plan as FP
+
+COPPER_LAYERS = ('F.Cu', 'B.Cu')
+
+# A copper item: a capsule (a segment with a radius, a round pad is one
+# of length 0) or a polygon.
+Shape = namedtuple('Shape', 'layers x1 y1 x2 y2 radius points what')
+
+# Two items of different nets closer than the clearance.
+Violation = namedtuple('Violation', 'gap layer first second')
+
+# Copper joining pads that must stay apart.
+Short = namedtuple('Short', 'pads')
+
+def CopperLayers(layers):
+    return tuple(l for l in COPPER_LAYERS if l in layers or '*.Cu' in layers)
+
+def MM(iu):
+    return "%.3f" % (iu / FP.IU_PER_MM)
+
+def PlanShapes(plan):
+    """
+    The copper items of a plan, with coordinates in whole units as KiCad
+    stores them.
+    @return: list of Shape
+    """
+    shapes = []
+    for kind, name, x, y in plan.pads.Rows():
+        kind = plan.padKinds[kind]
+        layers = CopperLayers(kind.layers)
+        x, y = int(x), int(y)
+        what = "pad %s at (%s, %s)" % (name, MM(x), MM(y))
+        if kind.shape == 'rect':
+            w, h = kind.sizeX / 2, kind.sizeY / 2
+            shapes.append(Shape(layers, x, y, x, y, 0,
+                                ((x-w, y-h), (x+w, y-h), (x+w, y+h), (x-w, y+h)),
+                                what))
+        elif kind.sizeX > kind.sizeY:
+            d = (kind.sizeX - kind.sizeY) / 2
+            shapes.append(Shape(layers, x-d, y, x+d, y, kind.sizeY/2, None, what))
+        else:
+            d = (kind.sizeY - kind.sizeX) / 2
+            shapes.append(Shape(layers, x, y-d, x, y+d, kind.sizeX/2, None, what))
+
+    for layer, width, x1, y1, x2, y2 in plan.segments.Rows():
+        if layer not in COPPER_LAYERS:
+            continue
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        shapes.append(Shape((layer,), x1, y1, x2, y2, width / 2, None,
+                            "line (%s, %s)-(%s, %s)" % (MM(x1), MM(y1),
+                                                        MM(x2), MM(y2))))
+
+    for p in getattr(plan, 'polygons', ()):
+        if p.layer not in COPPER_LAYERS:
+            continue
+        points = tuple((int(x), int(y)) for x, y in p.points)
+        x, y = points[0]
+        shapes.append(Shape((p.layer,), x, y, x, y, p.width / 2, points,
+                            "polygon at (%s, %s)" % (MM(x), MM(y))))
+    return shapes
+
+def BoundingBox(shape):
+    if shape.points:
+        xs = [p[0] for p in shape.points]
+        ys = [p[1] for p in shape.points]
+    else:
+        xs = (shape.x1, shape.x2)
+        ys = (shape.y1, shape.y2)
+    r = shape.radius
+    return min(xs) - r, min(ys) - r, max(xs) + r, max(ys) + r
+
+def _PointSegment(px, py, x1, y1, x2, y2):
+    dx = x2 - x1
+    dy = y2 - y1
+    length = dx*dx + dy*dy
+    t = 0 if length == 0 else max(0, min(1, ((px-x1)*dx + (py-y1)*dy) / length))
+    return math.hypot(px - x1 - t*dx, py - y1 - t*dy)
+
+def _Cross(ax, ay, bx, by, cx, cy):
+    return (bx-ax)*(cy-ay) - (by-ay)*(cx-ax)
+
+def SegmentDistance(a, b):
+    """
+    @param a: segment as (x1, y1, x2, y2)
+    @param b: segment as (x1, y1, x2, y2)
+    @return: the distance between the two segments
+    """
+    d1 = _Cross(b[0], b[1], b[2], b[3], a[0], a[1])
+    d2 = _Cross(b[0], b[1], b[2], b[3], a[2], a[3])
+    d3 = _Cross(a[0], a[1], a[2], a[3], b[0], b[1])
+    d4 = _Cross(a[0], a[1], a[2], a[3], b[2], b[3])
+    if ((d1 > 0) != (d2 > 0) and d1 and d2 and
+            (d3 > 0) != (d4 > 0) and d3 and d4):
+        return 0
+    return min(_PointSegment(a[0], a[1], *b), _PointSegment(a[2], a[3], *b),
+               _PointSegment(b[0], b[1], *a), _PointSegment(b[2], b[3], *a))
+
+def _Inside(x, y, points):
+    inside = False
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y-y1) * (x2-x1) / (y2-y1):
+            inside = not inside
+    return inside
+
+def _Edges(shape):
+    if shape.points:
+        points = shape.points
+        return [p + q for p, q in zip(points, points[1:] + points[:1])]
+    return [(shape.x1, shape.y1, shape.x2, shape.y2)]
+
+def Gap(a, b):
+    """
+    @return: the gap between the copper of two shapes, 0 or less if they touch
+    """
+    if a.points and _Inside(b.x1, b.y1, a.points):
+        return -b.radius
+    if b.points and _Inside(a.x1, a.y1, b.points):
+        return -a.radius
+    d = min(SegmentDistance(e, f) for e in _Edges(a) for f in _Edges(b))
+    return d - a.radius - b.radius
+
+def GridPairs(boxes, cell):
+    """
+    The pairs of boxes that share a grid cell.
+    @param boxes: list of (x1, y1, x2, y2)
+    @param cell: the grid cell size
+    @return: set of (i, j) with i < j
+    """
+    grid = {}
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        for cx in range(int(math.floor(x1 / cell)), int(math.floor(x2 / cell)) + 1):
+            for cy in range(int(math.floor(y1 / cell)), int(math.floor(y2 / cell)) + 1):
+                grid.setdefault((cx, cy), []).append(i)
+
+    pairs = set()
+    for items in grid.values():
+        for n, i in enumerate(items):
+            for j in items[n+1:]:
+                pairs.add((i, j))
+    return pairs
+
+def _Compare(shapes, clearance):
+    """
+    Compare the shapes that may be closer than the clearance, and join the
+    touching ones into nets.
+    @return: (list of (gap, layer, i, j) closer than the clearance, Find)
+             where Find(i) gives the net of shape i
+    """
+    # Boxes grown by half the clearance overlap when the copper may be too close.
+    boxes = []
+    for s in shapes:
+        x1, y1, x2, y2 = BoundingBox(s)
+        boxes.append((x1 - clearance/2, y1 - clearance/2,
+                      x2 + clearance/2, y2 + clearance/2))
+    sizes = sorted(max(b[2]-b[0], b[3]-b[1]) for b in boxes)
+    cell = max(sizes[len(sizes)//2], clearance, 1)
+
+    parent = list(range(len(shapes)))
+
+    def Find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    close = []
+    for i, j in GridPairs(boxes, cell):
+        p = boxes[i]
+        q = boxes[j]
+        if p[0] > q[2] or q[0] > p[2] or p[1] > q[3] or q[1] > p[3]:
+            continue
+        a = shapes[i]
+        b = shapes[j]
+        layers = [l for l in a.layers if l in b.layers]
+        if not layers:
+            continue
+        gap = Gap(a, b)
+        if gap <= 0:
+            parent[Find(i)] = Find(j)
+        elif gap < clearance:
+            close.append((gap, layers[0], i, j))
+    return close, Find
+
+def PlanNets(plan):
+    """
+    The nets of the copper items of a plan.
+    @return: (pad nets, segment nets, polygon nets), lists of net numbers in
+             the order of the plan items; copper free items get None
+    """
+    shapes = PlanShapes(plan)
+    find = _Compare(shapes, 0)[1] if shapes else None
+    nets = iter(find(i) for i in range(len(shapes)))
+    padNets = [next(nets) for p in range(len(plan.pads))]
+    segmentNets = [next(nets) if s[0] in COPPER_LAYERS else None
+                   for s in plan.segments.Rows()]
+    polygonNets = [next(nets) if p.layer in COPPER_LAYERS else None
+                   for p in getattr(plan, 'polygons', ())]
+    return padNets, segmentNets, polygonNets
+
+def CheckPlan(plan, clearance, distinct=()):
+    """
+    Check the copper clearance of a plan.
+    @param plan: the FootprintPlan
+    @param clearance: the minimum gap between nets
+    @param distinct: pad kinds of which every pad is a net of its own
+    @return: (list of Violation, list of Short), violations closest first
+    """
+    shapes = PlanShapes(plan)
+    if not shapes:
+        return [], []
+
+    close, Find = _Compare(shapes, clearance)
+    violations = sorted(Violation(gap, layer, shapes[i].what, shapes[j].what)
+                        for gap, layer, i, j in close if Find(i) != Find(j))
+
+    nets = {}
+    for i, (kind, name, x, y) in enumerate(plan.pads.Rows()):
+        if kind in distinct:
+            nets.setdefault(Find(i), []).append(shapes[i].what)
+    shorts = [Short(tuple(pads)) for pads in nets.values() if len(pads) > 1]
+
+    return violations, shorts
+
+def Report(violations, shorts, clearance, limit=5):
+    """
+    @return: a short text for the wizard, empty when there is nothing to report
+    """
+    lines = []
+    for s in shorts[:limit]:
+        more = len(s.pads) - limit
+        lines.append("short: %s%s" % (", ".join(s.pads[:limit]),
+                                      " and %d more" % more if more > 0 else ""))
+    if violations:
+        lines.append("%d clearance violations below %s mm, closest:" %
+                     (len(violations), MM(clearance)))
+        for v in violations[:limit]:
+            lines.append("%s mm on %s: %s to %s" %
+                         (MM(v.gap), v.layer, v.first, v.second))
+    return "\n".join(lines)
@@ -21,10 +21,16 @@ import pcbnew
 import FootprintWizardBase as FPWbase
 import PadArray as PA
 
+# KiCad loads the plugin at start, to list the wizard. The emitter and the
+# clearance check are imported by the first build, and NumPy by the first
+# vectorized one, so sessions that never open the wizard do not pay for them.
+import footprint_plan as FP
+import card_edge_preview as CP
+import card_edge_slots as CS
+
 class PadBusConArray(PA.PadGridArray):
     alphaName = True
     alphaSkip = ""
-    alphaOffs = 0
     
     """ Creates an 2 sided edge connector or an array of through hole Pads with
         edge connector pad naming (letters on one side and numbers on the other).
@@ -47,36 +53,24 @@ class PadBusConArray(PA.PadGridArray):
     def NamingFunction(self, x, y):
         """
         # For number, left to right, then right to left from front.
+        # The names come from a shared, precomputed table.
         @param x: the pad x index
         @param y: the pad y index
         """
-        if self.alphaName:
-            if y or x >= self.nx: #x >= self.nx :
-                # Use numbers left to right for back side.
-                return (x%self.nx)+self.firstPadNum
-            
-            if x == 0 :
-                # Reset the alpha offset for the new line
-                self.alphaOffs = ord('@') # Reset alpha
-                
-            padord = self.firstPadNum + x + self.alphaOffs
-            # Use numbers after all letters used.
-            if padord > ord('z') :
-                return padord - ord('z')
-
-            # Skip the indicated letters upper and lower.
-            while chr(padord).lower() in self.alphaSkip.lower():
-                self.alphaOffs+=1
-                padord+=1
+        return FP.PadName(self.nx, self.ny, self.alphaName, self.alphaSkip,
+                          self.firstPadNum, x, y)
 
-            # Jump to lower case after all caps used.
-            if padord == ord('Z') :
-                self.alphaOffs+=6
-            
-            return str(chr(padord))
-        else :
-            # Return the number.
-            return self.firstPadNum + (self.nx*y + x)
+    def AddPadsToModule(self, dc):
+        """
+        # Place all pads in one pass, from precomputed positions and names.
+        @param dc: the drawing context
+        """
+        import plan_emitter as PE
+        grid = FP.BusConGrid(self.nx, self.ny, self.px, self.py,
+                             (self.centre.x, self.centre.y))
+        grid.setNaming(self.alphaName, self.alphaSkip)
+        grid.firstPadNum = self.firstPadNum
+        PE.AddGridPads(self, grid, dc)
 
     # Add bus lines as many times as we need
     def AddBusToModule(self, dc, connPitch, fatTraces, preferBot, staggerPad, toEdge ):
@@ -88,91 +82,57 @@ class PadBusConArray(PA.PadGridArray):
         @param preferBot: put the bus wires on the bottom. fat traces remain on top and bottom
         @param toEdge: set to true if this is the first connector, closest to card edge
         """
+        import plan_emitter as PE
         viaWidth = self.pad.GetSize().GetWidth()
         viaHole = self.pad.GetDrillSize().GetWidth()
-        wideWidth = int( viaHole + (( viaWidth - viaHole)/2) )
-                
-        pin1posX = self.centre.x - self.px * (self.nx - 1) / 2
-        pin1posY = self.centre.y - self.py * (self.ny - 1) / 2
-         
-        for row in range(0, self.ny):
-            # move vertically down through rows
-            posY = pin1posY + (row * self.py)
-
-            for padnum in range(0, self.nx):
-                fat = False
-                dc.SetLineThickness(pcbnew.FromMM(.5))
 
-                if row == 0 :
-                    dc.SetLayer(pcbnew.B_Cu)
-                    stagger = 0
-                else :
-                    dc.SetLayer(pcbnew.F_Cu)
-                    stagger = staggerPad 
-                    
-                # Connect power with wider traces
-                if str(padnum+1) in fatTraces :
-                    fat = True
-                    dc.SetLineThickness( wideWidth )
-                    # traces between vias, gives more clearance
-                    if row :
-                        stagger -= staggerPad/4
-                    else :
-                        stagger += staggerPad/4
-                        
-                posX = pin1posX + (self.px * padnum) + stagger
-                pos = pcbnew.wxPoint(posX, posY)
-                
-                if row and toEdge :
-                    # Connect to front finger with shorter line.
-                    dc.Line(pos.x, pos.y, pos.x-stagger, pos.y+connPitch-self.py)
+        grid = FP.BusConGrid(self.nx, self.ny, self.px, self.py,
+                             (self.centre.x, self.centre.y))
+        plan = FP.FootprintPlan()
+        grid.AddBusToPlan(FP.PlanDrawingAids(plan), connPitch, fatTraces,
+                          preferBot, staggerPad, toEdge, viaWidth, viaHole)
+        PE.EmitSegments(plan.segments, dc)
 
-                # Connect to next pad with a bent line.
-                else :
-                    if preferBot and not fat :
-                        dc.SetLayer(pcbnew.B_Cu)
-                        
-                    if row :
-                        # Flip the trace so it does not interfere.
-                        dc.TransformFlip(pos.x, (pos.y+connPitch/2),3)
-                        
-                    if staggerPad or fat :
-                        # no bend
-                        xp = 0
-                        
-                    else :
-                        # Limit bend size for really wide pad pitches
-                        xpMax = viaWidth*2
-                        xpMin = self.px/2
-                        xp =  xpMin if (xpMin < xpMax) else xpMax
-                    yp = self.py
-                    
-                    w = (viaWidth/2)
-                    #Line from pad to top of area between pads in next lower row
-                    dc.Line(pos.x, pos.y, pos.x-xp, pos.y+yp-w)
-                    #Line from top to bottom of area between pads in next lower row
-                    dc.VLine(pos.x-xp, pos.y+yp-w, viaWidth)
-                    #Line bottom of area between pads to lower connector
-                    dc.Line(pos.x-xp, pos.y+yp+w, pos.x, pos.y+connPitch)
+    def AddBusesToModule(self, dc, numCons, connPitch, fatTraces, preferBot, staggerPad ):
+        """
+        # Batched AddBusToModule: add the bus wires of numCons connectors,
+        # each one connPitch further from the card edge, in one pass.
+        @param dc: the drawing context
+        @param numCons: the number of connectors, the first one is closest to the card edge
+        """
+        import plan_emitter as PE
+        viaWidth = self.pad.GetSize().GetWidth()
+        viaHole = self.pad.GetDrillSize().GetWidth()
 
-                    if row :
-                        dc.PopTransform()   # remove the TransformFlip
+        grid = FP.BusConGrid(self.nx, self.ny, self.px, self.py,
+                             (self.centre.x, self.centre.y))
+        plan = FP.FootprintPlan()
+        grid.AddBusesToPlan(FP.PlanDrawingAids(plan), numCons, connPitch,
+                            fatTraces, preferBot, staggerPad, viaWidth, viaHole)
+        PE.EmitSegments(plan.segments, dc)
 
 class CardEdgeWizard(FPWbase.FootprintWizard):
-    conCountKey           = 'connector count'
-    conSpacingKey         = 'connector spacing'
-    conBottomKey          = 'prefer bottom traces'
-    posCountKey           = 'position count'
-    alphaNameKey          = 'alpha name'
-    alphaSkipKey          = 'skip alpha'
-    rowSpacingKey         = 'row spacing'
-    padLengthKey          = 'pad length'
-    padWidthKey           = 'pad width'
-    padPitchKey           = 'pad pitch'
-    fatTraceKey           = 'fat traces'
-    staggerKey            = 'stagger vias'
+    conCountKey           = FP.CON_COUNT_KEY
+    conSpacingKey         = FP.CON_SPACING_KEY
+    conBottomKey          = FP.CON_BOTTOM_KEY
+    posCountKey           = FP.POS_COUNT_KEY
+    alphaNameKey          = FP.ALPHA_NAME_KEY
+    alphaSkipKey          = FP.ALPHA_SKIP_KEY
+    rowSpacingKey         = FP.ROW_SPACING_KEY
+    padLengthKey          = FP.PAD_LENGTH_KEY
+    padWidthKey           = FP.PAD_WIDTH_KEY
+    padPitchKey           = FP.PAD_PITCH_KEY
+    fatTraceKey           = FP.FAT_TRACE_KEY
+    staggerKey            = FP.STAGGER_KEY
     #    pinNames              = "Card_Edge_Bus_Connector"
     padNames = ''
+    planCache = FP.PlanCache(16)
+    spec = None
+    timer = None
+    incremental = True
+    build = staticmethod(FP.BuildCardEdge)
+    finish = staticmethod(FP.FinishCardEdge)
+    preview = staticmethod(CP.BuildCardEdgePreview)
     
     def GetName(self):
         return "Card Edge Bus Connector"
@@ -181,28 +141,53 @@ class CardEdgeWizard(FPWbase.FootprintWizard):
         return "Card Edge Bus Connector, Footprint Wizard"
 
     def GenerateParameterList(self):
-        # defaults for a EXORbus
-        self.AddParam("Connectors", self.conCountKey,self.uInteger, 8)
-        self.AddParam("Connectors", self.conSpacingKey,self.uMM, 19.05)
-        self.AddParam("Connectors", self.conBottomKey,self.uBool, False)
+        for page, key, units, default, options in FP.CARD_EDGE_PARAMS:
+            self.AddParam(page, key, units, default, **options)
 
-        self.AddParam("Pads", self.posCountKey,     self.uInteger, 43, multiple=1)
-        self.AddParam("Pads", self.alphaNameKey,    self.uBool, True)
-        self.AddParam("Pads", self.fatTraceKey,     self.uString, "1 2 3 11 16 20 21 22 41 42 43 9 17 24")
-        self.AddParam("Pads", self.alphaSkipKey,    self.uString, "GIOQ")
-
-        self.AddParam("Pads", self.padWidthKey,     self.uMM, 2.54)
-        self.AddParam("Pads", self.padLengthKey,    self.uMM, 8.0)
-        self.AddParam("Pads", self.padPitchKey,     self.uMM, 3.96)
-        self.AddParam("Pads", self.rowSpacingKey,   self.uMM, 2.54*2)
-        self.AddParam("Pads", self.staggerKey,      self.uBool, False)
+    def SetPreset(self, name):
+        """
+        Set the parameters of a bus, e.g. "S-100", for scripts and the batch.
+        @param name: the preset name in presets.CARD_EDGE_PRESETS
+        """
+        import presets as PS
+        params = dict((p.name, p) for p in self.params)
+        for key, value in PS.PresetValues(PS.CARD_EDGE_PRESETS, name).items():
+            params[key].SetValue(value)
 
     def CheckParameters(self):
-        pass    # All checks are already taken care of!
+        # The parameters are compiled once per build, into the spec every
+        # build stage reads, and the fat trace pins are validated on the way.
+        # The build timing starts here, as the check usually builds the plan.
+        try:
+            self.spec = FP.CompileCardEdge(self.parameters)
+        except ValueError as e:
+            self.spec = self.timer = None
+            self.GetParam(FP.PAD_PAGE, FP.FAT_TRACE_KEY).AddError(str(e))
+            return
+        self.timer = FP.StartTimer(self.spec.timing)
+
+        # The copper of the planned footprint is checked against the
+        # clearance, so fingers shorted by the bus lines are refused.
+        # Merging the bus lines does not change the copper, so the plan
+        # is checked before. The low detail preview checks a short bus,
+        # the connectors repeat.
+        spec = self.spec
+        if not spec.check:
+            return
+        import clearance_check as CC
+        if spec.preview and self.preview:
+            spec = CP.PreviewCheckSpec(spec)
+        derive = FP.ResizeCardEdgePlan if self.incremental else None
+        plan = self.planCache.Get(spec, self.build, derive, self.timer)
+        violations, shorts = CC.CheckPlan(plan, spec.clearance, ('finger',))
+        report = CC.Report(violations, shorts, spec.clearance)
+        if self.timer:
+            self.timer.Mark("clearance check")
+        if report:
+            self.GetParam(FP.PAD_PAGE, FP.CLEARANCE_KEY).AddError(report)
 
     def GetValue(self):
-        pad_count = self.parameters["Pads"][self.posCountKey]
-        return "%s-%d" % ("Card_Edge_Connector", pad_count)
+        return FP.CardEdgeValue(self.parameters)
 
     def GetFinger(self):
         pad_length = self.parameters["Pads"][self.padLengthKey]
@@ -223,147 +208,75 @@ class CardEdgeWizard(FPWbase.FootprintWizard):
         A round non-plated though hole pad (NPTH)
         @param drill: the drill diameter
         """
-        pad = PA.PadMaker(self.module).THRoundPad(pcbnew.FromMils(90), pcbnew.FromMils(52))
+        pad = PA.PadMaker(self.module).THRoundPad(self.spec.via_width, self.spec.via_hole)
         pad.SetLayerSet( pad.StandardMask() )
 
         return pad
 
     def BuildThisFootprint(self):
-        pads = self.parameters["Pads"]
-        cons = self.parameters["Connectors"]
-        num_cons = cons[self.conCountKey]
-        con_pitch = cons[self.conSpacingKey]
-        pref_bottom = cons[self.conBottomKey]
-
-        num_pos = pads[self.posCountKey]
-        pad_length = pads[self.padLengthKey]
-        row_pitch = pads[self.rowSpacingKey]
-        pad_pitch = pads[self.padPitchKey]
-        pad_width = pads[self.padWidthKey]
-        fat_traces= pads[self.fatTraceKey].split()
-        stagger = (pad_pitch/2) if pads[self.staggerKey] else 0
-        
-        # Use value to fill the modules description
-        desc = self.GetValue()
-        self.module.SetDescription(desc)
-        self.module.SetAttributes(1)
-
-        # add in the finger pads
-        pad = self.GetFinger()
-
-        array = PadBusConArray(pad, num_pos, 1, pad_pitch, 0)
-        array.setNaming(pads[self.alphaNameKey], pads[self.alphaSkipKey])
-        array.AddPadsToModule(self.draw)
-        
-        # add in the connector pads
-        pad = self.GetConPad()
-        num_rows = 2 if num_cons else 1
-        #array = PA.PadGridArray(pad, num_pos, num_rows, pad_pitch, row_pitch)
-
-        #self.draw.ResetTransform()
-        
-        if (stagger):
-            array = PadBusConArray(pad, num_pos, 2, pad_pitch, row_pitch)
-
-            array1 = PadBusConArray(pad, num_pos, 1, pad_pitch, 0, pcbnew.wxPoint(0, -row_pitch/2))
-            array1.setNaming(0, pads[self.alphaSkipKey])
-            array1.firstPadNum = num_pos+1
-            
-            array2 = PadBusConArray(pad, num_pos, 1, pad_pitch, 0, pcbnew.wxPoint(stagger, row_pitch/2))
-            array2.setNaming(pads[self.alphaNameKey], pads[self.alphaSkipKey])
-            
-            for connum in range(0, num_cons):
-                    self.draw.TransformTranslate(0, -con_pitch, 1)
-                    
-                    array1.AddPadsToModule(self.draw)
-                    array2.AddPadsToModule(self.draw)
-
-                    array.AddBusToModule(self.draw, con_pitch, fat_traces,
-                        cons[self.conBottomKey], stagger, (connum == 0))
-            
-            self.draw.ResetTransform()
-
-        else :
-            if (num_cons == 0 ):
-                # if no bus connectors, at least add through-hole connections to the front pads
-                array = PadBusConArray(pad, num_pos, 1, pad_pitch, 0)
-                num_cons = 1
-            else :
-                array = PadBusConArray(pad, num_pos, 2, pad_pitch, row_pitch)
-                                    
-            array.setNaming(pads[self.alphaNameKey], pads[self.alphaSkipKey])
-        
-            for connum in range(0, num_cons):
-                # Move to next connector.
-                self.draw.TransformTranslate(0, -con_pitch, 1)
+        # The geometry is computed headless, then turned into KiCad objects.
+        # The dialog rebuilds on every edit, so recent plans are replayed,
+        # already finished, and a change of connector count only adds or
+        # removes connectors.
+        # Timing is reported in the build messages and to the log.
+        # With "low detail preview" the connectors between the first and
+        # last are outlines, until the box is unticked to save the footprint.
+        import plan_emitter as PE
+        spec = self.spec
+        timer = self.timer
+        if spec.preview and self.preview:
+            build, derive, finish = (self.preview, None,
+                                     CP.FinishCardEdgePreview)
+        else:
+            build, finish = self.build, self.finish
+            derive = FP.ResizeCardEdgePlan if self.incremental else None
+        if finish:
+            plan, report = self.planCache.GetFinished(spec, build, finish,
+                                                      derive, timer)
+            self.buildmessages += report
+        else:
+            plan = self.planCache.Get(spec, build, derive, timer)
+        PE.EmitPlan(plan, self.module, self.draw,
+                    {'finger': self.GetFinger(), 'con': self.GetConPad()},
+                    timer)
+        if timer:
+            self.buildmessages += timer.Report("\nBuild timing of %s:" % plan.value)
+
+class CardEdgeFingersWizard(CardEdgeWizard):
+    """ Instanced slot mode: the card edge fingers alone. The connector
+        slots and bus tracks are placed on the board by bus_slot_action,
+        from the parameters kept in the footprint description.
+    """
+    incremental = False
+    build = staticmethod(CS.BuildCardEdgeFingers)
+    finish = None
+    preview = None
 
-                # Put lettered pads on bottom.
-                self.draw.TransformFlip(array.centre.x, array.centre.y, 2)
-                array.AddPadsToModule(self.draw)
-                self.draw.PopTransform()
-            
-                # Add the bus lines.
-                array.AddBusToModule(self.draw, con_pitch, fat_traces,
-                    cons[self.conBottomKey], stagger, (connum == 0))
+    def GetName(self):
+        return "Card Edge Fingers"
 
-            self.draw.ResetTransform()
+    def GetDescription(self):
+        return "Card Edge Fingers of instanced bus slots, Footprint Wizard"
 
+    def GetValue(self):
+        return CS.CardEdgeFingersValue(self.parameters)
 
-        ## Draw connector outlineChassis
-        width =  (num_pos * pad_pitch)
-        height = pcbnew.FromMM(5)
-        #
-        #Default per KLC F5.1 as of 12/2018
-        #self.draw.SetLineThickness( pcbnew.FromMM( 0.12 ) )
-        #
-        ## Left part
-        ##  --
-        ##  |
-        ##  ----
-        #self.draw.Polyline([(-width/2 + pcbnew.FromMM(0.5), -height/2),
-        #                    (-width/2, -height/2),
-        #                    (-width/2, height/2),
-        #                    (-width/2 + pcbnew.FromMM(0.5) + padPitch / 2, height/2)])
-        #
-        #if drawWithLock :
-        #    # Right part with pol slot
-        #    #  ----
-        #    #     [
-        #    #    --
-        #    self.draw.Polyline([(width/2 - pcbnew.FromMM(0.5) - padPitch / 2, -height/2),
-        #                        (width/2,                                     -height/2),
-        #                        (width/2,                                     -height/2 + pcbnew.FromMM(1.25)),
-        #                        (width/2 - pcbnew.FromMM(0.7),                -height/2 + pcbnew.FromMM(1.25)),
-        #                        (width/2 - pcbnew.FromMM(0.7),                 height/2 - pcbnew.FromMM(1.25)),
-        #                        (width/2,                                      height/2 - pcbnew.FromMM(1.25)),
-        #                        (width/2,                                      height/2),
-        #                        (width/2 - pcbnew.FromMM(0.5),                 height/2)])
-        #else:
-        #    # Right part without pol slot
-        #    #  ----
-        #    #     |
-        #    #    --
-        #    self.draw.Polyline([(width/2 - pcbnew.FromMM(0.5) - padPitch / 2, -height/2),
-        #                        (width/2,                                     -height/2),
-        #                        (width/2,                                      height/2),
-        #                        (width/2 - pcbnew.FromMM(0.5),                 height/2)])
-        #
-        # Courtyard
-        self.draw.SetLayer(pcbnew.F_CrtYd)
-        self.draw.SetLineThickness(pcbnew.FromMM(0.05))
-        boxW = width                +(pad_pitch-pad_width)
-        boxH = pad_length + pcbnew.FromMM(2)
+class CardEdgeSlotWizard(CardEdgeWizard):
+    """ Instanced slot mode: the footprint of one connector slot. """
+    incremental = False
+    build = staticmethod(CS.BuildCardEdgeSlot)
+    finish = None
+    preview = None
 
-        # Round courtyard positions to 0.1 mm, rectangle will thus land on a 0.05mm grid
-        pcbnew.PutOnGridMM(boxW, pcbnew.FromMM(0.10))
-        pcbnew.PutOnGridMM(boxH, pcbnew.FromMM(0.10))
-        self.draw.Box(0,  -pcbnew.FromMM(1), boxW, boxH)
+    def GetName(self):
+        return "Card Edge Bus Slot"
 
-        # reference and value
-        text_size = pcbnew.FromMM(1.0)  # According KLC
-        text_offset = row_pitch
+    def GetDescription(self):
+        return "Connector slot of instanced bus slots, Footprint Wizard"
 
-        self.draw.Value(0, -1.5*text_offset, text_size)
-        self.draw.Reference(0, -2.5*text_offset, text_size)
+    def GetValue(self):
+        return CS.CardEdgeSlotValue(self.parameters)
 
 CardEdgeWizard().register()
+CardEdgeFingersWizard().register()
+CardEdgeSlotWizard().register()
@@ -0,0 +1,435 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Batch generator for families of footprints.
+
+    Builds every variant of a parameter grid with the footprint wizards,
+    without the KiCad dialog, and writes one .kicad_mod per variant into a
+    .pretty library. Variants are built across a process pool.
+
+    The library keeps a manifest (manifest.json) of the parameter, code and
+    output hash of each footprint. A rebuild builds only the footprints whose
+    parameters or code changed, or whose file is missing or was edited, and
+    removes the footprints the grids no longer make. Files are written to a
+    temporary name and renamed, so a library is never left half written.
+
+    usage: python footprint_batch.py grids.json -o Backplanes.pretty
+
+    The grid file holds a list of jobs:
+
+    [{"wizard": "card_edge",
+      "name": "Bus_{connector count}x{position count}_P{pad pitch}",
+      "grid": {"connector count": {"range": [2, 22]},
+               "pad pitch": [3.96, 2.54]},
+      "fixed": {"stagger vias": true}},
+     {"wizard": "card_edge", "preset": "S-100",
+      "grid": {"connector count": [6, 12]}},
+     {"wizard": "proto",
+      "grid": {"pad count": [64, 128], "row count": [4, 8]}}]
+
+    Parameters are named as in the wizard dialog and given in its units
+    (mm for lengths). "grid" values are lists, or {"range": [first, last]}
+    for every integer in between. "preset" is optional, one of the named
+    parameter sets of presets.PRESETS, "fixed" and "grid" values
+    override it. "name" is optional, {value} stands for the value the
+    wizard gives the footprint, other fields are parameters. "low detail
+    preview" is ignored, footprints are always built in full.
+
+    The default pcbnew backend needs KiCad's pcbnew module;
+    FootprintWizardBase and PadArray are found in the KiCad plugins
+    directory, see --kicad-plugins. The sexpr backend streams the
+    S-expression text straight from the geometry and needs no KiCad.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import Counter, OrderedDict
+
+import footprint_plan as FP
+import footprint_table as FT
+import presets as PS
+import kicad_mod_writer
+
+# Wizard name in the grid file: (module, class)
+WIZARDS = {
+    'card_edge': ('edge_bus_connectors', 'CardEdgeWizard'),
+    'card_edge_fingers': ('edge_bus_connectors', 'CardEdgeFingersWizard'),
+    'card_edge_slot': ('edge_bus_connectors', 'CardEdgeSlotWizard'),
+    'proto':     ('protoarea_wizard', 'ProtoWizard'),
+}
+
+def LoadJobs(path):
+    with open(path) as f:
+        jobs = json.load(f, object_pairs_hook=OrderedDict)
+    if isinstance(jobs, dict):
+        jobs = [jobs]
+    for job in jobs:
+        if job.get('wizard') not in WIZARDS:
+            raise ValueError("unknown wizard %r, use one of %s" %
+                             (job.get('wizard'), ", ".join(sorted(WIZARDS))))
+        if 'preset' in job:
+            PS.PresetValues(PS.PRESETS.get(job['wizard'], {}), job['preset'])
+    return jobs
+
+def GridValues(values):
+    if isinstance(values, dict):
+        first, last = values['range']
+        return list(range(first, last + 1))
+    if isinstance(values, list):
+        return values
+    return [values]
+
+def Variants(jobs):
+    """
+    Expand the jobs into variants.
+    @return: list of (wizard name, name template, OrderedDict of parameter values)
+    """
+    variants = []
+    for job in jobs:
+        grid = job.get('grid', OrderedDict())
+        keys = list(grid)
+        preset = OrderedDict()
+        template = "{value}"
+        if 'preset' in job:
+            preset = sorted(PS.PresetValues(PS.PRESETS[job['wizard']],
+                                            job['preset']).items())
+            template += "_" + job['preset']
+        template = job.get('name',
+                           template + "".join("_{%s}" % k for k in keys))
+        for combo in itertools.product(*[GridValues(grid[k]) for k in keys]):
+            values = OrderedDict(preset)
+            values.update(job.get('fixed', OrderedDict()))
+            values.update(zip(keys, combo))
+            variants.append((job['wizard'], template, values))
+    return variants
+
+def VariantName(template, wizard, values):
+    """
+    Fill the name template from the parameters and the footprint value.
+    """
+    specs, value, build, finish = FT.FOOTPRINTS[wizard]
+    fields = FP.DialogValues(specs, values)
+    fields['value'] = value(FP.Parameters(specs, values))
+    return re.sub(r'[^A-Za-z0-9._+-]', '_', template.format(**fields))
+
+def FootprintPath(libpath, name):
+    return os.path.join(libpath, name + ".kicad_mod")
+
+def TempPath(path):
+    """
+    @return: a name beside path for this process to write to, KiCad does
+             not list it
+    """
+    return "%s.%d.tmp" % (path, os.getpid())
+
+# os.rename replaces on POSIX only.
+Replace = getattr(os, 'replace', os.rename)
+
+def FileHash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def FileState(path):
+    """
+    @return: [size, modification time] of a file, None if it is missing
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime]
+
+def MoveInto(temp, path):
+    """
+    Put a finished file in place in one step.
+    @return: the hash of the file
+    """
+    output = FileHash(temp)
+    Replace(temp, path)
+    return output
+
+# The modules a footprint is built with, per backend. A change to one of
+# them builds the footprints of the backend again.
+CODE_MODULES = {
+    'pcbnew': ['footprint_plan', 'keep_out', 'card_edge_preview',
+               'card_edge_slots', 'plan_emitter', 'clearance_check',
+               'FootprintWizardBase', 'PadArray'],
+    'sexpr':  ['footprint_plan', 'keep_out', 'card_edge_slots',
+               'footprint_table', 'kicad_mod_writer'],
+}
+
+def CodeHash(backend, wizard):
+    """
+    @return: the hash of the code that builds a wizard's footprints
+    """
+    modules = list(CODE_MODULES[backend])
+    if backend == 'pcbnew':
+        modules.append(WIZARDS[wizard][0])
+    digest = hashlib.sha1(backend.encode('utf-8'))
+    for name in modules:
+        path = os.path.splitext(__import__(name).__file__)[0] + ".py"
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    if backend == 'pcbnew':
+        import pcbnew
+        digest.update(pcbnew.GetBuildVersion().encode('utf-8'))
+    return digest.hexdigest()
+
+def ParametersHash(wizard, values):
+    """
+    @return: the hash of every parameter of a variant, defaults included
+    """
+    specs = FT.FOOTPRINTS[wizard][0]
+    return FP.TextKey(json.dumps([wizard, FP.DialogValues(specs, values)],
+                                 sort_keys=True))
+
+# The manifest, in the library: footprint name to the hashes of its
+# parameters, code and file, and the file size and time the hash was
+# taken at. Files whose size and time are unchanged are not read again.
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+def LoadManifest(libpath):
+    """
+    @return: dict of footprint name to manifest entry, empty without a manifest
+    """
+    try:
+        with open(os.path.join(libpath, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['footprints']
+
+def SaveManifest(libpath, footprints):
+    path = os.path.join(libpath, MANIFEST)
+    temp = TempPath(path)
+    with open(temp, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'footprints': footprints}, f,
+                  indent=1, sort_keys=True)
+    Replace(temp, path)
+
+def Unchanged(entry, path):
+    """
+    @param entry: the manifest entry of a footprint file
+    @return: True when the file is the one the manifest recorded
+    """
+    state = FileState(path)
+    if state is None:
+        return False
+    if state == entry.get('state'):
+        return True
+    if FileHash(path) != entry['output']:
+        return False
+    entry['state'] = state
+    return True
+
+def MakeWizard(wizard, values):
+    """
+    Create a wizard and set its parameters.
+    @param wizard: the wizard name in WIZARDS
+    @param values: dict of parameter name to value, in dialog units
+    """
+    module_name, class_name = WIZARDS[wizard]
+    wiz = getattr(__import__(module_name), class_name)()
+    params = dict((p.name, p) for p in wiz.params)
+    for name, value in values.items():
+        if name not in params:
+            raise ValueError("%s has no parameter %r" % (class_name, name))
+        params[name].SetValue(value)
+    # The low detail preview is for the dialog; the library gets the
+    # footprint in full, as the sexpr backend writes it.
+    if FP.PREVIEW_KEY in params:
+        params[FP.PREVIEW_KEY].SetValue(False)
+    return wiz
+
+def BuildVariant(wizard, name, values, libpath):
+    """
+    Build one variant with the KiCad wizard and save it into the library.
+    @param wizard: the wizard name in WIZARDS
+    @param name: the footprint name
+    @param values: dict of parameter name to value, in dialog units
+    @param libpath: the .pretty library
+    @return: (footprint name, error message or None, output hash or None)
+    """
+    import pcbnew
+
+    # Saved into a scratch library beside the library, then moved in.
+    scratch = None
+    try:
+        wiz = MakeWizard(wizard, values)
+        wiz.BuildFootprint()
+        if wiz.AnyErrors():
+            return name, wiz.buildmessages, None
+        wiz.module.SetFPID(pcbnew.LIB_ID("", name))
+        scratch = tempfile.mkdtemp(suffix='.pretty', dir=os.path.dirname(
+            os.path.abspath(libpath)))
+        pcbnew.FootprintSave(scratch, wiz.module)
+        output = MoveInto(os.path.join(scratch, name + ".kicad_mod"),
+                          FootprintPath(libpath, name))
+    except Exception as e:
+        return name, "%s: %s" % (type(e).__name__, e), None
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return name, None, output
+
+def WriteVariant(wizard, name, values, libpath):
+    """
+    Stream one variant straight to its .kicad_mod file, without pcbnew.
+    @return: (footprint name, error message or None, output hash or None)
+    """
+    path = FootprintPath(libpath, name)
+    temp = TempPath(path)
+    try:
+        with open(temp, 'w') as out:
+            kicad_mod_writer.WriteFootprint(wizard, values, out, name)
+        output = MoveInto(temp, path)
+    except Exception as e:
+        if os.path.exists(temp):
+            os.remove(temp)
+        return name, "%s: %s" % (type(e).__name__, e), None
+    return name, None, output
+
+BACKENDS = {
+    'pcbnew': BuildVariant,
+    'sexpr':  WriteVariant,
+}
+
+def _Build(args):
+    return BACKENDS[args[0]](*args[1:])
+
+def _InitWorker(paths):
+    for path in paths:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+def SearchPaths(kicad_plugins):
+    paths = [os.path.dirname(os.path.abspath(__file__))]
+    if kicad_plugins:
+        paths.append(kicad_plugins)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build footprint variants from parameter grids.")
+    parser.add_argument('grids', help="JSON file with the parameter grids")
+    parser.add_argument('-o', '--output', required=True,
+                        help="the .pretty library to write into")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pcbnew',
+                        help="build with the KiCad wizards, or stream the "
+                             "S-expression text without pcbnew")
+    parser.add_argument('--kicad-plugins', default=None,
+                        help="directory holding FootprintWizardBase.py and PadArray.py")
+    parser.add_argument('--force', action='store_true',
+                        help="build every footprint, also those the manifest "
+                             "has up to date")
+    args = parser.parse_args(argv)
+
+    paths = SearchPaths(args.kicad_plugins)
+    _InitWorker(paths)
+
+    tasks = []
+    for wizard, template, values in Variants(LoadJobs(args.grids)):
+        name = VariantName(template, wizard, values)
+        tasks.append((args.backend, wizard, name, values, args.output))
+
+    counts = Counter(task[2] for task in tasks)
+    duplicates = sorted(n for n in counts if counts[n] > 1)
+    if duplicates:
+        parser.error("variants share footprint names, add the parameter to "
+                     "\"name\": %s" % ", ".join(duplicates))
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    # Only the footprints whose parameters or code changed, or whose file
+    # is not the one recorded, are built.
+    manifest = LoadManifest(args.output)
+    footprints = {}
+    codes = {}
+    outdated = []
+    for task in tasks:
+        backend, wizard, name, values, libpath = task
+        if wizard not in codes:
+            codes[wizard] = CodeHash(backend, wizard)
+        entry = {'wizard': wizard, 'parameters': ParametersHash(wizard, values),
+                 'code': codes[wizard]}
+        old = manifest.get(name)
+        if (not args.force and old and
+                all(old.get(k) == v for k, v in entry.items()) and
+                Unchanged(old, FootprintPath(libpath, name))):
+            footprints[name] = old
+        else:
+            footprints[name] = entry
+            outdated.append(task)
+
+    # Footprints the grids no longer make go, unless they were edited.
+    removed = 0
+    for name, entry in manifest.items():
+        path = FootprintPath(args.output, name)
+        if name not in footprints and Unchanged(entry, path):
+            os.remove(path)
+            removed += 1
+
+    results = []
+    if outdated:
+        pool = multiprocessing.Pool(args.jobs, _InitWorker, (paths,))
+        try:
+            results = pool.map(_Build, outdated, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    failed = 0
+    for name, error, output in results:
+        if error:
+            failed += 1
+            # A file the build left in place stays in the manifest as it
+            # was, so the next run retries it and cleans it up.
+            if name in manifest:
+                footprints[name] = manifest[name]
+            else:
+                del footprints[name]
+            print("%s: %s" % (name, error), file=sys.stderr)
+        else:
+            footprints[name]['output'] = output
+            footprints[name]['state'] = FileState(FootprintPath(args.output,
+                                                                name))
+    SaveManifest(args.output, footprints)
+    print("%d footprints written to %s, %d up to date, %d removed, %d failed" %
+          (len(results) - failed, args.output, len(tasks) - len(outdated),
+           removed, failed))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2186 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Headless footprint geometry.
+
+    Computes the pads, graphic segments and texts of the wizards as a plain
+    Python build plan. Nothing in here imports pcbnew, so the geometry can be
+    generated and checked on machines without KiCad. The plan_emitter module
+    turns a plan into KiCad objects.
+
+    All dimensions are in KiCad internal units (nanometres), the same units
+    the wizard parameters are delivered in.
+"""
+
+from __future__ import division
+from array import array
+from collections import namedtuple, OrderedDict
+from itertools import compress
+import json
+import math
+import os
+import re
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+from timeit import default_timer
+
+# NumPy is imported by the first vectorized build, not when KiCad loads the
+# plugins. Set USE_NUMPY to False to build without it.
+USE_NUMPY = True
+numpy = None
+
+IU_PER_MM = 1e6
+IU_PER_MILS = IU_PER_MM * 0.0254
+
+def FromMM(mm):
+    return int(mm * IU_PER_MM)
+
+def FromMils(mils):
+    return int(mils * IU_PER_MILS)
+
+def Numpy():
+    """
+    Import NumPy on first use.
+    @return: the numpy module, None when it is missing or USE_NUMPY is False
+    """
+    global numpy, USE_NUMPY
+    if numpy is None and USE_NUMPY:
+        try:
+            import numpy
+        except ImportError:
+            USE_NUMPY = False
+    return numpy if USE_NUMPY else None
+
+# Parameter pages and keys of the card edge wizard.
+CON_PAGE              = 'Connectors'
+PAD_PAGE              = 'Pads'
+CON_COUNT_KEY         = 'connector count'
+CON_SPACING_KEY       = 'connector spacing'
+CON_BOTTOM_KEY        = 'prefer bottom traces'
+POS_COUNT_KEY         = 'position count'
+ALPHA_NAME_KEY        = 'alpha name'
+ALPHA_SKIP_KEY        = 'skip alpha'
+ROW_SPACING_KEY       = 'row spacing'
+PAD_LENGTH_KEY        = 'pad length'
+PAD_WIDTH_KEY         = 'pad width'
+PAD_PITCH_KEY         = 'pad pitch'
+FAT_TRACE_KEY         = 'fat traces'
+STAGGER_KEY           = 'stagger vias'
+CON_PAD_KEY           = 'connector pad size'
+CON_DRILL_KEY         = 'connector drill'
+TIMING_KEY            = 'timing report'
+PREVIEW_KEY           = 'low detail preview'
+MERGE_KEY             = 'merge bus lines'
+FAT_POLYGON_KEY       = 'fat trace polygons'
+CLEARANCE_KEY         = 'clearance'
+CHECK_KEY             = 'check clearance'
+
+# Parameter pages and keys of the proto area wizard, with the shared
+# ROW_SPACING_KEY, PAD_LENGTH_KEY, PAD_WIDTH_KEY and PAD_PITCH_KEY.
+BODY_PAGE             = 'Body'
+PAD_COUNT_KEY         = 'pad count'
+ROW_COUNT_KEY         = 'row count'
+SILK_INSIDE_KEY       = 'silk screen inside'
+OUTLINE_X_MARGIN_KEY  = 'outline x margin'
+OUTLINE_Y_MARGIN_KEY  = 'outline y margin'
+DRILL_SIZE_KEY        = 'drill size'
+KEEP_OUT_KEY          = 'keep out'
+
+# Wizard parameters: (page, key, units, default, AddParam options).
+# Units are those of FootprintWizardBase, defaults are in dialog units.
+CARD_EDGE_PARAMS = [
+    # defaults for a EXORbus
+    (CON_PAGE, CON_COUNT_KEY,   'integer', 8,     {}),
+    (CON_PAGE, CON_SPACING_KEY, 'mm',      19.05, {}),
+    (CON_PAGE, CON_BOTTOM_KEY,  'bool',    False, {}),
+    (CON_PAGE, MERGE_KEY,       'bool',    True,  {}),
+    (CON_PAGE, TIMING_KEY,      'bool',    False, {}),
+    (CON_PAGE, PREVIEW_KEY,     'bool',    False, {}),
+
+    (PAD_PAGE, POS_COUNT_KEY,   'integer', 43,    {'multiple': 1}),
+    (PAD_PAGE, ALPHA_NAME_KEY,  'bool',    True,  {}),
+    (PAD_PAGE, FAT_TRACE_KEY,   'string',  "1 2 3 11 16 20 21 22 41 42 43 9 17 24", {}),
+    (PAD_PAGE, ALPHA_SKIP_KEY,  'string',  "GIOQ", {}),
+
+    (PAD_PAGE, PAD_WIDTH_KEY,   'mm',      2.54,  {}),
+    (PAD_PAGE, PAD_LENGTH_KEY,  'mm',      8.0,   {}),
+    (PAD_PAGE, PAD_PITCH_KEY,   'mm',      3.96,  {}),
+    (PAD_PAGE, ROW_SPACING_KEY, 'mm',      2.54*2, {}),
+    (PAD_PAGE, STAGGER_KEY,     'bool',    False, {}),
+    (PAD_PAGE, CON_PAD_KEY,     'mils',    90,    {}),
+    (PAD_PAGE, CON_DRILL_KEY,   'mils',    52,    {}),
+    (PAD_PAGE, FAT_POLYGON_KEY, 'bool',    False, {}),
+    (PAD_PAGE, CLEARANCE_KEY,   'mm',      0.2,   {}),
+    (PAD_PAGE, CHECK_KEY,       'bool',    True,  {}),
+]
+
+ROWED_PARAMS = [
+    # defaults for a DIP package
+    (PAD_PAGE, PAD_COUNT_KEY, 'integer', 128, {}),
+    (PAD_PAGE, ROW_COUNT_KEY, 'integer', 8, {'min_value': 1}),
+
+    (BODY_PAGE, SILK_INSIDE_KEY, 'bool', False, {}),
+    (BODY_PAGE, OUTLINE_X_MARGIN_KEY, 'mm', 0.5, {}),
+    (BODY_PAGE, OUTLINE_Y_MARGIN_KEY, 'mm', 0.5, {}),
+    (BODY_PAGE, TIMING_KEY, 'bool', False, {}),
+]
+
+PROTO_PARAMS = [
+    (PAD_PAGE, PAD_PITCH_KEY, 'mm', 2.54, {}),
+    (PAD_PAGE, PAD_WIDTH_KEY, 'mm', 1.2, {}),
+    (PAD_PAGE, PAD_LENGTH_KEY, 'mm', 1.2, {}),
+    (PAD_PAGE, ROW_SPACING_KEY, 'mm', 2.54, {}),
+    (PAD_PAGE, DRILL_SIZE_KEY, 'mm', 0.8, {}),
+    (PAD_PAGE, KEEP_OUT_KEY, 'string', "", {}),
+]
+
+def ConvertValue(units, value):
+    """
+    Convert a dialog value to the units the wizard parameters are
+    delivered in, the same way FootprintWizardParameter.value does.
+    """
+    v = str(value)
+    if units == 'integer':
+        return int(v)
+    if units == 'bool':
+        return v.lower() in ['true', 't', 'y', 'yes', 'on', '1']
+    if units in ['mm', 'mils', 'float']:
+        v = float(v.replace(",", "."))
+        if units == 'mm':
+            return FromMM(v)
+        if units == 'mils':
+            return FromMils(v)
+        return v
+    return v
+
+def Parameters(specs, values=None):
+    """
+    Build the wizard parameters without a wizard.
+    @param specs: the parameter table, e.g. CARD_EDGE_PARAMS
+    @param values: dict of parameter key to dialog value, overriding the defaults
+    @return: dict of page to dict of key to value, like FootprintWizard.parameters
+    """
+    values = dict(values or {})
+    pages = {}
+    for page, key, units, default, options in specs:
+        pages.setdefault(page, {})[key] = ConvertValue(units,
+                                                       values.pop(key, default))
+    if values:
+        raise ValueError("unknown parameters: %s" % ", ".join(sorted(values)))
+    return pages
+
+def DialogValues(specs, values=None):
+    """
+    @return: dict of every parameter key to its dialog value
+    """
+    fields = dict((key, default) for page, key, units, default, options in specs)
+    fields.update(values or {})
+    return fields
+
+def Iu2Mils(iu):
+    mils = iu / IU_PER_MILS
+    return int(mils - 0.5 if mils < 0 else mils + 0.5)
+
+def PutOnGridMM(value, gridSizeMM):
+    thresh = FromMM(gridSizeMM)
+    return round(value/thresh)*thresh
+
+# Plan records. Layers are KiCad layer names, e.g. 'F.Cu'.
+PadKind = namedtuple('PadKind', 'type shape sizeX sizeY drill layers')
+PlanPad = namedtuple('PlanPad', 'kind name x y')
+PlanSegment = namedtuple('PlanSegment', 'layer width x1 y1 x2 y2')
+PlanText = namedtuple('PlanText', 'kind layer x y size orientation')
+# A filled polygon, points is a tuple of (x, y).
+PlanPolygon = namedtuple('PlanPolygon', 'layer width points')
+
+# Layer ids of the segment store, the layers the emitters know.
+PLAN_LAYERS = ('F.Cu', 'B.Cu', 'F.SilkS', 'F.Fab', 'F.CrtYd')
+PLAN_LAYER_IDS = dict((name, i) for i, name in enumerate(PLAN_LAYERS))
+
+def LayerId(name):
+    """
+    @return: the id of a layer in PLAN_LAYERS
+    @raise ValueError: for any other layer
+    """
+    try:
+        return PLAN_LAYER_IDS[name]
+    except KeyError:
+        raise ValueError("unknown plan layer %r" % (name,))
+
+
+class StringTable(object):
+    """ Interned strings: each one is kept once and stored by its index.
+        Tables only grow, so stores sliced from one another share theirs.
+    """
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def Intern(self, text):
+        i = self.index.get(text)
+        if i is None:
+            i = self.index[text] = len(self.strings)
+            self.strings.append(text)
+        return i
+
+    def __getitem__(self, i):
+        return self.strings[i]
+
+
+class RecordView(object):
+    """ One record of a RecordStore, read from its columns on access.
+        Behaves as the plan record it stands for.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def Record(self):
+        return self.store.Record(self.index)
+
+    def _replace(self, **changes):
+        return self.Record()._replace(**changes)
+
+    def __iter__(self):
+        return iter(self.Record())
+
+    def __len__(self):
+        return len(self.store.record._fields)
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.Record())
+
+    def __repr__(self):
+        return repr(self.Record())
+
+
+class PadView(RecordView):
+    __slots__ = ()
+
+    @property
+    def kind(self):
+        return self.store.strings[self.store.kinds[self.index]]
+
+    @property
+    def name(self):
+        return self.store.strings[self.store.names[self.index]]
+
+    @property
+    def x(self):
+        return self.store.x[self.index]
+
+    @property
+    def y(self):
+        return self.store.y[self.index]
+
+
+class SegmentView(RecordView):
+    __slots__ = ()
+
+    @property
+    def layer(self):
+        return PLAN_LAYERS[self.store.layers[self.index]]
+
+    @property
+    def width(self):
+        return self.store.widths[self.index]
+
+    @property
+    def x1(self):
+        return self.store.x1[self.index]
+
+    @property
+    def y1(self):
+        return self.store.y1[self.index]
+
+    @property
+    def x2(self):
+        return self.store.x2[self.index]
+
+    @property
+    def y2(self):
+        return self.store.y2[self.index]
+
+
+class RecordStore(object):
+    """ Plan records kept column by column in typed arrays, some tens of
+        bytes per record instead of a tuple and its number objects.
+        Indexing and iterating give RecordView, slicing gives a store
+        sharing the string table.
+    @param records: the records to start with
+    @param strings: the StringTable to share, a new one by default
+    """
+    record = None
+    view = None
+    # (attribute, array typecode) per column.
+    columns = ()
+    # The coordinate columns, for Moved.
+    xColumns = ()
+    yColumns = ()
+
+    def __init__(self, records=(), strings=None):
+        self.strings = StringTable() if strings is None else strings
+        for name, code in self.columns:
+            setattr(self, name, array(code))
+        self.extend(records)
+
+    @classmethod
+    def FromColumns(cls, *columns):
+        """
+        @param columns: the values of every column, as they are stored
+        @return: a new store
+        """
+        store = cls()
+        for (name, code), values in zip(cls.columns, columns):
+            setattr(store, name, array(code, values))
+        return store
+
+    @classmethod
+    def FromFields(cls, *fields):
+        """
+        @param fields: the values of every field, as in the records
+        @return: a new store
+        """
+        store = cls()
+        for (name, code), encode, values in zip(cls.columns, store.Encoders(),
+                                                fields):
+            if encode is not None:
+                codes = dict((v, encode(v)) for v in set(values))
+                values = [codes[v] for v in values]
+            setattr(store, name, array(code, values))
+        return store
+
+    def Empty(self):
+        """
+        @return: an empty store sharing the string table
+        """
+        return type(self)(strings=self.strings)
+
+    def __len__(self):
+        return len(getattr(self, self.columns[0][0]))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            store = self.Empty()
+            for name, code in self.columns:
+                setattr(store, name, getattr(self, name)[index])
+            return store
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        return self.view(self, index)
+
+    def __iter__(self):
+        view = self.view
+        for i in range(len(self)):
+            yield view(self, i)
+
+    def Encoders(self):
+        """
+        @return: per column, the function turning a record field into the
+                 stored value, or None to store it as it is
+        """
+        return (None,) * len(self.columns)
+
+    def extend(self, records):
+        if not isinstance(records, type(self)):
+            records = list(records)
+            if not records:
+                return
+            records = self.FromFields(*zip(*records))
+        self.ExtendStore(records)
+
+    def ExtendStore(self, other):
+        """
+        Append the records of a store of the same kind, column by column.
+        """
+        for name, code in self.columns:
+            getattr(self, name).extend(getattr(other, name))
+
+    def Moved(self, dx, dy):
+        """
+        @return: a copy of the store with the coordinates offset
+        """
+        store = self[:]
+        for names, d in ((self.xColumns, dx), (self.yColumns, dy)):
+            if d:
+                for name in names:
+                    setattr(store, name, array('d', [v + d for v in
+                                                     getattr(self, name)]))
+        return store
+
+    def Bytes(self):
+        """
+        @return: the size of the columns, in bytes
+        """
+        return sum(len(getattr(self, name)) * getattr(self, name).itemsize
+                   for name, code in self.columns)
+
+
+class PadStore(RecordStore):
+    """ Plan pads, with kinds and names interned. """
+    record = PlanPad
+    view = PadView
+    columns = (('kinds', 'I'), ('names', 'I'), ('x', 'd'), ('y', 'd'))
+    xColumns = ('x',)
+    yColumns = ('y',)
+
+    def Encoders(self):
+        return (self.strings.Intern, self.strings.Intern, None, None)
+
+    def append(self, pad):
+        kind, name, x, y = pad
+        self.kinds.append(self.strings.Intern(kind))
+        self.names.append(self.strings.Intern(name))
+        self.x.append(x)
+        self.y.append(y)
+
+    def ExtendStore(self, other):
+        if other.strings is not self.strings:
+            strings = [self.strings.Intern(s) for s in other.strings.strings]
+            self.kinds.extend(array('I', [strings[i] for i in other.kinds]))
+            self.names.extend(array('I', [strings[i] for i in other.names]))
+            self.x.extend(other.x)
+            self.y.extend(other.y)
+            return
+        RecordStore.ExtendStore(self, other)
+
+    def Record(self, i):
+        strings = self.strings.strings
+        return PlanPad(strings[self.kinds[i]], strings[self.names[i]],
+                       self.x[i], self.y[i])
+
+    def Rows(self):
+        """
+        @return: iterator of (kind, name, x, y), faster than the views
+        """
+        strings = self.strings.strings
+        return zip([strings[i] for i in self.kinds],
+                   [strings[i] for i in self.names], self.x, self.y)
+
+
+class SegmentStore(RecordStore):
+    """ Plan segments. Widths are kept in whole units, as KiCad does. """
+    record = PlanSegment
+    view = SegmentView
+    columns = (('layers', 'B'), ('widths', 'l'), ('x1', 'd'), ('y1', 'd'),
+               ('x2', 'd'), ('y2', 'd'))
+    xColumns = ('x1', 'x2')
+    yColumns = ('y1', 'y2')
+
+    def Encoders(self):
+        return (LayerId, int, None, None, None, None)
+
+    def append(self, segment):
+        layer, width, x1, y1, x2, y2 = segment
+        self.layers.append(LayerId(layer))
+        self.widths.append(int(width))
+        self.x1.append(x1)
+        self.y1.append(y1)
+        self.x2.append(x2)
+        self.y2.append(y2)
+
+    def Record(self, i):
+        return PlanSegment(PLAN_LAYERS[self.layers[i]], self.widths[i],
+                           self.x1[i], self.y1[i], self.x2[i], self.y2[i])
+
+    def Rows(self):
+        """
+        @return: iterator of (layer, width, x1, y1, x2, y2)
+        """
+        return zip([PLAN_LAYERS[i] for i in self.layers], self.widths,
+                   self.x1, self.y1, self.x2, self.y2)
+
+
+class FootprintPlan(object):
+    """ The complete geometry of one footprint.
+        Pads, segments and texts are kept in the order they are drawn.
+        Pads and segments, the bulk of a footprint, are kept in stores and
+        are passed on from stage to stage without copying.
+    """
+    def __init__(self):
+        self.value = ""
+        self.description = ""
+        self.attributes = 0
+        self.padKinds = {}
+        self.pads = PadStore()
+        self.segments = SegmentStore()
+        self.polygons = []
+        self.texts = []
+
+    def SetHeader(self, value, description, attributes):
+        self.value = value
+        self.description = description
+        self.attributes = attributes
+
+    def AddPadKind(self, name, kind):
+        self.padKinds[name] = kind
+
+    def AddPad(self, pad):
+        self.pads.append(pad)
+
+    def AddPads(self, pads):
+        self.pads.extend(pads)
+
+    def AddSegment(self, segment):
+        self.segments.append(segment)
+
+    def AddSegments(self, segments):
+        self.segments.extend(segments)
+
+    def AddPolygon(self, polygon):
+        self.polygons.append(polygon)
+
+    def AddText(self, text):
+        self.texts.append(text)
+
+
+# Set this environment variable to report the build timing of every
+# footprint, whatever the timing report parameter says.
+TIMING_ENV = 'FOOTPRINT_WIZARD_TIMING'
+
+def Log(text):
+    """
+    Log a report. logging is imported here, so loading the plugins does not.
+    """
+    import logging
+    logging.getLogger(__name__).info(text)
+
+class PhaseTimer(object):
+    """ Records the wall time and the number of items added per build phase.
+        Builders draw into Sink(plan) so the items are counted, and call
+        Mark() at the end of each phase.
+    """
+    def __init__(self):
+        self.phases = []
+        self.count = 0
+        self.markCount = 0
+        self.start = self.markTime = default_timer()
+
+    def Sink(self, sink):
+        return CountingSink(sink, self)
+
+    def Count(self, items=1):
+        self.count += items
+
+    def Mark(self, phase):
+        """
+        End a phase.
+        @param phase: the phase name
+        """
+        now = default_timer()
+        self.phases.append((phase, now - self.markTime,
+                            self.count - self.markCount))
+        self.markTime = now
+        self.markCount = self.count
+
+    def Report(self, title):
+        """
+        Log the phases.
+        @param title: the first line of the report
+        @return: the report text
+        """
+        lines = [title]
+        for phase, seconds, items in self.phases:
+            lines.append("  %-32s %9.2f ms %7d items" %
+                         (phase, seconds * 1000, items))
+        lines.append("  %-32s %9.2f ms %7d items" %
+                     ("total", (self.markTime - self.start) * 1000, self.count))
+        text = "\n".join(lines) + "\n"
+        Log(text)
+        return text
+
+
+def StartTimer(enabled):
+    """
+    @param enabled: the timing report parameter
+    @return: a PhaseTimer if timing is on, by the parameter or TIMING_ENV,
+             otherwise None
+    """
+    if enabled or os.environ.get(TIMING_ENV):
+        return PhaseTimer()
+    return None
+
+
+class CountingSink(object):
+    """ Passes the items on to a plan, counting them in a PhaseTimer. """
+    def __init__(self, sink, timer):
+        self.sink = sink
+        self.timer = timer
+
+    def SetHeader(self, value, description, attributes):
+        self.sink.SetHeader(value, description, attributes)
+
+    def AddPadKind(self, name, kind):
+        self.sink.AddPadKind(name, kind)
+
+    def AddPad(self, pad):
+        self.timer.count += 1
+        self.sink.AddPad(pad)
+
+    def AddPads(self, pads):
+        if not isinstance(pads, PadStore):
+            pads = list(pads)
+        self.timer.count += len(pads)
+        self.sink.AddPads(pads)
+
+    def AddSegment(self, segment):
+        self.timer.count += 1
+        self.sink.AddSegment(segment)
+
+    def AddSegments(self, segments):
+        if not isinstance(segments, SegmentStore):
+            segments = list(segments)
+        self.timer.count += len(segments)
+        self.sink.AddSegments(segments)
+
+    def AddPolygon(self, polygon):
+        self.timer.count += 1
+        self.sink.AddPolygon(polygon)
+
+    def AddText(self, text):
+        self.timer.count += 1
+        self.sink.AddText(text)
+
+
+def ParametersKey(params):
+    """
+    A canonical hash of wizard parameters.
+    @param params: dict of page to dict of key to value, or a CardEdgeSpec
+    """
+    if isinstance(params, CardEdgeSpec):
+        return params.key
+    return TextKey(json.dumps(params, sort_keys=True, separators=(',', ':')))
+
+def TextKey(text):
+    """
+    @return: the SHA-1 hex digest of a text
+    """
+    import hashlib
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class PlanCache(object):
+    """ A bounded LRU cache of footprint plans, keyed on the parameters.
+        Finished plans are kept with the plan they were finished from.
+        Cached plans are shared, they must not be modified.
+    @param size: the number of plans to keep
+    """
+    def __init__(self, size=16):
+        self.size = size
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def Get(self, params, build, derive=None, timer=None):
+        """
+        @param params: the wizard parameters
+        @param build: the builder, e.g. BuildCardEdge
+        @param derive: optional derive(oldParams, oldPlan, params), giving a
+                       plan from a cached one or None when it cannot
+        @param timer: optional PhaseTimer, passed on to the builder
+        @return: the cached plan, one derived from a recent plan, or a new
+                 one built by build(params, plan)
+        """
+        return self.Entry(params, build, derive, timer)[1]
+
+    def GetFinished(self, params, build, finish, derive=None, timer=None):
+        """
+        As Get, with a finishing step applied to the plan. The result is
+        cached with the plan, so a cache hit is not finished again.
+        @param finish: finish(params, plan, timer), e.g. FinishCardEdge
+        @return: (the finished plan, report text), as finish returns them
+        """
+        cached, plan, finished = self.Entry(params, build, derive, timer)
+        result = finished.get(finish.__name__)
+        if result is None:
+            result = finished[finish.__name__] = finish(params, plan, timer)
+        elif timer:
+            timer.Mark("finished plan from cache")
+        return result
+
+    def Entry(self, params, build, derive=None, timer=None):
+        """
+        @return: the cache entry (params, plan, dict of finish name to
+                 result) for Get and GetFinished
+        """
+        key = (build.__name__, ParametersKey(params))
+        entry = self.plans.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            plan = None
+            if derive:
+                for (name, k), (oldParams, oldPlan, finished) in reversed(list(self.plans.items())):
+                    if name == build.__name__:
+                        plan = derive(oldParams, oldPlan, params)
+                        if plan is not None:
+                            break
+                if plan is not None and timer:
+                    timer.Count(len(plan.pads) + len(plan.segments) +
+                                len(plan.polygons) + len(plan.texts))
+                    timer.Mark("plan derived from cache")
+            if plan is None:
+                plan = FootprintPlan()
+                if timer:
+                    build(params, plan, timer)
+                else:
+                    build(params, plan)
+            entry = (params, plan, {})
+        else:
+            self.hits += 1
+            if timer:
+                timer.Mark("plan from cache")
+        self.plans[key] = entry
+        while len(self.plans) > self.size:
+            self.plans.popitem(last=False)
+        return entry
+
+    def Clear(self):
+        self.plans.clear()
+
+
+class PlanDrawingAids(object):
+    """ A stand-in for FootprintWizardDrawingAids that records into a plan.
+        Transforms are composed the same way as KiCad does, so the recorded
+        coordinates match what the KiCad drawing context would produce.
+    """
+    xfrmIDENTITY = [1, 0, 0, 0, 1, 0]
+
+    flipNone = 0        # no flip transform
+    flipX = 1           # flip X values, i.e. about the Y-axis
+    flipY = 2           # flip Y values, i.e. about the X-axis
+    flipBoth = 3        # flip X and Y values, equivalent to a 180-degree rotation
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.layer = 'F.SilkS'
+        self.lineThickness = FromMM(0.15)
+        self.transforms = []
+        self.transform = self.xfrmIDENTITY
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def GetLayer(self):
+        return self.layer
+
+    def SetLineThickness(self, lineThickness):
+        self.lineThickness = lineThickness
+
+    def GetLineThickness(self):
+        return self.lineThickness
+
+    def PushTransform(self, mat):
+        self.transforms.append(mat)
+        self.RecomputeTransforms()
+        return mat
+
+    def PopTransform(self, num=1):
+        for i in range(num):
+            mat = self.transforms.pop()
+        self.RecomputeTransforms()
+        return mat
+
+    def ResetTransform(self):
+        self.transforms = []
+        self.RecomputeTransforms()
+
+    def RecomputeTransforms(self):
+        self.transform = ComposeMatrices(self.transforms)
+
+    def TransformTranslate(self, x, y, push=True):
+        mat = [1, 0, x, 0, 1, y]
+        if push:
+            self.PushTransform(mat)
+        return mat
+
+    def TransformFlip(self, x, y, flip=flipNone, push=True):
+        mat = FlipMatrix(x, y, flip)
+        if push:
+            self.PushTransform(mat)
+        return mat
+
+    def TransformPoint(self, x, y, mat=None):
+        if not mat:
+            mat = self.transform
+        return ApplyMatrix(mat, x, y)
+
+    def Line(self, x1, y1, x2, y2):
+        x1, y1 = self.TransformPoint(x1, y1)
+        x2, y2 = self.TransformPoint(x2, y2)
+        self.plan.AddSegment(PlanSegment(self.layer, self.lineThickness,
+                                         x1, y1, x2, y2))
+
+    def VLine(self, x, y, l):
+        self.Line(x, y, x, y + l)
+
+    def HLine(self, x, y, l):
+        self.Line(x, y, x + l, y)
+
+    def Polyline(self, pts):
+        for i in range(len(pts) - 1):
+            self.Line(pts[i][0], pts[i][1], pts[i+1][0], pts[i+1][1])
+
+    def Box(self, x, y, w, h):
+        self.Polyline([[x - w/2, y - h/2],
+                       [x + w/2, y - h/2],
+                       [x + w/2, y + h/2],
+                       [x - w/2, y + h/2],
+                       [x - w/2, y - h/2]])
+
+    def Polygon(self, pts):
+        """
+        A filled polygon on the current layer, drawn without outline.
+        @param pts: list of (x, y), not closed
+        """
+        self.plan.AddPolygon(PlanPolygon(self.layer, 0, tuple(
+            self.TransformPoint(x, y) for x, y in pts)))
+
+    def Value(self, x, y, size, orientation_degree=0):
+        x, y = self.TransformPoint(x, y)
+        self.plan.AddText(PlanText('value', 'F.Fab', x, y, size,
+                                   orientation_degree))
+
+    def Reference(self, x, y, size, orientation_degree=0):
+        x, y = self.TransformPoint(x, y)
+        self.plan.AddText(PlanText('reference', 'F.SilkS', x, y, size,
+                                   orientation_degree))
+
+
+def ComposeMatrix(mat1, mat2):
+    """
+    Compose two affine matrices, in the same order as KiCad's drawing aids.
+    Also works element-wise on arrays of coefficients.
+    """
+    return [mat1[0] * mat2[0] + mat1[1] * mat2[3],
+            mat1[0] * mat2[1] + mat1[1] * mat2[4],
+            mat1[0] * mat2[2] + mat1[1] * mat2[5] + mat1[2],
+            mat1[3] * mat2[0] + mat1[4] * mat2[3],
+            mat1[3] * mat2[1] + mat1[4] * mat2[4],
+            mat1[3] * mat2[2] + mat1[4] * mat2[5] + mat1[5]]
+
+def ComposeMatrices(mats):
+    x = PlanDrawingAids.xfrmIDENTITY
+    for mat in mats:
+        x = ComposeMatrix(x, mat)
+    return x
+
+def FlipMatrix(x, y, flip):
+    flips = {PlanDrawingAids.flipNone: [1, 0, 0, 0, 1, 0],
+             PlanDrawingAids.flipX:    [-1, 0, 0, 0, 1, 0],
+             PlanDrawingAids.flipY:    [1, 0, 0, 0, -1, 0],
+             PlanDrawingAids.flipBoth: [-1, 0, 0, 0, -1, 0]}
+    return ComposeMatrices([[1, 0, x, 0, 1, y],
+                            flips[flip],
+                            [1, 0, -x, 0, 1, -y]])
+
+def ApplyMatrix(mat, x, y):
+    return (x * mat[0] + y * mat[1] + mat[2],
+            x * mat[3] + y * mat[4] + mat[5])
+
+def ConnectorMatrices(base, first, count, connPitch):
+    """
+    The transforms of a range of connectors, each connPitch further from
+    the card edge, composed once as the translate stack would compose them.
+    @param base: the transform of the card edge
+    @param first: the index of the first connector, 0 is closest to the card edge
+    @param count: the number of connectors
+    @return: list of count matrices
+    """
+    mats = []
+    mat = base
+    for connum in range(0, first + count):
+        mat = ComposeMatrix(mat, [1, 0, 0, 0, 1, -connPitch])
+        if connum >= first:
+            mats.append(mat)
+    return mats
+
+
+def SegmentLine(layer, width, x1, y1, x2, y2):
+    """
+    The line a segment lies on, as MergeSegments groups them.
+    @return: (line key, t1, t2, start x, start y, end x, end y), the end
+             points truncated to whole units and ordered by their position
+             t along the line, or None for a zero length segment
+    """
+    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+    dx = x2 - x1
+    dy = y2 - y1
+    if dx == 0 and dy == 0:
+        return None
+    # Reduced direction, pointing right or down, and the line offset.
+    d = gcd(abs(dx), abs(dy))
+    dx //= d
+    dy //= d
+    if dx < 0 or (dx == 0 and dy < 0):
+        dx, dy = -dx, -dy
+    key = (layer, width, dx, dy, dy*x1 - dx*y1)
+    t1 = x1*dx + y1*dy
+    t2 = x2*dx + y2*dy
+    if t1 <= t2:
+        return key, t1, t2, x1, y1, x2, y2
+    return key, t2, t1, x2, y2, x1, y1
+
+def MergeSegments(segments):
+    """
+    Merge segments that lie on the same line, on the same layer and with
+    the same width, and touch or overlap, into single longer segments.
+    The end points are truncated to whole units first, as a wxPoint would,
+    so the merged copper is exactly the copper of the separate segments.
+    The segments are merged by a MergingSink, so a plan and a footprint
+    streamed through one get the same segments in the same order.
+    @param segments: the SegmentStore
+    @return: (SegmentStore, number of segments removed)
+    """
+    plan = FootprintPlan()
+    sink = MergingSink(plan)
+    sink.AddSegments(segments)
+    sink.Flush()
+    return plan.segments, sink.removed
+
+def MergePlanSegments(plan):
+    """
+    @param plan: a FootprintPlan, it is not modified
+    @return: (a copy of the plan with its segments merged, number of
+             segments removed), see MergeSegments
+    """
+    merged = FootprintPlan()
+    merged.SetHeader(plan.value, plan.description, plan.attributes)
+    merged.padKinds = dict(plan.padKinds)
+    merged.pads = plan.pads
+    merged.segments, removed = MergeSegments(plan.segments)
+    merged.polygons = plan.polygons
+    merged.texts = plan.texts
+    return merged, removed
+
+
+# Lines a MergingSink holds runs of segments open on, and runs per line.
+MERGE_OPEN_LINES = 1024
+MERGE_OPEN_RUNS = 4
+
+def JoinRuns(a, b):
+    """
+    @param a, b: runs of MergingSink that touch or overlap
+    @return: the run of both
+    """
+    start = a[2] if a[0] <= b[0] else b[2]
+    end = a[3] if a[1] >= b[1] else b[3]
+    return (min(a[0], b[0]), max(a[1], b[1]), start, end, a[4] + b[4])
+
+class MergingSink(object):
+    """ Passes the items on to a sink, merging the segments while they are
+        drawn, see MergeSegments. A few runs are held open on each line,
+        the oldest passed on when a line has too many or when too many
+        lines are open, so memory does not grow with the number of
+        connectors. Every segment of non-zero length is passed on from the
+        end with the lower position along its line, merged or not.
+    @param sink: the FootprintPlan (or compatible sink) to pass on to
+    @param openLines: the number of lines to hold runs open on
+    """
+    def __init__(self, sink, openLines=MERGE_OPEN_LINES):
+        self.sink = sink
+        self.openLines = openLines
+        self.runs = OrderedDict()
+        self.removed = 0
+
+    def SetHeader(self, value, description, attributes):
+        self.sink.SetHeader(value, description, attributes)
+
+    def AddPadKind(self, name, kind):
+        self.sink.AddPadKind(name, kind)
+
+    def AddPad(self, pad):
+        self.sink.AddPad(pad)
+
+    def AddPads(self, pads):
+        self.sink.AddPads(pads)
+
+    def AddSegment(self, segment):
+        line = SegmentLine(*segment)
+        if line is None:
+            self.sink.AddSegment(PlanSegment._make(segment))
+            return
+        key, t1, t2, x1, y1, x2, y2 = line
+        run = (t1, t2, (x1, y1), (x2, y2), 1)
+        runs = self.runs.pop(key, None)
+        if runs is None:
+            runs = [run]
+        else:
+            kept = []
+            for old in runs:
+                if old[0] <= run[1] and run[0] <= old[1]:
+                    # Touches or overlaps the new run.
+                    run = JoinRuns(old, run)
+                else:
+                    kept.append(old)
+            kept.append(run)
+            runs = kept
+        if len(runs) > MERGE_OPEN_RUNS:
+            self.PassOn(key, [runs.pop(0)])
+        self.runs[key] = runs
+        if len(self.runs) > self.openLines:
+            self.PassOn(*self.runs.popitem(last=False))
+
+    def AddSegments(self, segments):
+        if isinstance(segments, SegmentStore):
+            segments = segments.Rows()
+        for segment in segments:
+            self.AddSegment(segment)
+
+    def AddPolygon(self, polygon):
+        self.sink.AddPolygon(polygon)
+
+    def AddText(self, text):
+        self.sink.AddText(text)
+
+    def PassOn(self, key, runs):
+        """
+        Pass runs on, each as the one segment it makes.
+        """
+        for t1, t2, start, end, count in runs:
+            self.removed += count - 1
+            self.sink.AddSegment(PlanSegment(key[0], key[1], start[0],
+                                             start[1], end[0], end[1]))
+
+    def Flush(self):
+        """
+        Pass the open runs on, oldest line first.
+        """
+        while self.runs:
+            self.PassOn(*self.runs.popitem(last=False))
+
+    def Close(self):
+        """
+        Pass the open runs on and close the sink.
+        """
+        self.Flush()
+        self.sink.Close()
+
+
+# Connectors per vectorized bus batch.
+BUS_BATCH_CONNECTORS = 16
+
+# Pads per batch of a pad grid.
+PAD_BATCH = 4096
+
+NAME_TABLE_CACHE_SIZE = 64
+_nameTables = {}
+
+def PadNameTable(nx, ny, alphaName, alphaSkip, firstPadNum):
+    """
+    The pad names of an edge connector array, computed once and cached.
+    The table is shared, it must not be modified.
+    @param nx: number of pads in x-direction
+    @param ny: number of pads in y-direction
+    @param alphaName: use letters for the front row
+    @param alphaSkip: letters not to use, upper or lower case
+    @param firstPadNum: the number of the first pad
+    @return: a tuple of rows, the name of pad (x, y) is table[y][x]
+    """
+    key = (nx, ny, bool(alphaName), alphaSkip, firstPadNum)
+    table = _nameTables.get(key)
+    if table is None:
+        if len(_nameTables) >= NAME_TABLE_CACHE_SIZE:
+            _nameTables.clear()
+        table = _nameTables[key] = _ComputePadNames(*key)
+    return table
+
+def _ComputePadNames(nx, ny, alphaName, alphaSkip, firstPadNum):
+    if not alphaName:
+        # Numbers, left to right, row by row.
+        return tuple(tuple(firstPadNum + (nx*y + x) for x in range(nx))
+                     for y in range(ny))
+
+    # Use numbers left to right for back side.
+    back = tuple((x%nx)+firstPadNum for x in range(nx))
+
+    skip = alphaSkip.lower()
+    front = []
+    alphaOffs = ord('@')
+    for x in range(nx):
+        padord = firstPadNum + x + alphaOffs
+        # Use numbers after all letters used.
+        if padord > ord('z') :
+            front.append(padord - ord('z'))
+            continue
+
+        # Skip the indicated letters upper and lower.
+        while chr(padord).lower() in skip:
+            alphaOffs+=1
+            padord+=1
+
+        # Jump to lower case after all caps used.
+        if padord == ord('Z') :
+            alphaOffs+=6
+
+        front.append(str(chr(padord)))
+
+    return (tuple(front),) + (back,) * (ny - 1)
+
+def PadName(nx, ny, alphaName, alphaSkip, firstPadNum, x, y):
+    """
+    The name of one pad of an edge connector array, see PadNameTable.
+    """
+    if x >= nx or y >= ny:
+        if alphaName:
+            return (x%nx)+firstPadNum
+        return firstPadNum + (nx*y + x)
+    return PadNameTable(nx, ny, alphaName, alphaSkip, firstPadNum)[y][x]
+
+
+class PadGrid(object):
+    """ Geometry of a PadArray.PadGridArray.
+    @param nx: number of pads in x-direction
+    @param ny: number of pads in y-direction
+    @param px: pitch in x-direction
+    @param py: pitch in y-direction
+    @param centre: array centre point, as an (x, y) tuple
+    """
+    def __init__(self, nx, ny, px, py, centre=(0, 0)):
+        self.firstPadNum = 1
+        self.nx = int(nx)
+        self.ny = int(ny)
+        self.px = px
+        self.py = py
+        self.centre = centre
+
+    def NamingFunction(self, x, y):
+        return self.firstPadNum + (self.nx * y + x)
+
+    def Columns(self, first=0, count=None):
+        """
+        @return: the range of count x indices from first, all to the end
+                 by default
+        """
+        last = self.nx if count is None else min(first + count, self.nx)
+        return range(first, last)
+
+    def PadNames(self, first=0, count=None):
+        """
+        @param first, count: the columns, all of them by default
+        @return: the pad names, in the same order as PadArray.AddPadsToModule
+        """
+        return [str(self.NamingFunction(x, y))
+                for x in self.Columns(first, count) for y in range(self.ny)]
+
+    def PadPositions(self, mat, first=0, count=None):
+        """
+        The transformed pad positions, computed in one pass.
+        @param mat: the transform matrix, as in the drawing context
+        @param first, count: the columns, all of them by default
+        @return: (list of x, list of y), in the same order as
+                 PadArray.AddPadsToModule: x outer, y inner
+        """
+        pin1posX = self.centre[0] - self.px * (self.nx - 1) / 2
+        pin1posY = self.centre[1] - self.py * (self.ny - 1) / 2
+        columns = self.Columns(first, count)
+
+        numpy = Numpy()
+        if numpy is not None:
+            x = numpy.arange(first, first + len(columns)).reshape(-1, 1)
+            posX = pin1posX + (x * self.px)
+            posY = pin1posY + (self.py * numpy.arange(self.ny).reshape(1, -1))
+            posX, posY = ApplyMatrix(mat, *numpy.broadcast_arrays(posX, posY))
+            return posX.ravel().tolist(), posY.ravel().tolist()
+
+        xs = []
+        ys = []
+        for x in columns:
+            posX = pin1posX + (x * self.px)
+
+            for y in range(self.ny):
+                posY = pin1posY + (self.py * y)
+                posX1, posY1 = ApplyMatrix(mat, posX, posY)
+                xs.append(posX1)
+                ys.append(posY1)
+        return xs, ys
+
+    def AddPadsToPlan(self, dc, kind, mat=None):
+        """
+        Add the pads in the same order as PadArray.AddPadsToModule.
+        @param dc: the plan drawing context
+        @param kind: the pad kind name of every pad in the array
+        @param mat: the transform to place the pads with, instead of the
+                    one of the drawing context
+        """
+        if mat is None:
+            mat = dc.transform
+        # Large grids go to the plan a few columns at a time, so a writer
+        # never holds more than a batch of them.
+        step = max(PAD_BATCH // max(self.ny, 1), 1)
+        for first in range(0, self.nx, step):
+            xs, ys = self.PadPositions(mat, first, step)
+            dc.plan.AddPads(PadStore.FromFields(
+                [kind] * len(xs), self.PadNames(first, step), xs, ys))
+
+
+class BusConGrid(PadGrid):
+    """ Geometry of a PadBusConArray: pad positions, edge connector naming
+        and the bus lines between connectors.
+    """
+    alphaName = True
+    alphaSkip = ""
+
+    def setNaming(self, alpha_name, alpha_skip):
+        self.alphaName = alpha_name
+        self.alphaSkip = alpha_skip
+
+    def NamingFunction(self, x, y):
+        """
+        # For number, left to right, then right to left from front.
+        @param x: the pad x index
+        @param y: the pad y index
+        """
+        return PadName(self.nx, self.ny, self.alphaName, self.alphaSkip,
+                       self.firstPadNum, x, y)
+
+    def PadNames(self, first=0, count=None):
+        """
+        As PadGrid.PadNames, with the names looked up once per array.
+        """
+        names = PadNameTable(self.nx, self.ny, self.alphaName, self.alphaSkip,
+                             self.firstPadNum)
+        return [str(names[y][x]) for x in self.Columns(first, count)
+                for y in range(self.ny)]
+
+    def AddBusToPlan(self, dc, connPitch, fatTraces, preferBot, staggerPad,
+                     toEdge, viaWidth, viaHole, skip=(), mat=None):
+        """
+        # Add bus wires connecting the connetors and card edge.
+        The flips of the back row traces are composed into the connector
+        transform per pad, and the plan gets the transformed coordinates.
+        @param dc: the drawing context
+        @param connPitch: the pitch of the connectors
+        @param fatTraces: array of pin names that need fat power traces connecting both sides of the connector
+        @param preferBot: put the bus wires on the bottom. fat traces remain on top and bottom
+        @param toEdge: set to true if this is the first connector, closest to card edge
+        @param viaWidth: the diameter of the connector pads
+        @param viaHole: the drill diameter of the connector pads
+        @param skip: pin names that get no bus wires, e.g. drawn as polygons
+        @param mat: the transform of the connector, instead of the one of the
+                    drawing context
+        """
+        if mat is None:
+            mat = dc.transform
+        addSegment = dc.plan.AddSegment
+        wideWidth = int( viaHole + (( viaWidth - viaHole)/2) )
+
+        pin1posX = self.centre[0] - self.px * (self.nx - 1) / 2
+        pin1posY = self.centre[1] - self.py * (self.ny - 1) / 2
+
+        for row in range(0, self.ny):
+            # move vertically down through rows
+            posY = pin1posY + (row * self.py)
+
+            for padnum in range(0, self.nx):
+                if str(padnum+1) in skip:
+                    continue
+                fat = False
+                width = FromMM(.5)
+
+                if row == 0 :
+                    layer = 'B.Cu'
+                    stagger = 0
+                else :
+                    layer = 'F.Cu'
+                    stagger = staggerPad
+
+                # Connect power with wider traces
+                if str(padnum+1) in fatTraces :
+                    fat = True
+                    width = wideWidth
+                    # traces between vias, gives more clearance
+                    if row :
+                        stagger -= staggerPad/4
+                    else :
+                        stagger += staggerPad/4
+
+                # Whole units, as a wxPoint would hold them.
+                posX = int(pin1posX + (self.px * padnum) + stagger)
+                pos = (posX, int(posY))
+                lineMat = mat
+
+                if row and toEdge :
+                    # Connect to front finger with shorter line.
+                    lines = [(pos[0], pos[1], pos[0]-stagger, pos[1]+connPitch-self.py)]
+
+                # Connect to next pad with a bent line.
+                else :
+                    if preferBot and not fat :
+                        layer = 'B.Cu'
+
+                    if row :
+                        # Flip the trace so it does not interfere.
+                        lineMat = ComposeMatrix(mat, FlipMatrix(
+                            pos[0], (pos[1]+connPitch/2), PlanDrawingAids.flipBoth))
+
+                    if staggerPad or fat :
+                        # no bend
+                        xp = 0
+
+                    else :
+                        # Limit bend size for really wide pad pitches
+                        xpMax = viaWidth*2
+                        xpMin = self.px/2
+                        xp =  xpMin if (xpMin < xpMax) else xpMax
+                    yp = self.py
+
+                    w = (viaWidth/2)
+                    lines = [
+                        #Line from pad to top of area between pads in next lower row
+                        (pos[0], pos[1], pos[0]-xp, pos[1]+yp-w),
+                        #Line from top to bottom of area between pads in next lower row
+                        (pos[0]-xp, pos[1]+yp-w, pos[0]-xp, (pos[1]+yp-w)+viaWidth),
+                        #Line bottom of area between pads to lower connector
+                        (pos[0]-xp, pos[1]+yp+w, pos[0], pos[1]+connPitch)]
+
+                for x1, y1, x2, y2 in lines:
+                    x1, y1 = ApplyMatrix(lineMat, x1, y1)
+                    x2, y2 = ApplyMatrix(lineMat, x2, y2)
+                    addSegment(PlanSegment(layer, width, x1, y1, x2, y2))
+
+
+    def AddBusesToPlan(self, dc, numCons, connPitch, fatTraces, preferBot,
+                       staggerPad, viaWidth, viaHole, toEdge=True, skip=(),
+                       mat=None):
+        """
+        # Add the bus wires of all connectors at once.
+        Gives the same segments as translating by -connPitch and calling
+        AddBusToPlan for each connector.
+        Uses NumPy when available, otherwise falls back to that loop.
+        @param dc: the drawing context, its current transform is the base
+        @param numCons: the number of connectors
+        @param toEdge: the first connector is the one closest to the card edge
+        @param skip: pin names that get no bus wires
+        @param mat: the transform of the card edge, instead of the one of the
+                    drawing context
+        """
+        if mat is None:
+            mat = dc.transform
+        if Numpy() is None:
+            conMats = ConnectorMatrices(mat, 0, numCons, connPitch)
+            for connum, conMat in enumerate(conMats):
+                self.AddBusToPlan(dc, connPitch, fatTraces, preferBot,
+                                  staggerPad, toEdge and (connum == 0),
+                                  viaWidth, viaHole, skip, conMat)
+            return
+
+        # Batches of connectors keep memory bounded on long backplanes.
+        for first in range(0, numCons, BUS_BATCH_CONNECTORS):
+            count = min(BUS_BATCH_CONNECTORS, numCons - first)
+            dc.plan.AddSegments(self.BusSegments(
+                mat, count, connPitch, fatTraces, preferBot, staggerPad,
+                viaWidth, viaHole, toEdge=toEdge and (first == 0), skip=skip))
+            for connum in range(0, count):
+                mat = ComposeMatrix(mat, [1, 0, 0, 0, 1, -connPitch])
+
+    def BusSegments(self, base, numCons, connPitch, fatTraces, preferBot,
+                    staggerPad, viaWidth, viaHole, toEdge=True, skip=()):
+        """
+        Vectorized form of AddBusesToPlan, every pad of every connector is
+        computed as one NumPy array. Arithmetic is done in the same order as
+        the drawing context, so the coordinates are identical.
+        @param base: the transform matrix the connectors are placed in
+        @param toEdge: the first connector is the one closest to the card edge
+        @param skip: pin names that get no bus wires
+        @return: the SegmentStore
+        """
+        np = Numpy()
+        if numCons < 1:
+            return SegmentStore()
+
+        wideWidth = int( viaHole + (( viaWidth - viaHole)/2) )
+
+        pin1posX = self.centre[0] - self.px * (self.nx - 1) / 2
+        pin1posY = self.centre[1] - self.py * (self.ny - 1) / 2
+
+        # Connector transforms, composed like the translate stack.
+        mats = []
+        mat = base
+        for connum in range(0, numCons):
+            mat = ComposeMatrix(mat, [1, 0, 0, 0, 1, -connPitch])
+            mats.append(mat)
+        conMat = np.array(mats, dtype=float).T.reshape(6, numCons, 1, 1)
+
+        # Index arrays broadcast to (connector, row, pad).
+        con = np.arange(numCons).reshape(numCons, 1, 1)
+        row = np.arange(self.ny).reshape(1, self.ny, 1)
+        fat = np.array([str(padnum+1) in fatTraces
+                        for padnum in range(self.nx)]).reshape(1, 1, self.nx)
+        shape = (numCons, self.ny, self.nx)
+        toEdge = np.broadcast_to((row > 0) & (con == 0) & bool(toEdge), shape)
+        flip = np.broadcast_to(row > 0, shape) & ~toEdge
+
+        stagger = (np.where(row == 0, 0, staggerPad)
+                   + np.where(fat, np.where(row == 0, staggerPad/4,
+                                            -(staggerPad/4)), 0))
+        posX = np.trunc(pin1posX + (self.px * np.arange(self.nx)) + stagger)
+        posY = np.trunc(pin1posY + (row * self.py))
+        posX, posY = np.broadcast_arrays(posX, posY, con)[:2]
+
+        if staggerPad:
+            xp = np.zeros(fat.shape)
+        else:
+            xpMax = viaWidth*2
+            xpMin = self.px/2
+            xp = np.where(fat, 0, xpMin if (xpMin < xpMax) else xpMax)
+        yp = self.py
+        w = (viaWidth/2)
+
+        # Bent line: pad to top, top to bottom, bottom to lower connector.
+        x1 = np.stack([posX, posX-xp, posX-xp], -1)
+        y1 = np.stack([posY, posY+yp-w, posY+yp+w], -1)
+        x2 = np.stack([posX-xp, posX-xp, posX], -1)
+        y2 = np.stack([posY+yp-w, (posY+yp-w)+viaWidth, posY+connPitch], -1)
+
+        # Shorter line to the front finger takes the first slot.
+        first = np.arange(3) == 0
+        edge = toEdge[..., None] & first
+        x2 = np.where(edge, (posX-stagger)[..., None], x2)
+        y2 = np.where(edge, (posY+connPitch-self.py)[..., None], y2)
+        valid = ~toEdge[..., None] | first
+        skipped = np.array([str(padnum+1) in skip
+                            for padnum in range(self.nx)]).reshape(1, 1, self.nx)
+        valid = valid & ~np.broadcast_to(skipped, shape)[..., None]
+
+        # Flip the back row traces about their midpoint.
+        conMat = np.broadcast_arrays(*(list(conMat) + [posX]))[:6]
+        fmat = FlipMatrix(posX, (posY+connPitch/2), PlanDrawingAids.flipBoth)
+        fmat = ComposeMatrix(conMat, fmat)
+        mat = [np.where(flip, f, c)[..., None] for f, c in zip(fmat, conMat)]
+        x1, y1 = ApplyMatrix(mat, x1, y1)
+        x2, y2 = ApplyMatrix(mat, x2, y2)
+
+        bottom = (row == 0) | (preferBot & ~fat & ~toEdge)
+        bottom = np.broadcast_to(bottom[..., None], valid.shape)[valid]
+        width = np.broadcast_to(np.where(fat, wideWidth, FromMM(.5))[..., None],
+                                valid.shape)[valid]
+
+        layers = np.where(bottom, LayerId('B.Cu'), LayerId('F.Cu'))
+        return SegmentStore.FromColumns(layers.tolist(), width.tolist(),
+                                        x1[valid].tolist(), y1[valid].tolist(),
+                                        x2[valid].tolist(), y2[valid].tolist())
+
+
+def CardEdgeValue(params):
+    return "%s-%d" % ("Card_Edge_Connector", params[PAD_PAGE][POS_COUNT_KEY])
+
+def CardEdgePadKinds(params):
+    """
+    The pad kinds used by the card edge footprint.
+    'finger' is the edge connector pad, 'con' the connector through hole.
+    """
+    pads = params[PAD_PAGE]
+    # Parameters kept by older footprints have the 90 mil pad only.
+    size = pads.get(CON_PAD_KEY, FromMils(90))
+    return {'finger': PadKind('connect', 'rect', pads[PAD_WIDTH_KEY],
+                              pads[PAD_LENGTH_KEY], 0, ('*.Cu', '*.Mask')),
+            'con': PadKind('thru_hole', 'circle', size, size,
+                           pads.get(CON_DRILL_KEY, FromMils(52)),
+                           ('*.Cu', '*.Mask'))}
+
+def ParsePins(text):
+    """
+    Parse a pin list such as "1 2 3 41 42 43" or "1-3,41-43".
+    @param text: pin numbers and ranges, separated by spaces or commas
+    @return: sorted tuple of the pin numbers
+    @raise ValueError: on anything but positive pin numbers and ranges
+    """
+    pins = set()
+    for token in re.split(r'[\s,]+', text.strip()):
+        if not token:
+            continue
+        match = re.match(r'^(\d+)(?:-(\d+))?$', token)
+        if not match:
+            raise ValueError("%r is not a pin number or range" % token)
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError("%r is not a pin range" % token)
+        pins.update(range(first, last + 1))
+    return tuple(sorted(pins))
+
+
+class CardEdgeSpec(object):
+    """ The card edge parameters compiled for the build: read, validated
+        and derived once, then shared by every build stage. Specs are
+        frozen; two specs are equal when their parameters are, and the
+        key is the same stable hash ParametersKey gives the parameters.
+    @param params: the wizard parameters, as returned by FootprintWizard.parameters
+    """
+    __slots__ = ('key', 'text',
+                 'num_cons', 'con_pitch', 'pref_bottom', 'merge',
+                 'num_pos', 'alpha_name', 'alpha_skip',
+                 'pad_width', 'pad_length', 'pad_pitch', 'row_pitch',
+                 'staggered', 'stagger', 'fat_polygons', 'clearance', 'check',
+                 'timing', 'preview',
+                 'fat_pins', 'fat_names', 'fat_mask',
+                 'finger', 'via', 'via_width', 'via_hole',
+                 'wide_width', 'bus_width', 'bend', 'pin1_x')
+
+    def __init__(self, params):
+        cons = params[CON_PAGE]
+        pads = params[PAD_PAGE]
+        num_pos = pads[POS_COUNT_KEY]
+        pad_pitch = pads[PAD_PITCH_KEY]
+        kinds = CardEdgePadKinds(params)
+        via = kinds['con']
+
+        # Pins beyond the position count are left out, so one list of
+        # fat traces serves connectors of every size.
+        pins = tuple(p for p in ParsePins(pads[FAT_TRACE_KEY]) if p <= num_pos)
+        mask = 0
+        for p in pins:
+            mask |= 1 << (p - 1)
+
+        # The bend of the thin bus lines, as in BusConGrid.AddBusToPlan.
+        bendMax = via.sizeX*2
+        bendMin = pad_pitch/2
+
+        text = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        values = {
+            'key': TextKey(text),
+            'text': text,
+            'num_cons': cons[CON_COUNT_KEY],
+            'con_pitch': cons[CON_SPACING_KEY],
+            'pref_bottom': cons[CON_BOTTOM_KEY],
+            'merge': cons[MERGE_KEY],
+            'num_pos': num_pos,
+            'alpha_name': pads[ALPHA_NAME_KEY],
+            'alpha_skip': pads[ALPHA_SKIP_KEY],
+            'pad_width': pads[PAD_WIDTH_KEY],
+            'pad_length': pads[PAD_LENGTH_KEY],
+            'pad_pitch': pad_pitch,
+            'row_pitch': pads[ROW_SPACING_KEY],
+            'staggered': pads[STAGGER_KEY],
+            'stagger': (pad_pitch/2) if pads[STAGGER_KEY] else 0,
+            'fat_polygons': pads[FAT_POLYGON_KEY],
+            'clearance': pads[CLEARANCE_KEY],
+            'check': pads[CHECK_KEY],
+            'timing': cons[TIMING_KEY],
+            # Parameters kept by older footprints do not have it.
+            'preview': cons.get(PREVIEW_KEY, False),
+            'fat_pins': frozenset(pins),
+            'fat_names': frozenset(str(p) for p in pins),
+            'fat_mask': mask,
+            'finger': kinds['finger'],
+            'via': via,
+            'via_width': via.sizeX,
+            'via_hole': via.drill,
+            'wide_width': int(via.drill + ((via.sizeX - via.drill)/2)),
+            'bus_width': FromMM(.5),
+            'bend': bendMin if (bendMin < bendMax) else bendMax,
+            'pin1_x': -pad_pitch * (num_pos - 1) / 2,
+        }
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CardEdgeSpec is frozen")
+
+    def __delattr__(self, name):
+        raise AttributeError("CardEdgeSpec is frozen")
+
+    def __eq__(self, other):
+        return isinstance(other, CardEdgeSpec) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __reduce__(self):
+        return (CardEdgeSpec, (self.Parameters(),))
+
+    def Parameters(self):
+        """
+        @return: a new copy of the parameters the spec was compiled from
+        """
+        return json.loads(self.text)
+
+    def IsFat(self, padnum):
+        """
+        @param padnum: the pad index, 0 for pin 1
+        """
+        return (self.fat_mask >> padnum) & 1 == 1
+
+def CompileCardEdge(params):
+    """
+    @param params: the wizard parameters, or a CardEdgeSpec
+    @return: the CardEdgeSpec
+    @raise ValueError: when the parameters do not make a card edge
+    """
+    if isinstance(params, CardEdgeSpec):
+        return params
+    return CardEdgeSpec(params)
+
+def BuildCardEdge(params, plan, timer=None):
+    """
+    Compute the card edge bus connector footprint into a plan.
+    @param params: the wizard parameters, as returned by FootprintWizard.parameters,
+                   or their CardEdgeSpec
+    @param plan: the FootprintPlan (or compatible sink) to fill
+    @param timer: optional PhaseTimer recording the build phases
+    """
+    if timer:
+        plan = timer.Sink(plan)
+
+    spec = CompileCardEdge(params)
+
+    # Use value to fill the modules description
+    desc = "%s-%d" % ("Card_Edge_Connector", spec.num_pos)
+    plan.SetHeader(desc, desc, 1)
+
+    plan.AddPadKind('con', spec.via)
+    plan.AddPadKind('finger', spec.finger)
+
+    dc = PlanDrawingAids(plan)
+
+    # add in the finger pads
+    array = BusConGrid(spec.num_pos, 1, spec.pad_pitch, 0)
+    array.setNaming(spec.alpha_name, spec.alpha_skip)
+    array.AddPadsToPlan(dc, 'finger')
+    if timer:
+        timer.Mark("finger pads")
+
+    # add in the connector pads and bus lines
+    AddCardEdgeSlots(spec, dc, 0, spec.num_cons, timer)
+
+    if AddFatPinPolygons(spec, dc) and timer:
+        timer.Mark("fat trace polygons")
+
+    AddCardEdgeOutline(spec, dc)
+    if timer:
+        timer.Mark("courtyard and text")
+
+def AddCardEdgeSlots(params, dc, first, count, timer=None):
+    """
+    Add the pads and bus lines of a range of connectors. The connector
+    transforms are composed once and applied to whole pad arrays.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @param dc: the plan drawing context, its transform places the card edge
+    @param first: the index of the first connector, 0 is closest to the card edge
+    @param count: the number of connectors to add
+    @param timer: optional PhaseTimer, the pads are timed per connector
+    """
+    spec = CompileCardEdge(params)
+    num_cons = spec.num_cons
+    con_pitch = spec.con_pitch
+    num_pos = spec.num_pos
+    row_pitch = spec.row_pitch
+    pad_pitch = spec.pad_pitch
+    stagger = spec.stagger
+    polygons = set(name for name, layer, path, half in FatPinPaths(spec))
+
+    # The connector transforms, composed once.
+    base = dc.transform
+    conMats = ConnectorMatrices(base, first, count, con_pitch)
+
+    if (stagger):
+        array = BusConGrid(num_pos, 2, pad_pitch, row_pitch)
+
+        array1 = BusConGrid(num_pos, 1, pad_pitch, 0, (0, -row_pitch/2))
+        array1.setNaming(0, spec.alpha_skip)
+        array1.firstPadNum = num_pos+1
+
+        array2 = BusConGrid(num_pos, 1, pad_pitch, 0, (stagger, row_pitch/2))
+        array2.setNaming(spec.alpha_name, spec.alpha_skip)
+
+        for connum, conMat in enumerate(conMats):
+            array1.AddPadsToPlan(dc, 'con', conMat)
+            array2.AddPadsToPlan(dc, 'con', conMat)
+            if timer:
+                timer.Mark("connector %d pads" % (first + connum + 1))
+
+    else :
+        if (num_cons == 0 ):
+            # if no bus connectors, at least add through-hole connections to the front pads
+            array = BusConGrid(num_pos, 1, pad_pitch, 0)
+            count = 1
+            conMats = ConnectorMatrices(base, first, count, con_pitch)
+        else :
+            array = BusConGrid(num_pos, 2, pad_pitch, row_pitch)
+
+        array.setNaming(spec.alpha_name, spec.alpha_skip)
+
+        # Put lettered pads on bottom.
+        flip = FlipMatrix(array.centre[0], array.centre[1], dc.flipY)
+        for connum, conMat in enumerate(conMats):
+            array.AddPadsToPlan(dc, 'con', ComposeMatrix(conMat, flip))
+            if timer:
+                timer.Mark("connector %d pads" % (first + connum + 1))
+
+    # The bus lines of all connectors in one pass, from the first connector.
+    if first:
+        base = ConnectorMatrices(base, first - 1, 1, con_pitch)[0]
+    array.AddBusesToPlan(dc, count, con_pitch, spec.fat_names,
+                         spec.pref_bottom, stagger, spec.via_width,
+                         spec.via_hole, toEdge=(first == 0),
+                         skip=polygons, mat=base)
+    if timer:
+        timer.Mark("bus lines, %d connectors" % count)
+
+def PathOutline(points, halfWidth):
+    """
+    The outline of a path drawn with a square ended pen, mitred at the bends.
+    @param points: the centre line, list of (x, y)
+    @param halfWidth: half the width of the path
+    @return: list of (x, y), along one side and back along the other
+    """
+    points = [p for i, p in enumerate(points) if i == 0 or p != points[i-1]]
+    normals = []
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        length = math.hypot(x2-x1, y2-y1)
+        normals.append(((y1-y2)/length, (x2-x1)/length))
+
+    left = []
+    right = []
+    for i, (x, y) in enumerate(points):
+        if i == 0:
+            nx, ny = normals[0]
+        elif i == len(normals):
+            nx, ny = normals[-1]
+        else:
+            (ax, ay), (bx, by) = normals[i-1], normals[i]
+            scale = 1 / (1 + ax*bx + ay*by)
+            nx, ny = (ax+bx) * scale, (ay+by) * scale
+        left.append((x + nx*halfWidth, y + ny*halfWidth))
+        right.append((x - nx*halfWidth, y - ny*halfWidth))
+    return left + right[::-1]
+
+def FatPinPaths(params):
+    """
+    The fat trace polygons of the card edge, when they are asked for. Each
+    follows the fat traces of its pin, from the last connector to the card
+    edge finger: through the back row pads on B.Cu and the front row pads
+    on F.Cu. It is as wide as the clearance to the pads, fingers and bus
+    lines of the neighbouring pins allows; the neighbours are taken to run
+    the whole length of the bus.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @return: list of (pin name, layer, centre line, half width); pins without
+             room for a polygon are left out and keep their fat traces
+    """
+    spec = CompileCardEdge(params)
+    num_cons = spec.num_cons
+    if not spec.fat_polygons or num_cons < 1:
+        return []
+
+    num_pos = spec.num_pos
+    pad_pitch = spec.pad_pitch
+    row_pitch = spec.row_pitch
+    con_pitch = spec.con_pitch
+    clearance = spec.clearance
+    stagger = spec.stagger
+    viaWidth = spec.via_width
+    xp = spec.bend
+    busHalf = spec.bus_width / 2
+
+    pin1posX = spec.pin1_x
+    backY = -row_pitch / 2
+    frontY = row_pitch / 2
+    lastY = -num_cons * con_pitch
+
+    def Paths(x):
+        return (('B.Cu', [(x + stagger/4, lastY + backY),
+                          (x + stagger/4, backY)]),
+                ('F.Cu', [(x + stagger*3/4, lastY + frontY),
+                          (x + stagger*3/4, -con_pitch + frontY),
+                          (x, backY)]))
+
+    def Distance(ox, xs):
+        if min(xs) <= ox <= max(xs):
+            return 0
+        return min(abs(ox - x) for x in xs)
+
+    paths = []
+    for pin in sorted(spec.fat_pins):
+        padnum = pin - 1
+        name = str(pin)
+        x = pin1posX + pad_pitch * padnum
+
+        pinPaths = []
+        for i, (layer, path) in enumerate(Paths(x)):
+            xs = [p[0] for p in path]
+            room = []
+            for n in (padnum - 1, padnum + 1):
+                if n < 0 or n >= num_pos:
+                    continue
+                xn = pin1posX + pad_pitch * n
+                # Pads in both rows and the finger.
+                for ox, half in ((xn, viaWidth/2), (xn + stagger, viaWidth/2),
+                                 (xn, spec.pad_width/2)):
+                    room.append(Distance(ox, xs) - half - clearance)
+                if spec.IsFat(n):
+                    # The neighbour polygon, the space is shared.
+                    for ox in [p[0] for p in Paths(xn)[i][1]]:
+                        room.append((Distance(ox, xs) - clearance) / 2)
+                elif stagger:
+                    for ox in (xn, xn + stagger):
+                        room.append(Distance(ox, xs) - busHalf - clearance)
+                else:
+                    # Bent one way in the back row, flipped in the front row.
+                    for ox in (xn, xn - xp, xn + xp):
+                        room.append(Distance(ox, xs) - busHalf - clearance)
+
+            # Slanted parts are wider across.
+            slant = min(abs(y2-y1) / math.hypot(x2-x1, y2-y1)
+                        for (x1, y1), (x2, y2) in zip(path, path[1:])
+                        if (x1, y1) != (x2, y2))
+            half = min(room) * slant if room else pad_pitch / 2
+            pinPaths.append((name, layer, path, half))
+
+        # Without room on either layer the pin keeps its fat traces.
+        if all(p[3] > 0 for p in pinPaths):
+            paths.extend(pinPaths)
+
+    return paths
+
+def AddFatPinPolygons(params, dc):
+    """
+    Add the fat trace polygons, see FatPinPaths.
+    @param params: the wizard parameters or their CardEdgeSpec
+    @param dc: the plan drawing context, without transforms
+    @return: the number of polygons added
+    """
+    paths = FatPinPaths(params)
+    for name, layer, path, half in paths:
+        dc.SetLayer(layer)
+        dc.Polygon(PathOutline(path, half))
+    return len(paths)
+
+def AddCardEdgeOutline(params, dc):
+    """
+    Add the courtyard, reference and value.
+    @param params: the wizard parameters or their CardEdgeSpec
+    """
+    spec = CompileCardEdge(params)
+    num_pos = spec.num_pos
+    pad_length = spec.pad_length
+    row_pitch = spec.row_pitch
+    pad_pitch = spec.pad_pitch
+    pad_width = spec.pad_width
+
+    # Courtyard
+    width =  (num_pos * pad_pitch)
+    dc.SetLayer('F.CrtYd')
+    dc.SetLineThickness(FromMM(0.05))
+    boxW = width                +(pad_pitch-pad_width)
+    boxH = pad_length + FromMM(2)
+    dc.Box(0,  -FromMM(1), boxW, boxH)
+
+    # reference and value
+    text_size = FromMM(1.0)  # According KLC
+    text_offset = row_pitch
+
+    dc.Value(0, -1.5*text_offset, text_size)
+    dc.Reference(0, -2.5*text_offset, text_size)
+
+def ResizeCardEdgePlan(oldParams, oldPlan, params):
+    """
+    Derive the plan for another connector count. The connectors both plans
+    share are reused, added connectors are copies of one connector's pads
+    and bus lines moved by the connector spacing, so the cost scales with
+    the change in count.
+    @param oldParams: the parameters oldPlan was built with
+    @param oldPlan: a complete card edge FootprintPlan
+    @param params: the new parameters
+    @return: the new plan, or None if more than the connector count changed
+    """
+    spec = CompileCardEdge(params)
+    old = CompileCardEdge(oldParams).Parameters()
+    new = spec.Parameters()
+    oldCount = old[CON_PAGE].pop(CON_COUNT_KEY)
+    newCount = new[CON_PAGE].pop(CON_COUNT_KEY)
+    if old != new or oldCount < 1 or newCount < 1:
+        return None
+
+    num_pos = spec.num_pos
+    con_pitch = spec.con_pitch
+
+    # One connector away from the card edge, and the outline.
+    slot = FootprintPlan()
+    AddCardEdgeSlots(spec, PlanDrawingAids(slot), 1, 1)
+    outline = FootprintPlan()
+    AddCardEdgeOutline(spec, PlanDrawingAids(outline))
+
+    slotPads = len(slot.pads)
+    slotSegments = len(slot.segments)
+    tail = len(outline.segments)
+    firstSegments = len(oldPlan.segments) - tail - (oldCount-1)*slotSegments
+
+    keep = min(oldCount, newCount)
+    plan = FootprintPlan()
+    plan.SetHeader(oldPlan.value, oldPlan.description, oldPlan.attributes)
+    plan.padKinds = dict(oldPlan.padKinds)
+    plan.pads = oldPlan.pads[:num_pos + keep*slotPads]
+    plan.segments = oldPlan.segments[:firstSegments + (keep-1)*slotSegments]
+    for connum in range(keep, newCount):
+        dy = -con_pitch * (connum - 1)
+        plan.pads.extend(slot.pads.Moved(0, dy))
+        plan.segments.extend(slot.segments.Moved(0, dy))
+    plan.segments.extend(oldPlan.segments[len(oldPlan.segments)-tail:])
+    AddFatPinPolygons(spec, PlanDrawingAids(plan))
+    plan.texts = list(oldPlan.texts)
+    return plan
+
+def FinishCardEdge(params, plan, timer=None):
+    """
+    The steps that work on the complete card edge plan: merges the bus
+    lines that continue from one connector to the next.
+    @param params: the wizard parameters
+    @param plan: the complete FootprintPlan, it is not modified
+    @param timer: optional PhaseTimer
+    @return: (the finished plan, report text)
+    """
+    if not CompileCardEdge(params).merge:
+        return plan, ""
+    plan, removed = MergePlanSegments(plan)
+    if timer:
+        timer.Mark("merge bus lines")
+    report = "Merged bus lines: %d segments removed, %d left\n" % (
+        removed, len(plan.segments))
+    Log(report)
+    return plan, report
+
+def StreamCardEdge(params, sink):
+    """
+    FinishCardEdge for a card edge that is not kept as a plan: the bus
+    lines are merged as they are drawn.
+    @param params: the wizard parameters
+    @param sink: the sink the footprint is written to
+    @return: the sink to build into
+    """
+    if not CompileCardEdge(params).merge:
+        return sink
+    return MergingSink(sink)
+
+def CardEdgePlan(params):
+    """
+    @param params: the wizard parameters, as returned by FootprintWizard.parameters
+    @return: the FootprintPlan of the card edge bus connector
+    """
+    plan = FootprintPlan()
+    BuildCardEdge(params, plan)
+    return FinishCardEdge(params, plan)[0]
+
+class RowedGrid(PadGrid):
+    """ Geometry of a RowedGridArray: rows numbered alternately from
+        either end. Pads can be left out by a mask, see
+        keep_out.KeepOutMask; the others keep the names they have in the
+        full grid.
+    """
+    mask = None
+
+    def NamingFunction(self, x, y):
+        pad_cnt = self.nx*self.ny
+
+        if self.ny == 1:
+            return x+1
+
+        if (y % 2) == 0:  # upper row, count down
+            return pad_cnt-x
+        else:  # lower row, count up
+            return x+1
+
+    def Kept(self, first=0, count=None):
+        """
+        @param first, count: the columns, all of them by default
+        @return: the mask in the order of PadPositions, one byte per pad,
+                 1 if it is kept
+        """
+        columns = self.Columns(first, count)
+        numpy = Numpy()
+        if numpy is not None:
+            mask = numpy.frombuffer(bytes(bytearray().join(
+                row[first:first + len(columns)] for row in self.mask)),
+                numpy.uint8)
+            return mask.reshape(self.ny, len(columns)).T.tobytes()
+        return bytes(bytearray(self.mask[y][x] for x in columns
+                               for y in range(self.ny)))
+
+    def PadNames(self, first=0, count=None):
+        """
+        @param first, count: the columns, all of them by default
+        @return: the names of the kept pads, computed for the columns at once
+        """
+        columns = self.Columns(first, count)
+        numpy = Numpy()
+        if numpy is not None:
+            x = numpy.arange(first, first + len(columns)).reshape(-1, 1)
+            y = numpy.arange(self.ny).reshape(1, -1)
+            if self.ny == 1:
+                names = x + 1
+            else:
+                names = numpy.where(y % 2 == 0, self.nx*self.ny - x, x + 1)
+            names = names.ravel().astype(str).tolist()
+        else:
+            names = PadGrid.PadNames(self, first, count)
+        if self.mask is None:
+            return names
+        return list(compress(names, self.Kept(first, count)))
+
+    def PadPositions(self, mat, first=0, count=None):
+        xs, ys = PadGrid.PadPositions(self, mat, first, count)
+        if self.mask is None:
+            return xs, ys
+        kept = self.Kept(first, count)
+        return list(compress(xs, kept)), list(compress(ys, kept))
+
+
+def ProtoValue(params):
+    pads = params[PAD_PAGE]
+    rows = pads[ROW_COUNT_KEY]
+    pad_count = pads[PAD_COUNT_KEY]
+    row_dist_mil = Iu2Mils(int(pads[ROW_SPACING_KEY]))
+    pad_shape = ""
+
+    if rows == 1:
+        name = "SIP"
+        return "%s-%d" % (name, pad_count)
+
+    name = "PROTO_AREA"
+    return "%s-%d_%d%s" % (name, pad_count, row_dist_mil, pad_shape)
+
+def ProtoPadKinds(params):
+    pads = params[PAD_PAGE]
+    pad_length = pads[PAD_LENGTH_KEY]
+    pad_width = pads[PAD_WIDTH_KEY]
+    shape = 'circle' if pad_length == pad_width else 'oval'
+    return {'pad': PadKind('thru_hole', shape, pad_width, pad_length,
+                           pads[DRILL_SIZE_KEY], ('*.Cu', '*.Mask'))}
+
+def BuildProtoArea(params, plan, timer=None):
+    """
+    Compute the proto area footprint into a plan.
+    @param params: the wizard parameters, as returned by FootprintWizard.parameters
+    @param plan: the FootprintPlan (or compatible sink) to fill
+    @param timer: optional PhaseTimer recording the build phases
+    """
+    import keep_out as KO
+
+    if timer:
+        plan = timer.Sink(plan)
+
+    pads = params[PAD_PAGE]
+    body = params[BODY_PAGE]
+    num_pads = pads[PAD_COUNT_KEY]
+    pad_length = pads[PAD_LENGTH_KEY]
+    pad_width = pads[PAD_WIDTH_KEY]
+    row_pitch = pads[ROW_SPACING_KEY]
+    pad_pitch = pads[PAD_PITCH_KEY]
+    num_rows = pads[ROW_COUNT_KEY]
+
+    pads_per_row = num_pads // num_rows
+
+    # The pads of the keep out regions are left out, and the silkscreen and
+    # courtyard follow the outline of the pads that are left.
+    mask = None
+    keepOut = pads.get(KEEP_OUT_KEY, "")
+    regions = KO.ParseKeepOut(keepOut)
+    if regions:
+        mask = KO.KeepOutMask(regions, pads_per_row, num_rows, pad_pitch,
+                           row_pitch, max(pad_length, pad_width))
+
+    plan.SetHeader(ProtoValue(params),
+                   "keep out %s" % keepOut.strip() if regions else "", 0)
+    padKinds = ProtoPadKinds(params)
+    plan.AddPadKind('pad', padKinds['pad'])
+
+    dc = PlanDrawingAids(plan)
+
+    # add in the pads
+    array = RowedGrid(pads_per_row, num_rows, pad_pitch, row_pitch)
+    array.mask = mask
+    array.AddPadsToPlan(dc, 'pad')
+    if timer:
+        timer.Mark("pads")
+
+    # draw the Silk Screen
+    Hsize = pad_pitch * (num_pads / num_rows - 1)
+    Vsize = row_pitch * (num_rows - 1)
+    pin1_posY = -Vsize / 2
+    pin1_posX = -Hsize / 2
+
+    ssx_offset = -pad_width / 2 - body[OUTLINE_X_MARGIN_KEY]
+    ssy_offset = -pad_length / 2 - body[OUTLINE_Y_MARGIN_KEY]
+
+    if body[SILK_INSIDE_KEY]:
+        ssy_offset *= -1
+
+    ssx = -pin1_posX - ssx_offset
+    ssy = -pin1_posY - ssy_offset
+
+    dc.SetLineThickness( FromMM( 0.12 ) ) #Default per KLC F5.1 as of 12/2018
+    if mask is None:
+        dc.Box(0, 0, ssx*2, ssy*2)
+    else:
+        columns = [pin1_posX + pad_pitch * x for x in range(pads_per_row)]
+        rows = [pin1_posY + row_pitch * y for y in range(num_rows)]
+        for line in KO.MaskOutline(mask, columns, rows, ssx + pin1_posX,
+                                ssy + pin1_posY):
+            dc.Line(*line)
+
+    # Courtyard
+    dc.SetLayer('F.CrtYd')
+    cclearance = FromMM(0.25)
+    sizex = (-pin1_posX + cclearance) * 2 + pad_width
+    sizey = (-pin1_posY + cclearance) * 2 + pad_length
+    # round size to nearest 0.02mm, rectangle will thus land on a 0.01mm grid
+    sizex = PutOnGridMM(sizex, 0.02)
+    sizey = PutOnGridMM(sizey, 0.02)
+    # set courtyard line thickness to the one defined in KLC
+    dc.SetLineThickness(FromMM(0.05))
+    if mask is None:
+        dc.Box(0, 0, sizex, sizey)
+    else:
+        for line in KO.MaskOutline(mask, columns, rows, sizex/2 + pin1_posX,
+                                sizey/2 + pin1_posY):
+            dc.Line(*line)
+
+    #reference and value
+    text_size = FromMM(1.0)  # IPC nominal
+
+    if num_rows == 1:
+        text_py = ssy + text_size
+        dc.Value(0, -text_py, text_size)
+        dc.Reference(0, text_py, text_size)
+    else:
+        text_px = ssx + text_size
+        dc.Value(0, 0, text_size)
+        dc.Reference(-text_px, 0, text_size, orientation_degree=90)
+    if timer:
+        timer.Mark("silkscreen, courtyard and text")
+
+def ProtoAreaPlan(params):
+    """
+    @param params: the wizard parameters, as returned by FootprintWizard.parameters
+    @return: the FootprintPlan of the proto area
+    """
+    plan = FootprintPlan()
+    BuildProtoArea(params, plan)
+    return plan
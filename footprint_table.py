@@ -0,0 +1,46 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+""" The footprints of the library, by name.
+
+    The batch generator, the .kicad_mod writer and the SVG preview look up
+    the parameters and builders of a footprint here.
+"""
+
+from __future__ import division
+
+import footprint_plan as FP
+import card_edge_slots as CS
+
+# Footprints that can be built without KiCad:
+# (parameters, value, builder, finishing step or None)
+FOOTPRINTS = {
+    'card_edge': (FP.CARD_EDGE_PARAMS, FP.CardEdgeValue, FP.BuildCardEdge,
+                  FP.FinishCardEdge),
+    'card_edge_fingers': (FP.CARD_EDGE_PARAMS, CS.CardEdgeFingersValue,
+                          CS.BuildCardEdgeFingers, None),
+    'card_edge_slot': (FP.CARD_EDGE_PARAMS, CS.CardEdgeSlotValue,
+                       CS.BuildCardEdgeSlot, None),
+    'proto': (FP.ROWED_PARAMS + FP.PROTO_PARAMS, FP.ProtoValue,
+              FP.BuildProtoArea, None),
+}
+
+# Finishing steps that also work on a footprint as it is drawn:
+# footprint name to stream(params, sink), giving the sink to build into.
+STREAM_FINISH = {
+    'card_edge': FP.StreamCardEdge,
+}
@@ -0,0 +1,162 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Keep out regions of the proto area.
+
+    Parses the keep out regions a proto area is given, masks the pads of the
+    grid they cover and outlines the pads that are left.
+"""
+
+from __future__ import division
+import math
+import re
+
+import footprint_plan as FP
+
+def ParseKeepOut(text):
+    """
+    Parse the keep out regions of a proto area, such as "1-10:1-5 *:30
+    20.5:12.5/3.2". Columns and rows count from 1 at the top left.
+    "C:R" leaves out the pads of columns C and rows R, each a number, a
+    range or * for all of them. "C:R/D" leaves out the pads that would
+    overlap a D mm circle centred on column C and row R, which may lie
+    between pads, for mounting holes.
+    @param text: the regions, separated by spaces or commas
+    @return: list of ('cells', first column, last column, first row,
+             last row), counted from 0 with None for all, and of ('hole',
+             column, row, diameter)
+    @raise ValueError: on anything else
+    """
+    def Range(part):
+        if part == '*':
+            return None, None
+        first, sep, last = part.partition('-')
+        first = int(first)
+        last = int(last) if sep else first
+        if first < 1 or last < first:
+            raise ValueError("%r is not a range" % part)
+        return first - 1, last - 1
+
+    regions = []
+    for token in re.split(r'[\s,]+', text.strip()):
+        if not token:
+            continue
+        match = re.match(r'^(\*|\d+(?:-\d+)?):(\*|\d+(?:-\d+)?)$', token)
+        if match:
+            regions.append(('cells',) + Range(match.group(1)) +
+                           Range(match.group(2)))
+            continue
+        match = re.match(r'^(\d+(?:\.\d+)?):(\d+(?:\.\d+)?)/(\d+(?:\.\d+)?)$',
+                         token)
+        if not match:
+            raise ValueError("%r is not a keep out region" % token)
+        column, row, diameter = [float(g) for g in match.groups()]
+        if column < 1 or row < 1:
+            raise ValueError("%r is outside the grid" % token)
+        regions.append(('hole', column - 1, row - 1, FP.FromMM(diameter)))
+    return regions
+
+def KeepOutMask(regions, nx, ny, px, py, padSize):
+    """
+    @param regions: the keep out regions, see ParseKeepOut
+    @param nx: the number of columns
+    @param ny: the number of rows
+    @param px: the column pitch
+    @param py: the row pitch
+    @param padSize: the larger pad size, for the holes
+    @return: list of ny bytearrays of nx, 1 where a pad is kept;
+             regions beyond the grid are left out
+    """
+    mask = [bytearray(b'\x01') * nx for y in range(ny)]
+    for region in regions:
+        if region[0] == 'cells':
+            c1, c2, r1, r2 = region[1:]
+            c1 = 0 if c1 is None else c1
+            c2 = nx - 1 if c2 is None else min(c2, nx - 1)
+            r1 = 0 if r1 is None else r1
+            r2 = ny - 1 if r2 is None else min(r2, ny - 1)
+            if c1 > c2:
+                continue
+            gap = bytearray(c2 - c1 + 1)
+            for y in range(r1, r2 + 1):
+                mask[y][c1:c2 + 1] = gap
+        else:
+            column, row, diameter = region[1:]
+            reach = (diameter + padSize) / 2
+            for y in range(max(int(math.ceil(row - reach / py)), 0),
+                           min(int(math.floor(row + reach / py)), ny - 1) + 1):
+                for x in range(max(int(math.ceil(column - reach / px)), 0),
+                               min(int(math.floor(column + reach / px)),
+                                   nx - 1) + 1):
+                    if math.hypot((x - column) * px, (y - row) * py) < reach:
+                        mask[y][x] = 0
+    return mask
+
+def MaskEdges(rows, along, across, ea, eb):
+    """
+    The outline edges of the kept cells that run along the rows of a mask.
+    @param rows: the mask rows, bytearrays with 1 for a kept cell
+    @param along: the centres of the cells along a row
+    @param across: the centres of the rows
+    @param ea: how far the edges reach past the cells beside them, along
+    @param eb: how far the edges lie from the cells beside them, across
+    @return: list of (start, end, position across)
+    """
+    n = len(along)
+    empty = bytearray(n)
+    edges = []
+    for r in range(len(rows) + 1):
+        before = rows[r-1] if r > 0 else empty
+        after = rows[r] if r < len(rows) else empty
+        if before == after:
+            continue
+        # The edges of row r, then of row r-1, each with the other row
+        # missing beside it. Where a run stops at a cell of its own row,
+        # it meets the edge of the neighbouring cell in the other row.
+        for row, other, side in ((after, before, r), (before, after, r - 1)):
+            if row is empty:
+                continue
+            b = across[side] - eb if side == r else across[side] + eb
+            c = 0
+            while c < n:
+                if not row[c] or other[c]:
+                    c += 1
+                    continue
+                c1 = c
+                while c < n and row[c] and not other[c]:
+                    c += 1
+                c2 = c - 1
+                start = (along[c1-1] + ea if c1 > 0 and row[c1-1]
+                         else along[c1] - ea)
+                end = (along[c2+1] - ea if c2 + 1 < n and row[c2+1]
+                       else along[c2] + ea)
+                edges.append((start, end, b))
+    return edges
+
+def MaskOutline(mask, xs, ys, ex, ey):
+    """
+    The outline of the kept cells of a mask, in straight lines. Each line
+    lies ex (across columns) or ey (across rows) out from the centres of
+    the pads beside it, so a full mask gives the box around the pads
+    grown by ex and ey.
+    @param mask: list of rows, bytearrays with 1 for a kept cell
+    @param xs: the x of the column centres
+    @param ys: the y of the row centres
+    @return: list of (x1, y1, x2, y2)
+    """
+    columns = [bytearray(column) for column in zip(*mask)]
+    return ([(x1, y, x2, y) for x1, x2, y in MaskEdges(mask, xs, ys, ex, ey)] +
+            [(x, y1, x, y2) for y1, y2, x in MaskEdges(columns, ys, xs, ey, ex)])
@@ -0,0 +1,170 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Streams .kicad_mod S-expression text straight from the geometry.
+
+    KicadModWriter takes the place of a FootprintPlan as the target of the
+    footprint_plan builders and writes every item as soon as it is drawn,
+    so no pcbnew objects are created and memory does not grow with the
+    number of pads.
+"""
+
+from __future__ import division
+
+import re
+
+import footprint_plan as FP
+import footprint_table as FT
+
+# Module attributes as set by MODULE.SetAttributes.
+ATTRIBUTES = {1: 'smd', 2: 'virtual'}
+
+TEXT_THICKNESS = FP.FromMM(0.15)
+
+def FormatIU(value):
+    """
+    Format internal units as millimetres. Coordinates are truncated to
+    whole units first, as a wxPoint would.
+    """
+    text = "%.6f" % (int(value) / FP.IU_PER_MM)
+    text = text.rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+def Quote(text):
+    text = str(text)
+    if text and not re.search(r'[\s()"\\]', text):
+        return text
+    return '"%s"' % text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class KicadModWriter(object):
+    """ Writes a footprint as it is built. The few polygons and texts are
+        written last, so the file has the item order of WritePlan.
+    @param out: the file handle to write to
+    @param name: the footprint name, defaults to the footprint value
+    @param reference: the reference text
+    """
+    def __init__(self, out, name=None, reference="REF**"):
+        self.out = out
+        self.name = name
+        self.reference = reference
+        self.value = ""
+        self.padKinds = {}
+        self.polygons = []
+        self.texts = []
+
+    def SetHeader(self, value, description, attributes):
+        self.value = value
+        self.out.write("(module %s (layer F.Cu) (tedit 0)\n" %
+                       Quote(self.name or value))
+        if description:
+            self.out.write("  (descr %s)\n" % Quote(description))
+        if attributes in ATTRIBUTES:
+            self.out.write("  (attr %s)\n" % ATTRIBUTES[attributes])
+
+    def AddPadKind(self, name, kind):
+        size = "(size %s %s)" % (FormatIU(kind.sizeX), FormatIU(kind.sizeY))
+        if kind.drill:
+            size += " (drill %s)" % FormatIU(kind.drill)
+        self.padKinds[name] = ("%s %s" % (kind.type, kind.shape),
+                               "%s (layers %s)" % (size, " ".join(kind.layers)))
+
+    def AddPad(self, pad):
+        kind, size = self.padKinds[pad.kind]
+        self.out.write("  (pad %s %s (at %s %s) %s)\n" % (
+            Quote(pad.name), kind, FormatIU(pad.x), FormatIU(pad.y), size))
+
+    def AddPads(self, pads):
+        for pad in pads:
+            self.AddPad(FP.PlanPad._make(pad))
+
+    def AddSegment(self, s):
+        self.out.write("  (fp_line (start %s %s) (end %s %s) (layer %s) (width %s))\n" % (
+            FormatIU(s.x1), FormatIU(s.y1), FormatIU(s.x2), FormatIU(s.y2),
+            s.layer, FormatIU(s.width)))
+
+    def AddSegments(self, segments):
+        for s in segments:
+            self.AddSegment(s)
+
+    def AddPolygon(self, polygon):
+        self.polygons.append(polygon)
+
+    def AddText(self, text):
+        self.texts.append(text)
+
+    def WritePolygon(self, p):
+        self.out.write("  (fp_poly (pts %s) (layer %s) (width %s))\n" % (
+            " ".join("(xy %s %s)" % (FormatIU(x), FormatIU(y)) for x, y in p.points),
+            p.layer, FormatIU(p.width)))
+
+    def WriteText(self, t):
+        text = self.value if t.kind == 'value' else self.reference
+        at = "%s %s" % (FormatIU(t.x), FormatIU(t.y))
+        if t.orientation:
+            at += " %g" % t.orientation
+        self.out.write("  (fp_text %s %s (at %s) (layer %s)\n"
+                       "    (effects (font (size %s %s) (thickness %s)))\n  )\n" % (
+            t.kind, Quote(text), at, t.layer, FormatIU(t.size),
+            FormatIU(t.size), FormatIU(TEXT_THICKNESS)))
+
+    def Close(self):
+        for polygon in self.polygons:
+            self.WritePolygon(polygon)
+        for text in self.texts:
+            self.WriteText(text)
+        self.out.write(")\n")
+
+
+def WritePlan(plan, out, name=None):
+    """
+    Write a complete FootprintPlan.
+    """
+    writer = KicadModWriter(out, name)
+    writer.SetHeader(plan.value, plan.description, plan.attributes)
+    for kind in sorted(plan.padKinds):
+        writer.AddPadKind(kind, plan.padKinds[kind])
+    for pad in plan.pads:
+        writer.AddPad(pad)
+    for segment in plan.segments:
+        writer.AddSegment(segment)
+    for polygon in plan.polygons:
+        writer.AddPolygon(polygon)
+    for text in plan.texts:
+        writer.AddText(text)
+    writer.Close()
+
+def WriteFootprint(footprint, values, out, name=None):
+    """
+    Build a footprint straight into a file. Footprints with a finishing
+    step that needs the whole plan are built as a plan first.
+    @param footprint: the footprint name in footprint_table.FOOTPRINTS
+    @param values: dict of parameter key to dialog value
+    @param out: the file handle to write to
+    @param name: the footprint name, defaults to the footprint value
+    """
+    specs, value, build, finish = FT.FOOTPRINTS[footprint]
+    params = FP.Parameters(specs, values)
+    if finish and footprint not in FT.STREAM_FINISH:
+        plan = FP.FootprintPlan()
+        build(params, plan)
+        WritePlan(finish(params, plan)[0], out, name)
+        return
+    writer = KicadModWriter(out, name)
+    if footprint in FT.STREAM_FINISH:
+        writer = FT.STREAM_FINISH[footprint](params, writer)
+    build(params, writer)
+    writer.Close()
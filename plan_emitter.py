@@ -0,0 +1,190 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Turns a footprint_plan.FootprintPlan into KiCad objects. """
+
+from __future__ import division
+import pcbnew
+
+import footprint_plan as FP
+
+LAYERS = {
+    'F.Cu':    pcbnew.F_Cu,
+    'B.Cu':    pcbnew.B_Cu,
+    'F.SilkS': pcbnew.F_SilkS,
+    'F.Fab':   pcbnew.F_Fab,
+    'F.CrtYd': pcbnew.F_CrtYd,
+}
+
+PAD_SHAPES = {
+    'circle': pcbnew.PAD_SHAPE_CIRCLE,
+    'rect':   pcbnew.PAD_SHAPE_RECT,
+    'oval':   pcbnew.PAD_SHAPE_OVAL,
+}
+
+PAD_ATTRIBUTES = {
+    'thru_hole': pcbnew.PAD_ATTRIB_STANDARD,
+    'smd':       pcbnew.PAD_ATTRIB_SMD,
+    'connect':   pcbnew.PAD_ATTRIB_CONN,
+}
+
+def PadPrototype(module, kind):
+    """
+    A prototype pad made from a plan pad kind, as PadArray.PadMaker would.
+    @param module: the module the pad is for
+    @param kind: the footprint_plan.PadKind
+    """
+    pad = pcbnew.D_PAD(module)
+    pad.SetSize(pcbnew.wxSize(kind.sizeX, kind.sizeY))
+    pad.SetShape(PAD_SHAPES[kind.shape])
+    pad.SetAttribute(PAD_ATTRIBUTES[kind.type])
+    if kind.drill:
+        pad.SetDrillSize(pcbnew.wxSize(kind.drill, kind.drill))
+    if '*.Cu' in kind.layers:
+        pad.SetLayerSet(pad.StandardMask())
+    else:
+        pad.SetLayerSet(pad.SMDMask())
+    return pad
+
+class PadPool(object):
+    """ Prototype pads, prepared once per kind, stamped out in bulk.
+    @param module: the module receiving the pads
+    @param prototypes: dict of pad kind name to prototype pad
+    """
+    def __init__(self, module, prototypes):
+        self.add = module.Add
+        self.duplicates = dict((kind, pad.Duplicate)
+                               for kind, pad in prototypes.items() if pad)
+
+    def Stamp(self, pads):
+        """
+        Add copies of the prototypes in one pass.
+        @param pads: iterable of (kind, name, x, y)
+        """
+        wxPoint = pcbnew.wxPoint
+        duplicates = self.duplicates
+        add = self.add
+        for kind, name, x, y in pads:
+            pos = wxPoint(x, y)
+            pad = duplicates[kind]()
+            pad.SetPos0(pos)
+            pad.SetPosition(pos)
+            pad.SetName(name)
+            add(pad)
+
+def EmitPads(pads, module, prototypes):
+    """
+    Add the plan pads to the module.
+    @param pads: the footprint_plan.PadStore
+    @param module: the module receiving the pads
+    @param prototypes: dict of pad kind name to prototype pad
+    """
+    PadPool(module, prototypes).Stamp(pads.Rows())
+
+def AddGridPads(array, grid, dc):
+    """
+    Bulk form of PadArray.PadGridArray.AddPadsToModule. The positions and
+    names are computed by the headless grid, then the pads are stamped out
+    of the array prototypes in one pass.
+    @param array: the PadGridArray
+    @param grid: the footprint_plan.PadGrid with the same geometry and naming
+    @param dc: the drawing context
+    """
+    xs, ys = grid.PadPositions(dc.dc['transform'])
+    if array.pinNames is None:
+        names = grid.PadNames()
+    else:
+        names = [array.pinNames] * len(xs)
+    kinds = ['pad'] * len(xs)
+    if array.firstPad and kinds:
+        kinds[0] = 'first'
+    pool = PadPool(array.pad.GetParent(),
+                   {'pad': array.pad, 'first': array.firstPad})
+    pool.Stamp(zip(kinds, names, xs, ys))
+
+def EmitSegments(segments, dc):
+    """
+    Add the footprint_plan.SegmentStore to the module of the drawing
+    context, as its Line would. The current transform of the drawing
+    context is applied once to the plan coordinates, the transform stack
+    is not touched.
+    """
+    module = dc.module
+    mat = dc.dc['transform']
+    wxPoint = pcbnew.wxPoint
+    for layer, width, x1, y1, x2, y2 in segments.Rows():
+        line = pcbnew.EDGE_MODULE(module)
+        line.SetWidth(width)
+        line.SetLayer(LAYERS[layer])
+        line.SetShape(pcbnew.S_SEGMENT)
+        line.SetStartEnd(wxPoint(*FP.ApplyMatrix(mat, x1, y1)),
+                         wxPoint(*FP.ApplyMatrix(mat, x2, y2)))
+        module.Add(line)
+
+def EmitPolygons(polygons, module, dc):
+    """
+    Add the plan polygons to the module, through the current transform of
+    the drawing context.
+    """
+    mat = dc.dc['transform']
+    wxPoint = pcbnew.wxPoint
+    for p in polygons:
+        polygon = pcbnew.EDGE_MODULE(module)
+        polygon.SetShape(pcbnew.S_POLYGON)
+        polygon.SetLayer(LAYERS[p.layer])
+        polygon.SetWidth(p.width)
+        polygon.SetPolyPoints([wxPoint(*FP.ApplyMatrix(mat, x, y))
+                                for x, y in p.points])
+        module.Add(polygon)
+
+def EmitTexts(texts, dc):
+    for t in texts:
+        if t.kind == 'value':
+            dc.Value(t.x, t.y, t.size, orientation_degree=t.orientation)
+        else:
+            dc.Reference(t.x, t.y, t.size, orientation_degree=t.orientation)
+
+def EmitPlan(plan, module, dc, prototypes, timer=None):
+    """
+    Turn a plan into KiCad objects.
+    @param plan: the FootprintPlan to emit
+    @param module: the module to fill
+    @param dc: the drawing context, with no transform applied
+    @param prototypes: dict of pad kind name to prototype pad
+    @param timer: optional footprint_plan.PhaseTimer recording the phases
+    """
+    # The proto area has no description unless pads are kept out.
+    if plan.description:
+        module.SetDescription(plan.description)
+    module.SetAttributes(plan.attributes)
+
+    EmitPads(plan.pads, module, prototypes)
+    if timer:
+        timer.Count(len(plan.pads))
+        timer.Mark("KiCad pads")
+    EmitSegments(plan.segments, dc)
+    if timer:
+        timer.Count(len(plan.segments))
+        timer.Mark("KiCad lines")
+    if plan.polygons:
+        EmitPolygons(plan.polygons, module, dc)
+        if timer:
+            timer.Count(len(plan.polygons))
+            timer.Mark("KiCad polygons")
+    EmitTexts(plan.texts, dc)
+    if timer:
+        timer.Count(len(plan.texts))
+        timer.Mark("KiCad texts")
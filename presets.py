@@ -0,0 +1,86 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+""" Named parameter presets of the footprints.
+
+    The buses and proto areas the library is made of, as parameter sets
+    the wizards, the batch generator and the SVG preview can start from.
+"""
+
+from __future__ import division
+from collections import OrderedDict
+
+import footprint_plan as FP
+
+# Named parameter sets, in dialog units, for the buses and proto areas the
+# library is made of. Parameters a preset leaves out keep their defaults.
+# The pin lists of "fat traces" are the positions with the same supply on
+# both sides; the numbering is that of the wizard, not of the bus standard.
+# The connector pads are sized for the clearance default between the pins.
+CARD_EDGE_PRESETS = OrderedDict([
+    # Motorola EXORciser, the wizard defaults.
+    ('EXORbus', {FP.CON_SPACING_KEY: 19.05, FP.POS_COUNT_KEY: 43,
+                 FP.ALPHA_NAME_KEY: True, FP.ALPHA_SKIP_KEY: "GIOQ",
+                 FP.FAT_TRACE_KEY: "1 2 3 11 16 20 21 22 41 42 43 9 17 24",
+                 FP.PAD_WIDTH_KEY: 2.54, FP.PAD_LENGTH_KEY: 8.0,
+                 FP.PAD_PITCH_KEY: 3.96, FP.ROW_SPACING_KEY: 5.08,
+                 FP.CON_PAD_KEY: 90, FP.CON_DRILL_KEY: 52}),
+    # IEEE 696, 100 pins at 0.125 in: +8 V on 1/51, ground on 20/70 and 50/100.
+    ('S-100', {FP.CON_SPACING_KEY: 19.05, FP.POS_COUNT_KEY: 50,
+               FP.ALPHA_NAME_KEY: False, FP.FAT_TRACE_KEY: "1 20 50",
+               FP.PAD_WIDTH_KEY: 2.0, FP.PAD_LENGTH_KEY: 7.62,
+               FP.PAD_PITCH_KEY: 3.175, FP.ROW_SPACING_KEY: 6.35,
+               FP.CON_PAD_KEY: 80, FP.CON_DRILL_KEY: 46}),
+    # 8 bit ISA, 62 pins at 0.1 in, no supply on both sides.
+    ('ISA', {FP.CON_SPACING_KEY: 20.32, FP.POS_COUNT_KEY: 31,
+             FP.ALPHA_NAME_KEY: False, FP.FAT_TRACE_KEY: "",
+             FP.PAD_WIDTH_KEY: 1.78, FP.PAD_LENGTH_KEY: 8.0,
+             FP.PAD_PITCH_KEY: 2.54, FP.ROW_SPACING_KEY: 7.62,
+             FP.CON_PAD_KEY: 64, FP.CON_DRILL_KEY: 40}),
+    # IEEE 961, 56 pins at 0.125 in: +5 V, ground, -5 V and aux ground.
+    ('STD', {FP.CON_SPACING_KEY: 12.7, FP.POS_COUNT_KEY: 28,
+             FP.ALPHA_NAME_KEY: False, FP.FAT_TRACE_KEY: "1-3 27",
+             FP.PAD_WIDTH_KEY: 2.0, FP.PAD_LENGTH_KEY: 7.62,
+             FP.PAD_PITCH_KEY: 3.175, FP.ROW_SPACING_KEY: 6.35,
+             FP.CON_PAD_KEY: 80, FP.CON_DRILL_KEY: 46}),
+])
+
+PROTO_PRESETS = OrderedDict([
+    ('Proto 2x20', {FP.PAD_COUNT_KEY: 40, FP.ROW_COUNT_KEY: 2}),
+    ('Proto 10x10', {FP.PAD_COUNT_KEY: 100, FP.ROW_COUNT_KEY: 10}),
+    ('Proto 30x20', {FP.PAD_COUNT_KEY: 600, FP.ROW_COUNT_KEY: 20}),
+    ('Proto 60x40', {FP.PAD_COUNT_KEY: 2400, FP.ROW_COUNT_KEY: 40}),
+])
+
+PRESETS = {
+    'card_edge': CARD_EDGE_PRESETS,
+    'card_edge_fingers': CARD_EDGE_PRESETS,
+    'card_edge_slot': CARD_EDGE_PRESETS,
+    'proto': PROTO_PRESETS,
+}
+
+def PresetValues(presets, name):
+    """
+    @param presets: the presets of a footprint, e.g. CARD_EDGE_PRESETS
+    @param name: the preset name
+    @return: a new dict of parameter key to dialog value
+    @raise ValueError: when there is no such preset
+    """
+    if name not in presets:
+        raise ValueError("unknown preset %r, use one of %s" %
+                         (name, ", ".join(presets)))
+    return dict(presets[name])
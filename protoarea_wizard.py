@@ -20,6 +20,9 @@ import pcbnew
 import FootprintWizardBase
 import PadArray as PA
 
+import footprint_plan as FP
+import keep_out as KO
+
 
 class RowedGridArray(PA.PadGridArray):
 
@@ -37,101 +40,47 @@ class RowedGridArray(PA.PadGridArray):
         else:  # lower row, count up
             return x+1
 
+    def AddPadsToModule(self, dc):
+        import plan_emitter as PE
+        grid = FP.RowedGrid(self.nx, self.ny, self.px, self.py,
+                            (self.centre.x, self.centre.y))
+        PE.AddGridPads(self, grid, dc)
+
 
 class RowedFootprint(FootprintWizardBase.FootprintWizard):
 
-    pad_count_key = 'pad count'
-    row_count_key = 'row count'
-    row_spacing_key = 'row spacing'
-    pad_length_key = 'pad length'
-    pad_width_key = 'pad width'
-    pad_pitch_key = 'pad pitch'
+    pad_count_key = FP.PAD_COUNT_KEY
+    row_count_key = FP.ROW_COUNT_KEY
+    row_spacing_key = FP.ROW_SPACING_KEY
+    pad_length_key = FP.PAD_LENGTH_KEY
+    pad_width_key = FP.PAD_WIDTH_KEY
+    pad_pitch_key = FP.PAD_PITCH_KEY
 
-    silkscreen_inside_key = 'silk screen inside'
-    outline_x_margin_key = 'outline x margin'
-    outline_y_margin_key = 'outline y margin'
+    silkscreen_inside_key = FP.SILK_INSIDE_KEY
+    outline_x_margin_key = FP.OUTLINE_X_MARGIN_KEY
+    outline_y_margin_key = FP.OUTLINE_Y_MARGIN_KEY
 
-    def GenerateParameterList(self):
-        # defaults for a DIP package
-        self.AddParam("Pads", self.pad_count_key, self.uInteger, 128)
-        self.AddParam("Pads", self.row_count_key, self.uInteger, 8, min_value=1)
+    planCache = FP.PlanCache(16)
 
-        self.AddParam("Body", self.silkscreen_inside_key, self.uBool, False)
-        self.AddParam("Body", self.outline_x_margin_key, self.uMM, 0.5)
-        self.AddParam("Body", self.outline_y_margin_key, self.uMM, 0.5)
+    def GenerateParameterList(self):
+        for page, key, units, default, options in FP.ROWED_PARAMS:
+            self.AddParam(page, key, units, default, **options)
 
     def CheckParameters(self):
         self.CheckParam("Pads", self.pad_count_key, multiple=self.parameters['Pads'][self.row_count_key], info='Pads must be multiple of row count')
 
     def BuildThisFootprint(self):
-        pads = self.parameters["Pads"]
-        body = self.parameters["Body"]
-        num_pads = pads[self.pad_count_key]
-        pad_length = pads[self.pad_length_key]
-        pad_width = pads[self.pad_width_key]
-        row_pitch = pads[self.row_spacing_key]
-        pad_pitch = pads[self.pad_pitch_key]
-        num_rows = pads[self.row_count_key]
-
-        pads_per_row = num_pads // num_rows
-
-        # add in the pads
-        pad = self.GetPad()
-
-        array = RowedGridArray(pad, pads_per_row, num_rows, pad_pitch, row_pitch)
-        array.AddPadsToModule(self.draw)
-
-        # draw the Silk Screen
-        Hsize = pad_pitch * (num_pads / num_rows - 1)
-        Vsize = row_pitch * (num_rows - 1)
-        pin1_posY = -Vsize / 2
-        pin1_posX = -Hsize / 2
-
-        pad_length = pads[self.pad_length_key]
-        pad_width = pads[self.pad_width_key]
-
-        ssx_offset = -pad_width / 2 - body[self.outline_x_margin_key]
-        ssy_offset = -pad_length / 2 - body[self.outline_y_margin_key]
-
-        if body[self.silkscreen_inside_key]:
-            ssy_offset *= -1
-
-        ssx = -pin1_posX - ssx_offset
-        ssy = -pin1_posY - ssy_offset
-
-        cmargin = self.draw.GetLineThickness()
-        self.draw.SetLineThickness( pcbnew.FromMM( 0.12 ) ) #Default per KLC F5.1 as of 12/2018
-        self.DrawBox(ssx, ssy)
-
-        # Courtyard
-        self.draw.SetLayer(pcbnew.F_CrtYd)
-        cclearance = pcbnew.FromMM(0.25)
-        sizex = (-pin1_posX + cclearance) * 2 + pad_width
-        sizey = (-pin1_posY + cclearance) * 2 + pad_length
-        # round size to nearest 0.02mm, rectangle will thus land on a 0.01mm grid
-        sizex = pcbnew.PutOnGridMM(sizex, 0.02)
-        sizey = pcbnew.PutOnGridMM(sizey, 0.02)
-        # set courtyard line thickness to the one defined in KLC
-        self.draw.SetLineThickness(pcbnew.FromMM(0.05))
-        self.draw.Box(0, 0, sizex, sizey)
-        # restore line thickness to previous value
-        self.draw.SetLineThickness(pcbnew.FromMM(cmargin))
-
-        #reference and value
-        text_size = self.GetTextSize()  # IPC nominal
-
-        if num_rows == 1:
-            text_py = ssy + text_size
-            self.draw.Value(0, -text_py, text_size)
-            self.draw.Reference(0, text_py, text_size)
-        else:
-            text_px = ssx + text_size
-            # self.draw.Value(text_px, 0, text_size, orientation_degree=90)
-            self.draw.Value(0, 0, text_size)
-            self.draw.Reference(-text_px, 0, text_size, orientation_degree=90)
-
-        # set the attribute
-        self.module.SetAttributes(pcbnew.MOD_DEFAULT)
+        # The geometry is computed headless, then turned into KiCad objects.
+        # The dialog rebuilds on every edit, so recent plans are replayed.
+        # Timing is reported in the build messages and to the log.
+        import plan_emitter as PE
+        params = self.parameters
+        timer = FP.StartTimer(params[FP.BODY_PAGE][FP.TIMING_KEY])
+        plan = self.planCache.Get(params, FP.BuildProtoArea, timer=timer)
+        PE.EmitPlan(plan, self.module, self.draw, {'pad': self.GetPad()},
+                    timer)
+        if timer:
+            self.buildmessages += timer.Report("\nBuild timing of %s:" % plan.value)
 
 class ProtoWizard(RowedFootprint):
 
@@ -144,31 +93,33 @@ class ProtoWizard(RowedFootprint):
     def GenerateParameterList(self):
         RowedFootprint.GenerateParameterList(self)
 
-        self.AddParam("Pads", self.pad_pitch_key, self.uMM, 2.54)
-        self.AddParam("Pads", self.pad_width_key, self.uMM, 1.2)
-        self.AddParam("Pads", self.pad_length_key, self.uMM, 1.2)
-        self.AddParam("Pads", self.row_spacing_key, self.uMM, 2.54)
-        self.AddParam("Pads", "drill size", self.uMM, 0.8)
+        for page, key, units, default, options in FP.PROTO_PARAMS:
+            self.AddParam(page, key, units, default, **options)
 
-    def GetValue(self):
-        pads = self.parameters["Pads"]
-        rows = pads[self.row_count_key]
-        pad_count = pads[self.pad_count_key]
-        row_dist_mil = pcbnew.Iu2Mils(int(self.parameters["Pads"][self.row_spacing_key])) #int(self.parameters["Pads"][self.row_spacing_key] / 2.54 * 100)
-        pad_shape = ""
-
-
-        if rows == 1:
-            name = "SIP"
-            return "%s-%d" % (name, pad_count)
+    def CheckParameters(self):
+        RowedFootprint.CheckParameters(self)
+        try:
+            KO.ParseKeepOut(self.parameters[FP.PAD_PAGE][FP.KEEP_OUT_KEY])
+        except ValueError as e:
+            self.GetParam(FP.PAD_PAGE, FP.KEEP_OUT_KEY).AddError(str(e))
+
+    def SetPreset(self, name):
+        """
+        Set the parameters of a proto area size, for scripts and the batch.
+        @param name: the preset name in presets.PROTO_PRESETS
+        """
+        import presets as PS
+        params = dict((p.name, p) for p in self.params)
+        for key, value in PS.PresetValues(PS.PROTO_PRESETS, name).items():
+            params[key].SetValue(value)
 
-        name = "PROTO_AREA"
-        return "%s-%d_%d%s" % (name, pad_count, row_dist_mil, pad_shape)
+    def GetValue(self):
+        return FP.ProtoValue(self.parameters)
 
     def GetPad(self):
         pad_length = self.parameters["Pads"][self.pad_length_key]
         pad_width = self.parameters["Pads"][self.pad_width_key]
-        drill = self.parameters["Pads"]["drill size"]
+        drill = self.parameters["Pads"][FP.DRILL_SIZE_KEY]
         shape = pcbnew.PAD_SHAPE_CIRCLE
 
         if pad_length != pad_width:
@@ -177,30 +128,5 @@ class ProtoWizard(RowedFootprint):
         return PA.PadMaker(self.module).THPad(
             pad_length, pad_width, drill, shape=shape)
 
-    def DrawBox(self, ssx, ssy):
-
-        #if self.parameters["Pads"][self.row_count_key] == 2:
-
-            #  ----------
-            #  |8 7 6 5 |
-            #  >        |
-            #  |1 2 3 4 |
-            #  ----------
-
-            # draw the notch
-            #notchWidth = ssy/1.5
-            #notchHeight = self.draw.GetLineThickness()*3
-
-            # NotchedBox draws the notch on top. Rotate the box 90 degrees
-            # to have it on the left
-            #self.draw.Box(0, 0, ssy*2, ssx*2 )
-        #else:
-            #  -----------------
-            #  |1|2 3 4 5 6 7 8|
-            #  -----------------
-        self.draw.Box(0, 0, ssx*2, ssy*2)
-
-        return ssx, ssy
-
 ProtoWizard().register()
 
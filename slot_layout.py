@@ -0,0 +1,63 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Board layout of instanced slot mode.
+
+    In instanced slot mode the card edge is one fingers footprint and one
+    small footprint per connector slot, and the bus lines are tracks on the
+    board. This module works out, without KiCad, where the slots go, the
+    bus tracks and their nets, all relative to the fingers footprint. The
+    tracks are those of the monolithic footprint with the same slot count.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import footprint_plan as FP
+import card_edge_slots as CS
+import clearance_check as CC
+
+# slots: list of (x, y) of the slot footprints, the first next to the fingers
+# tracks: list of (net, PlanSegment), net is None for copper without pads
+# nets: dict of pad name to net, for the fingers and slot pads
+# Nets are named after a pad on them, a finger where there is one.
+SlotLayout = namedtuple('SlotLayout', 'slots tracks nets')
+
+def LayoutSlots(params, count):
+    """
+    @param params: the wizard parameters of the fingers footprint
+    @param count: the number of slots
+    @return: SlotLayout
+    """
+    if count < 1:
+        return SlotLayout([], [], {})
+
+    con_pitch = params[FP.CON_PAGE][FP.CON_SPACING_KEY]
+    slots = [(0, -con_pitch * (n + 1)) for n in range(count)]
+
+    plan = FP.CardEdgePlan(CS.InstancedParameters(params, count))
+    padNets, segmentNets, polygonNets = CC.PlanNets(plan)
+
+    names = {}
+    for pad, net in zip(plan.pads, padNets):
+        names.setdefault(net, []).append((pad.kind != 'finger', pad.name))
+    netNames = dict((net, min(pads)[1]) for net, pads in names.items())
+
+    tracks = [(netNames.get(net), s)
+              for s, net in zip(plan.segments, segmentNets) if net is not None]
+    nets = dict((pad.name, netNames[net])
+                for pad, net in zip(plan.pads, padNets))
+    return SlotLayout(slots, tracks, nets)
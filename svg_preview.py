@@ -0,0 +1,250 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Headless SVG preview of a footprint.
+
+    Draws the pads, lines, polygons and texts of a footprint plan to SVG,
+    without KiCad. Every layer is a group of its own, with the layer name
+    as id, and the holes are the "Drill" group on top. Each pad kind is
+    drawn once and placed with <use>, so large backplanes stay small.
+    Coordinates are in mm, truncated to whole units as KiCad holds them,
+    and the output depends on the parameters only, so previews can be
+    diffed.
+
+    usage: python svg_preview.py card_edge preview.svg "connector count=20"
+           python svg_preview.py card_edge s100.svg --preset S-100
+
+    Parameters are named as in the wizard dialog and given in its units
+    (mm for lengths), values are read as JSON where they can be.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import sys
+
+import footprint_plan as FP
+import footprint_table as FT
+import presets as PS
+from kicad_mod_writer import FormatIU
+
+# Layers bottom up, with their colours.
+LAYERS = [
+    ('B.Cu',    '#4d7f4d'),
+    ('F.Cu',    '#c83434'),
+    ('F.Fab',   '#afafaf'),
+    ('F.SilkS', '#f2eda1'),
+    ('F.CrtYd', '#c2c2c2'),
+]
+DRILL_COLOUR = '#e3b72e'
+BACKGROUND = '#000000'
+
+# Room around the footprint, in internal units.
+MARGIN = FP.FromMM(1)
+
+def Escape(text):
+    return (str(text).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+def PadLayers(kind):
+    """
+    @return: the layers of LAYERS a pad kind has copper on
+    """
+    return [name for name, colour in LAYERS if name in kind.layers or
+            (name.endswith('.Cu') and '*.Cu' in kind.layers)]
+
+def PadShape(kind, attributes=""):
+    """
+    @return: the SVG element of a pad kind, centred on the origin
+    """
+    w, h = FormatIU(kind.sizeX), FormatIU(kind.sizeY)
+    if kind.shape == 'circle':
+        return '<circle r="%s"%s/>' % (FormatIU(kind.sizeX / 2), attributes)
+    rounding = ""
+    if kind.shape == 'oval':
+        r = FormatIU(min(kind.sizeX, kind.sizeY) / 2)
+        rounding = ' rx="%s" ry="%s"' % (r, r)
+    return '<rect x="%s" y="%s" width="%s" height="%s"%s%s/>' % (
+        FormatIU(-kind.sizeX / 2), FormatIU(-kind.sizeY / 2), w, h,
+        rounding, attributes)
+
+def BoundingBox(plan):
+    """
+    @return: (x1, y1, x2, y2) of everything drawn, in internal units
+    """
+    xs = []
+    ys = []
+    for kind, name, x, y in plan.pads.Rows():
+        kind = plan.padKinds[kind]
+        xs.extend((x - kind.sizeX / 2, x + kind.sizeX / 2))
+        ys.extend((y - kind.sizeY / 2, y + kind.sizeY / 2))
+    for layer, width, x1, y1, x2, y2 in plan.segments.Rows():
+        xs.extend((x1 - width / 2, x2 - width / 2,
+                   x1 + width / 2, x2 + width / 2))
+        ys.extend((y1 - width / 2, y2 - width / 2,
+                   y1 + width / 2, y2 + width / 2))
+    for p in plan.polygons:
+        xs.extend(x for x, y in p.points)
+        ys.extend(y for x, y in p.points)
+    for t in plan.texts:
+        xs.append(t.x)
+        ys.append(t.y)
+    if not xs:
+        return 0, 0, 0, 0
+    return min(xs), min(ys), max(xs), max(ys)
+
+def WriteSVG(plan, out, reference="REF**"):
+    """
+    Draw a complete FootprintPlan.
+    @param plan: the FootprintPlan
+    @param out: the file handle to write to
+    @param reference: the reference text
+    """
+    x1, y1, x2, y2 = BoundingBox(plan)
+    x1 -= MARGIN
+    y1 -= MARGIN
+    width = x2 - x1 + MARGIN
+    height = y2 - y1 + MARGIN
+
+    write = out.write
+    write('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<svg xmlns="http://www.w3.org/2000/svg" '
+          'xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1"\n'
+          '     width="%smm" height="%smm" viewBox="%s %s %s %s">\n' % (
+              FormatIU(width), FormatIU(height), FormatIU(x1), FormatIU(y1),
+              FormatIU(width), FormatIU(height)))
+    write('<title>%s</title>\n' % Escape(plan.value))
+    if plan.description:
+        write('<desc>%s</desc>\n' % Escape(plan.description))
+
+    kinds = sorted(plan.padKinds)
+    write('<defs>\n')
+    for name in kinds:
+        kind = plan.padKinds[name]
+        write('  %s\n' % PadShape(kind, ' id="pad-%s"' % Escape(name)))
+        if kind.drill:
+            write('  <circle id="drill-%s" r="%s"/>\n' %
+                  (Escape(name), FormatIU(kind.drill / 2)))
+    write('</defs>\n')
+    write('<rect x="%s" y="%s" width="%s" height="%s" fill="%s"/>\n' % (
+        FormatIU(x1), FormatIU(y1), FormatIU(width), FormatIU(height),
+        BACKGROUND))
+
+    padLayers = dict((name, PadLayers(plan.padKinds[name])) for name in kinds)
+    pads = list(plan.pads.Rows())
+    segments = list(plan.segments.Rows())
+    texts = {'reference': reference, 'value': plan.value}
+
+    for layer, colour in LAYERS:
+        write('<g id="%s" fill="%s" stroke="%s" stroke-width="0" '
+              'stroke-linecap="round" stroke-linejoin="round">\n' %
+              (layer, colour, colour))
+        for kind, name, x, y in pads:
+            if layer in padLayers[kind]:
+                write('<use xlink:href="#pad-%s" x="%s" y="%s"/>\n' %
+                      (Escape(kind), FormatIU(x), FormatIU(y)))
+        for s in segments:
+            if s[0] == layer:
+                write('<line x1="%s" y1="%s" x2="%s" y2="%s" '
+                      'stroke-width="%s"/>\n' % (
+                          FormatIU(s[2]), FormatIU(s[3]), FormatIU(s[4]),
+                          FormatIU(s[5]), FormatIU(s[1])))
+        for p in plan.polygons:
+            if p.layer == layer:
+                write('<polygon points="%s" stroke-width="%s"/>\n' % (
+                    " ".join("%s,%s" % (FormatIU(x), FormatIU(y))
+                             for x, y in p.points), FormatIU(p.width)))
+        for t in plan.texts:
+            if t.layer == layer:
+                x, y = FormatIU(t.x), FormatIU(t.y)
+                rotate = (' transform="rotate(%g %s %s)"' %
+                          (-t.orientation, x, y) if t.orientation else "")
+                write('<text x="%s" y="%s" font-size="%s" '
+                      'font-family="monospace" text-anchor="middle" '
+                      'dominant-baseline="central"%s>%s</text>\n' % (
+                          x, y, FormatIU(t.size), rotate,
+                          Escape(texts[t.kind])))
+        write('</g>\n')
+
+    write('<g id="Drill" fill="%s">\n' % DRILL_COLOUR)
+    for kind, name, x, y in pads:
+        if plan.padKinds[kind].drill:
+            write('<use xlink:href="#drill-%s" x="%s" y="%s"/>\n' %
+                  (Escape(kind), FormatIU(x), FormatIU(y)))
+    write('</g>\n')
+    write('</svg>\n')
+
+def FootprintPlan(footprint, values):
+    """
+    Build a footprint as the wizard would, finishing step included.
+    @param footprint: the footprint name in footprint_table.FOOTPRINTS
+    @param values: dict of parameter key to dialog value
+    @return: the FootprintPlan
+    """
+    specs, value, build, finish = FT.FOOTPRINTS[footprint]
+    params = FP.Parameters(specs, values)
+    plan = FP.FootprintPlan()
+    build(params, plan)
+    if finish:
+        plan = finish(params, plan)[0]
+    return plan
+
+def ParseValue(text):
+    """
+    @param text: "key=value", the value as JSON or plain text
+    @return: (key, value)
+    """
+    key, sep, value = text.partition('=')
+    if not sep:
+        raise ValueError("%r is not key=value" % text)
+    try:
+        return key.strip(), json.loads(value)
+    except ValueError:
+        return key.strip(), value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Draw a footprint to SVG without KiCad.")
+    parser.add_argument('footprint', choices=sorted(FT.FOOTPRINTS),
+                        help="the footprint to draw")
+    parser.add_argument('output', help="the SVG file to write, - for stdout")
+    parser.add_argument('values', nargs='*', metavar='key=value',
+                        help="wizard parameters, in dialog units")
+    parser.add_argument('--reference', default="REF**",
+                        help="the reference text")
+    parser.add_argument('--preset', default=None,
+                        help="start from a named parameter set, e.g. S-100")
+    args = parser.parse_args(argv)
+
+    try:
+        values = {}
+        if args.preset:
+            values = PS.PresetValues(PS.PRESETS.get(args.footprint, {}),
+                                     args.preset)
+        values.update(ParseValue(v) for v in args.values)
+        plan = FootprintPlan(args.footprint, values)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output == '-':
+        WriteSVG(plan, sys.stdout, args.reference)
+    else:
+        with open(args.output, 'w') as out:
+            WriteSVG(plan, out, args.reference)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
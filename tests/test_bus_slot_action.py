@@ -0,0 +1,89 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Tests of the slot placing board action, on a board of the stand-ins
+    in bench/stubs.
+
+    usage: python -m unittest discover tests
+"""
+
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(ROOT, 'bench', 'stubs'), ROOT]
+
+import pcbnew
+import bus_slot_action as BA
+import edge_bus_connectors
+
+
+class PlaceSlotsTest(unittest.TestCase):
+
+    def setUp(self):
+        wiz = edge_bus_connectors.CardEdgeFingersWizard()
+        wiz.planCache.Clear()
+        wiz.BuildFootprint()
+        self.board = pcbnew.BOARD()
+        self.fingers = pcbnew.MODULE(wiz.module)
+        self.fingers.SetReference("J1")
+        self.fingers.SetPosition(pcbnew.wxPoint(100000000, 50000000))
+        self.board.Add(self.fingers)
+
+    def Place(self, count):
+        BA.PlaceSlots(self.board, self.fingers, count)
+        return len(self.board.modules), len(self.board.tracks)
+
+    def testRerunKeepsTrackCount(self):
+        placed = self.Place(4)
+        self.assertEqual(self.Place(4), placed)
+        self.assertEqual(self.Place(4), placed)
+
+    def testRerunRemovesTracksWithoutNet(self):
+        placed = self.Place(4)
+        for track in self.board.tracks:
+            track.SetNet(None)
+        self.assertEqual(self.Place(4), placed)
+        for track in self.board.tracks:
+            track.SetNet(None)
+        self.Place(2)
+        self.assertEqual(self.Place(4), placed)
+
+    def testRerunAfterMovingFingers(self):
+        placed = self.Place(4)
+        for track in self.board.tracks:
+            track.SetNet(None)
+        self.fingers.SetPosition(pcbnew.wxPoint(120000000, 40000000))
+        self.assertEqual(self.Place(4), placed)
+
+    def testOtherTracksStay(self):
+        track = pcbnew.TRACK(self.board)
+        track.SetStart(pcbnew.wxPoint(0, 0))
+        track.SetEnd(pcbnew.wxPoint(1000000, 0))
+        track.SetWidth(250000)
+        track.SetLayer(pcbnew.F_Cu)
+        self.board.Add(track)
+        self.Place(3)
+        self.Place(1)
+        self.assertIn(track, self.board.tracks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Tests of the incremental library build of footprint_batch.py. Each
+    build runs in a fresh interpreter, on a copy of the plugins.
+
+    usage: python -m unittest discover tests
+"""
+
+from __future__ import division
+
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+STUBS = os.path.join(ROOT, 'bench', 'stubs')
+sys.path[:0] = [STUBS, ROOT]
+
+import footprint_plan as FP
+import footprint_batch
+
+GRIDS = [{"wizard": "card_edge", "grid": {"connector count": [1, 2]}},
+         {"wizard": "proto", "grid": {"pad count": [64]}}]
+
+# main's summary line
+SUMMARY = re.compile(r'(\d+) footprints written to .*, (\d+) up to date, '
+                     r'(\d+) removed, (\d+) failed')
+
+def Run(args, cwd, check=True):
+    """
+    @param check: fail when the script does
+    @return: the standard output of a python script
+    """
+    process = subprocess.Popen([sys.executable] + args, cwd=cwd,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    out, err = process.communicate()
+    if check and process.returncode:
+        raise AssertionError("%s failed:\n%s" % (" ".join(args), err))
+    return out
+
+
+class CodeHashTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for path in glob.glob(os.path.join(ROOT, '*.py')):
+            shutil.copy(path, self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def Build(self, grids=None):
+        """
+        @param grids: the jobs to build, GRIDS by default
+        @return: (written, up to date) of a sexpr build of the copy
+        """
+        written, current, removed, failed = self.Summary(grids)
+        self.assertEqual(failed, 0)
+        return written, current
+
+    def Summary(self, grids=None):
+        """
+        @return: (written, up to date, removed, failed)
+        """
+        with open(os.path.join(self.dir, 'grids.json'), 'w') as f:
+            json.dump(GRIDS if grids is None else grids, f)
+        out = Run(['footprint_batch.py', 'grids.json', '-o', 'Test.pretty',
+                   '--backend', 'sexpr', '-j', '1'], self.dir, check=False)
+        return tuple(int(n) for n in SUMMARY.search(out).groups())
+
+    def Library(self):
+        return sorted(glob.glob(os.path.join(self.dir, 'Test.pretty',
+                                             '*.kicad_mod')))
+
+    def testEditedModuleRebuilds(self):
+        self.assertEqual(self.Build(), (3, 0))
+        self.assertEqual(self.Build(), (0, 3))
+        with open(os.path.join(self.dir, 'kicad_mod_writer.py'), 'a') as f:
+            f.write("\n# edited\n")
+        self.assertEqual(self.Build(), (3, 0))
+        self.assertEqual(self.Build(), (0, 3))
+
+    def testFailedRebuildIsCleanedUp(self):
+        self.assertEqual(self.Build(), (3, 0))
+        files = self.Library()
+        broken = [dict(GRIDS[0], fixed={"fat traces": "bogus"}), GRIDS[1]]
+        self.assertEqual(self.Summary(broken), (0, 1, 0, 2))
+        self.assertEqual(self.Library(), files)
+        # The old files are still the library's, and go with their variants.
+        self.assertEqual(self.Summary(GRIDS[1:]), (0, 1, 2, 0))
+        self.assertEqual(len(self.Library()), 1)
+
+    def testPcbnewHashCoversWizardModules(self):
+        # The plugin modules a build loads must be hashed, with the wizard's.
+        for wizard, (module, name) in sorted(footprint_batch.WIZARDS.items()):
+            script = ("import os, sys\n"
+                      "sys.path[:0] = %r\n"
+                      "import %s\n"
+                      "%s.%s().BuildFootprint()\n"
+                      "print(' '.join(n for n, m in sys.modules.items()\n"
+                      "      if os.path.dirname(getattr(m, '__file__', None)\n"
+                      "                         or '') == %r))\n" %
+                      ([STUBS, self.dir], module, module, name, self.dir))
+            loaded = set(Run(['-c', script], self.dir).split())
+            hashed = set(footprint_batch.CODE_MODULES['pcbnew'] + [module])
+            self.assertEqual(loaded - hashed, set(), wizard)
+
+
+
+class MakeWizardTest(unittest.TestCase):
+
+    def Build(self, values):
+        wiz = footprint_batch.MakeWizard('card_edge', values)
+        wiz.planCache.Clear()
+        wiz.BuildFootprint()
+        self.assertFalse(wiz.AnyErrors(), wiz.buildmessages)
+        return wiz.module
+
+    def testPreviewIsBuiltInFull(self):
+        values = {FP.CON_COUNT_KEY: 8}
+        full = self.Build(values)
+        values[FP.PREVIEW_KEY] = True
+        module = self.Build(values)
+        self.assertEqual(len(module.Pads()), len(full.Pads()))
+        self.assertEqual(len(module.GraphicalItems()),
+                         len(full.GraphicalItems()))
+        self.assertEqual(module.description, full.description)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Tests of the headless footprint geometry.
+
+    usage: python -m unittest discover tests
+"""
+
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT]
+
+import footprint_plan as FP
+
+
+def Difference(rows, expected):
+    """
+    Compare long lists of plan rows without diffing them.
+    @return: where the lists first differ, None if they are equal
+    """
+    if len(rows) != len(expected):
+        return "%d rows, expected %d" % (len(rows), len(expected))
+    for i, (row, want) in enumerate(zip(rows, expected)):
+        if row != want:
+            return "row %d is %r, expected %r" % (i, row, want)
+    return None
+
+
+class SegmentStoreTest(unittest.TestCase):
+
+    def testKnownLayers(self):
+        store = FP.SegmentStore()
+        for layer in FP.PLAN_LAYERS:
+            store.append(FP.PlanSegment(layer, 1000, 0, 0, 10, 0))
+        self.assertEqual([s.layer for s in store], list(FP.PLAN_LAYERS))
+
+    def testUnknownLayer(self):
+        store = FP.SegmentStore()
+        segment = FP.PlanSegment('F.Silk', 1000, 0, 0, 10, 0)
+        self.assertRaises(ValueError, store.append, segment)
+        self.assertRaises(ValueError, store.extend, [segment])
+        self.assertNotIn('F.Silk', FP.PLAN_LAYERS)
+
+
+class BusLinesTest(unittest.TestCase):
+    """ The bus lines of all connectors at once are those drawn connector by
+        connector, across the batches of BUS_BATCH_CONNECTORS.
+    """
+    count = FP.BUS_BATCH_CONNECTORS + 4
+
+    def setUp(self):
+        self.addCleanup(setattr, FP, 'USE_NUMPY', FP.USE_NUMPY)
+
+    def Spec(self, stagger, bottom):
+        return FP.CardEdgeSpec(FP.Parameters(FP.CARD_EDGE_PARAMS, {
+            FP.CON_COUNT_KEY: self.count, FP.STAGGER_KEY: stagger,
+            FP.CON_BOTTOM_KEY: bottom}))
+
+    def Reference(self, spec):
+        # One connector at a time, moved along by the translate stack.
+        array = FP.BusConGrid(spec.num_pos, 2, spec.pad_pitch, spec.row_pitch)
+        plan = FP.FootprintPlan()
+        dc = FP.PlanDrawingAids(plan)
+        for connum in range(spec.num_cons):
+            dc.TransformTranslate(0, -spec.con_pitch)
+            array.AddBusToPlan(dc, spec.con_pitch, spec.fat_names,
+                               spec.pref_bottom, spec.stagger, connum == 0,
+                               spec.via_width, spec.via_hole)
+        return list(plan.segments.Rows())
+
+    def AllAtOnce(self, spec):
+        array = FP.BusConGrid(spec.num_pos, 2, spec.pad_pitch, spec.row_pitch)
+        plan = FP.FootprintPlan()
+        array.AddBusesToPlan(FP.PlanDrawingAids(plan), spec.num_cons,
+                             spec.con_pitch, spec.fat_names, spec.pref_bottom,
+                             spec.stagger, spec.via_width, spec.via_hole)
+        return list(plan.segments.Rows())
+
+    def Check(self):
+        for stagger in (False, True):
+            for bottom in (False, True):
+                spec = self.Spec(stagger, bottom)
+                self.assertIsNone(Difference(self.AllAtOnce(spec),
+                                             self.Reference(spec)),
+                                  (stagger, bottom))
+
+    def testVectorized(self):
+        if FP.Numpy() is None:
+            self.skipTest("NumPy is missing")
+        self.Check()
+
+    def testWithoutNumPy(self):
+        FP.USE_NUMPY = False
+        self.Check()
+
+    def testPlanWithoutNumPy(self):
+        if FP.Numpy() is None:
+            self.skipTest("NumPy is missing")
+        spec = self.Spec(True, True)
+        planned = FP.CardEdgePlan(spec)
+        FP.USE_NUMPY = False
+        unvectorized = FP.CardEdgePlan(spec)
+        self.assertIsNone(Difference(list(unvectorized.pads.Rows()),
+                                     list(planned.pads.Rows())))
+        self.assertIsNone(Difference(list(unvectorized.segments.Rows()),
+                                     list(planned.segments.Rows())))
+
+
+class ResizeTest(unittest.TestCase):
+    """ A card edge derived for another connector count is the one built
+        for that count, whichever side of a bus batch the counts are on.
+    """
+    batch = FP.BUS_BATCH_CONNECTORS
+    counts = [(batch - 1, batch + 1), (3, batch + 4), (batch + 4, 5),
+              (batch, batch + 1), (batch + 1, batch), (1, 2*batch + 1)]
+
+    def Params(self, count, values):
+        values = dict(values)
+        values[FP.CON_COUNT_KEY] = count
+        return FP.Parameters(FP.CARD_EDGE_PARAMS, values)
+
+    def Built(self, params):
+        plan = FP.FootprintPlan()
+        FP.BuildCardEdge(params, plan)
+        return plan
+
+    def Check(self, values):
+        for old, new in self.counts:
+            oldParams = self.Params(old, values)
+            params = self.Params(new, values)
+            plan = FP.ResizeCardEdgePlan(oldParams, self.Built(oldParams),
+                                         params)
+            built = self.Built(params)
+            where = (values, old, new)
+            self.assertEqual((plan.value, plan.description, plan.attributes),
+                             (built.value, built.description,
+                              built.attributes), where)
+            self.assertEqual(plan.padKinds, built.padKinds, where)
+            self.assertIsNone(Difference(list(plan.pads.Rows()),
+                                         list(built.pads.Rows())), where)
+            self.assertIsNone(Difference(list(plan.segments.Rows()),
+                                         list(built.segments.Rows())), where)
+            self.assertEqual(plan.polygons, built.polygons, where)
+            self.assertEqual(plan.texts, built.texts, where)
+
+    def testDefaults(self):
+        self.Check({})
+
+    def testStaggeredPolygons(self):
+        self.Check({FP.STAGGER_KEY: True, FP.FAT_POLYGON_KEY: True,
+                    FP.CON_BOTTOM_KEY: True})
+
+    def testOtherChange(self):
+        # More than the connector count changed: built again, not derived.
+        params = self.Params(5, {FP.STAGGER_KEY: True})
+        self.assertIsNone(FP.ResizeCardEdgePlan(
+            self.Params(4, {}), self.Built(self.Params(4, {})), params))
+
+
+def Copper(segments):
+    """
+    @return: dict of line key to the union of the spans the segments
+             cover on it, see footprint_plan.SegmentLine; zero length
+             segments under None
+    """
+    lines = {}
+    points = set()
+    for segment in segments:
+        line = FP.SegmentLine(*segment)
+        if line is None:
+            points.add(tuple(segment))
+        else:
+            lines.setdefault(line[0], []).append(line[1:3])
+    copper = {None: points}
+    for key, spans in lines.items():
+        union = []
+        for t1, t2 in sorted(spans):
+            if union and t1 <= union[-1][1]:
+                union[-1][1] = max(union[-1][1], t2)
+            else:
+                union.append([t1, t2])
+        copper[key] = union
+    return copper
+
+
+class MergeTest(unittest.TestCase):
+    """ Merged bus lines cover exactly the copper of the lines drawn. """
+
+    # Overlapping, touching, apart, reversed, diagonal and zero length.
+    segments = [('F.Cu', 500, 0, 0, 10, 0), ('F.Cu', 500, 5, 0, 20, 0),
+                ('F.Cu', 500, 30, 0, 20, 0), ('F.Cu', 500, 31, 0, 40, 0),
+                ('F.Cu', 800, 0, 0, 10, 0), ('B.Cu', 500, 0, 0, 10, 0),
+                ('F.Cu', 500, 0, 0, 3, 4), ('F.Cu', 500, 6, 8, 3, 4),
+                ('F.Cu', 500, 7, 7, 7, 7), ('F.Cu', 500, 0, 1, 10, 1)]
+
+    def Check(self, segments, merged, removed):
+        self.assertEqual(Copper(merged), Copper(segments))
+        self.assertEqual(len(merged), len(segments) - removed)
+
+    def testSegments(self):
+        merged, removed = FP.MergeSegments(self.segments)
+        self.assertEqual(removed, 3)
+        self.Check(self.segments, list(merged.Rows()), removed)
+
+    def testCardEdge(self):
+        for values in ({}, {FP.STAGGER_KEY: True, FP.CON_BOTTOM_KEY: True}):
+            values[FP.CON_COUNT_KEY] = 20
+            plan = FP.FootprintPlan()
+            FP.BuildCardEdge(FP.Parameters(FP.CARD_EDGE_PARAMS, values), plan)
+            segments = list(plan.segments.Rows())
+            merged, removed = FP.MergeSegments(plan.segments)
+            self.assertTrue(removed)
+            self.Check(segments, list(merged.Rows()), removed)
+
+    def testFewOpenLines(self):
+        # Runs passed on early are not merged further, the copper is kept.
+        plan = FP.FootprintPlan()
+        FP.BuildCardEdge(FP.Parameters(FP.CARD_EDGE_PARAMS,
+                                       {FP.CON_COUNT_KEY: 20}), plan)
+        merged = FP.FootprintPlan()
+        sink = FP.MergingSink(merged, openLines=4)
+        sink.AddSegments(plan.segments)
+        sink.Flush()
+        self.Check(list(plan.segments.Rows()), list(merged.segments.Rows()),
+                   sink.removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Tests of the streamed .kicad_mod output.
+
+    usage: python -m unittest discover tests
+"""
+
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT]
+
+import footprint_plan as FP
+import footprint_table as FT
+import kicad_mod_writer
+
+
+class Text(list):
+    """ A file handle collecting the text, with str on Python 2 and 3. """
+    write = list.append
+
+    def getvalue(self):
+        return "".join(self)
+
+def Streamed(footprint, values):
+    out = Text()
+    kicad_mod_writer.WriteFootprint(footprint, values, out)
+    return out.getvalue()
+
+def Planned(footprint, values):
+    specs, value, build, finish = FT.FOOTPRINTS[footprint]
+    params = FP.Parameters(specs, values)
+    plan = FP.FootprintPlan()
+    build(params, plan)
+    if finish:
+        plan = finish(params, plan)[0]
+    out = Text()
+    kicad_mod_writer.WritePlan(plan, out)
+    return out.getvalue()
+
+
+class WriteFootprintTest(unittest.TestCase):
+
+    def testStreamedIsPlanned(self):
+        # The sexpr backend streams, the same footprint must hash the same.
+        for count in (1, 3, 17):
+            for merge in (False, True):
+                for polygons in (False, True):
+                    values = {FP.CON_COUNT_KEY: count, FP.MERGE_KEY: merge,
+                              FP.FAT_POLYGON_KEY: polygons}
+                    self.assertEqual(Streamed('card_edge', values),
+                                     Planned('card_edge', values), values)
+        for footprint in ('card_edge_fingers', 'card_edge_slot', 'proto'):
+            self.assertEqual(Streamed(footprint, {}), Planned(footprint, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
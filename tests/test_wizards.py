@@ -0,0 +1,97 @@
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+""" Tests of the footprint wizards, built outside of KiCad with the
+    stand-ins in bench/stubs.
+
+    usage: python -m unittest discover tests
+"""
+
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [os.path.join(ROOT, 'bench', 'stubs'), ROOT]
+
+import footprint_plan as FP
+import edge_bus_connectors
+import protoarea_wizard
+
+
+def MakeWizard(wizard, values):
+    wiz = wizard()
+    params = dict((p.name, p) for p in wiz.params)
+    for name, value in values.items():
+        params[name].SetValue(value)
+    wiz.planCache.Clear()
+    return wiz
+
+
+class CardEdgeTimingTest(unittest.TestCase):
+
+    def testDefaultBuildReportsGeometryPhases(self):
+        # The clearance check builds the plan, the build replays it.
+        wiz = MakeWizard(edge_bus_connectors.CardEdgeWizard,
+                         {FP.CON_COUNT_KEY: 2, FP.TIMING_KEY: True})
+        wiz.BuildFootprint()
+        report = wiz.buildmessages
+        self.assertIn("Build timing of", report)
+        for phase in ("finger pads", "connector 1 pads", "connector 2 pads",
+                      "bus lines, 2 connectors", "courtyard and text",
+                      "clearance check", "plan from cache", "KiCad pads"):
+            self.assertIn(phase, report)
+
+    def testRebuildReplaysFinishedPlan(self):
+        wiz = MakeWizard(edge_bus_connectors.CardEdgeWizard,
+                         {FP.CON_COUNT_KEY: 2, FP.TIMING_KEY: True})
+        wiz.BuildFootprint()
+        self.assertIn("merge bus lines", wiz.buildmessages)
+        merged = wiz.buildmessages.splitlines()[0]
+        wiz.BuildFootprint()
+        self.assertIn("finished plan from cache", wiz.buildmessages)
+        self.assertNotIn("merge bus lines", wiz.buildmessages)
+        self.assertEqual(merged, wiz.buildmessages.splitlines()[0])
+
+    def testNoReportWithoutTiming(self):
+        if os.environ.get(FP.TIMING_ENV):
+            self.skipTest("%s is set" % FP.TIMING_ENV)
+        wiz = MakeWizard(edge_bus_connectors.CardEdgeWizard,
+                         {FP.CON_COUNT_KEY: 2})
+        wiz.BuildFootprint()
+        self.assertNotIn("Build timing of", wiz.buildmessages)
+
+
+class ProtoDescriptionTest(unittest.TestCase):
+
+    def testNoDescriptionWithoutKeepOut(self):
+        # As the proto area was before keep out regions.
+        wiz = MakeWizard(protoarea_wizard.ProtoWizard, {})
+        wiz.BuildFootprint()
+        self.assertFalse(hasattr(wiz.module, 'description'))
+
+    def testKeepOutDescription(self):
+        wiz = MakeWizard(protoarea_wizard.ProtoWizard,
+                         {FP.KEEP_OUT_KEY: "1:1"})
+        wiz.BuildFootprint()
+        self.assertEqual(wiz.module.description, "keep out 1:1")
+
+
+if __name__ == '__main__':
+    unittest.main()